@@ -0,0 +1,121 @@
+import gzip
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 条件导入，未安装brotli时只协商gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 值得压缩的内容类型
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    根据 Accept-Encoding 选择压缩方式，同等权重下优先 br
+
+    Args:
+        accept_encoding: 请求头 Accept-Encoding 的值
+
+    Returns:
+        "br"、"gzip"，客户端不接受任何可用压缩时返回None
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    candidates = [
+        (weights.get(encoding, weights.get("*", 0.0)), -index, encoding)
+        for index, encoding in enumerate(available)
+    ]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    按 Accept-Encoding 协商 br/gzip 压缩响应体
+
+    只压缩一次性发送的响应体；流式响应（如SSE）逐块透传，不缓冲。
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        """
+        Args:
+            app: ASGI应用
+            minimum_size: 小于该字节数的响应不压缩
+            gzip_level: gzip压缩级别
+            brotli_quality: brotli压缩质量（0-11，越大越慢）
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        started = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, started
+            if message["type"] == "http.response.start":
+                # 等待第一块响应体，再决定是否压缩
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or started:
+                await send(message)
+                return
+
+            started = True
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            if message.get("more_body", False) or not self._should_compress(headers, body):
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes) -> bool:
+        """已编码、过小或不可压缩类型的响应不压缩"""
+        if len(body) < self.minimum_size or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        # 固定mtime，相同内容压缩结果相同
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
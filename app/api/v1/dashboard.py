@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 import logging
-from typing import Optional
-from app.config.database import get_db
-from app.config.cache import cache
-from app.schemas import DateRangeRequest, ErrorResponse
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.config.database import run_with_session
+from app.config.cache import async_cache
+from app.config.settings import settings
+from app.schemas import DateRangeRequest, ErrorResponse, DashboardBatchRequest
 from app.services.data_service import DataService
-from app.services.kpi_service import KPIService
+from app.services.kpi_service import KPIService, dashboard_cache_entry, dashboard_widget_window
+from app.utils.exceptions import ValidationError
+from app.utils.http_cache import check_data_version
+from app.utils.responses import trusted_json_response
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -14,35 +18,65 @@ logger = logging.getLogger(__name__)
 # 创建路由器
 router = APIRouter()
 
+async def _cached_widget(
+    request: Request,
+    response: Response,
+    widget: Dict[str, Any],
+    compute: Callable[[], Awaitable[Any]]
+) -> Response:
+    """
+    读取组件缓存，未命中时计算，并按时间窗口记录命中情况
+    
+    数据版本未变化时直接返回304，不读取缓存也不访问数据库。
+    """
+    cache_key, tags = dashboard_cache_entry(widget)
+    not_modified = await check_data_version(request, response, tags)
+    if not_modified is not None:
+        await async_cache.record_window_access([(dashboard_widget_window(widget), True)])
+        return not_modified
+    
+    computed = False
+    
+    async def tracked_compute() -> Any:
+        nonlocal computed
+        computed = True
+        return await compute()
+    
+    # 优先读取缓存，未命中时只有一个worker在线程池中查询数据库
+    value = await async_cache.get_or_compute(
+        cache_key,
+        tracked_compute,
+        expire=settings.DASHBOARD_CACHE_TTL,
+        tags=tags
+    )
+    await async_cache.record_window_access([(dashboard_widget_window(widget), not computed)])
+    # 缓存值由服务层生成，直接编码返回
+    return trusted_json_response(value, response)
+
 @router.get(
     "/dashboard/summary",
     response_model=dict,
-    responses={500: {"model": ErrorResponse}},
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
     summary="获取仪表盘摘要",
     description="获取仪表盘摘要数据，包含关键KPI指标"
 )
 async def get_dashboard_summary(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = Query(None, description="开始日期 (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)")
 ):
     """获取仪表盘摘要"""
     try:
-        # 尝试从缓存获取
-        cache_key = f"dashboard_summary:{start_date}:{end_date}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return cached_data
-        
-        # 从数据库获取
-        kpi_service = KPIService(db)
-        summary = kpi_service.get_dashboard_summary(start_date, end_date)
-        
-        # 存入缓存
-        cache.set(cache_key, summary, expire=3600)  # 缓存1小时
-        
-        return summary
+        return await _cached_widget(
+            request,
+            response,
+            {"type": "summary", "start_date": start_date, "end_date": end_date},
+            lambda: run_with_session(lambda db: KPIService(db).get_dashboard_summary(start_date, end_date))
+        )
         
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except Exception as e:
         logger.error(f"获取仪表盘摘要失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取仪表盘摘要失败: {str(e)}")
@@ -50,37 +84,32 @@ async def get_dashboard_summary(
 @router.get(
     "/dashboard/trends",
     response_model=dict,
-    responses={500: {"model": ErrorResponse}},
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
     summary="获取趋势数据",
     description="获取关键指标的趋势数据"
 )
 async def get_trends(
+    request: Request,
+    response: Response,
     metrics: str = Query("occupancy_rate,adr,revpar", description="要获取的指标，逗号分隔"),
     period: str = Query("daily", description="周期类型: daily, weekly, monthly"),
     start_date: Optional[str] = Query(None, description="开始日期 (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)")
 ):
     """获取趋势数据"""
     try:
         # 解析指标列表
         metric_list = metrics.split(",")
         
-        # 尝试从缓存获取
-        cache_key = f"dashboard_trends:{metrics}:{period}:{start_date}:{end_date}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return cached_data
-        
-        # 从数据库获取
-        kpi_service = KPIService(db)
-        trends = kpi_service.get_trends(metric_list, period, start_date, end_date)
-        
-        # 存入缓存
-        cache.set(cache_key, trends, expire=3600)  # 缓存1小时
-        
-        return trends
+        return await _cached_widget(
+            request,
+            response,
+            {"type": "trends", "metrics": metrics, "period": period, "start_date": start_date, "end_date": end_date},
+            lambda: run_with_session(lambda db: KPIService(db).get_trends(metric_list, period, start_date, end_date))
+        )
         
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except Exception as e:
         logger.error(f"获取趋势数据失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取趋势数据失败: {str(e)}")
@@ -88,39 +117,122 @@ async def get_trends(
 @router.get(
     "/dashboard/comparison",
     response_model=dict,
-    responses={500: {"model": ErrorResponse}},
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
     summary="获取对比数据",
     description="获取不同时期的数据对比"
 )
 async def get_comparison(
+    request: Request,
+    response: Response,
     metric: str = Query("occupancy_rate", description="要对比的指标"),
     current_start: str = Query(..., description="当前周期开始日期 (YYYY-MM-DD)"),
     current_end: str = Query(..., description="当前周期结束日期 (YYYY-MM-DD)"),
     previous_start: str = Query(..., description="上一周期开始日期 (YYYY-MM-DD)"),
-    previous_end: str = Query(..., description="上一周期结束日期 (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    previous_end: str = Query(..., description="上一周期结束日期 (YYYY-MM-DD)")
 ):
     """获取对比数据"""
     try:
-        # 尝试从缓存获取
-        cache_key = f"dashboard_comparison:{metric}:{current_start}:{current_end}:{previous_start}:{previous_end}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return cached_data
-        
-        # 从数据库获取
-        kpi_service = KPIService(db)
-        comparison = kpi_service.get_comparison(
-            metric,
-            current_start, current_end,
-            previous_start, previous_end
+        return await _cached_widget(
+            request,
+            response,
+            {
+                "type": "comparison",
+                "metric": metric,
+                "current_start": current_start,
+                "current_end": current_end,
+                "previous_start": previous_start,
+                "previous_end": previous_end
+            },
+            lambda: run_with_session(lambda db: KPIService(db).get_comparison(
+                metric,
+                current_start, current_end,
+                previous_start, previous_end
+            ))
         )
         
-        # 存入缓存
-        cache.set(cache_key, comparison, expire=3600)  # 缓存1小时
-        
-        return comparison
-        
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except Exception as e:
         logger.error(f"获取对比数据失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取对比数据失败: {str(e)}")
+
+@router.post(
+    "/dashboard/batch",
+    response_model=dict,
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+    summary="批量获取仪表盘组件",
+    description="一次请求获取多个仪表盘组件：缓存通过一次MGET读取，未命中的组件合并规划后统一查询"
+)
+async def get_dashboard_batch(request: DashboardBatchRequest):
+    """批量获取仪表盘组件"""
+    try:
+        specs = {widget.id: widget.model_dump() for widget in request.widgets}
+        cache_entries = {widget_id: dashboard_cache_entry(spec) for widget_id, spec in specs.items()}
+        cached = await async_cache.get_many([key for key, _ in cache_entries.values()])
+        
+        results = {}
+        missing = []
+        for widget in request.widgets:
+            key = cache_entries[widget.id][0]
+            if key in cached:
+                results[widget.id] = cached[key]
+            else:
+                missing.append(widget)
+        cached_ids = set(results)
+        
+        # 未命中的组件在线程池中一次规划、统一查询
+        if missing:
+            missing_specs = [specs[widget.id] for widget in missing]
+            # 计算前记录数据版本，计算期间发生导入的组件不写入缓存
+            versions = await async_cache.snapshot_data_versions(
+                tag for widget in missing for tag in cache_entries[widget.id][1]
+            )
+            started = time.time()
+            computed = await run_with_session(lambda db: KPIService(db).get_dashboard_batch(missing_specs))
+            await async_cache.set_many(
+                {cache_entries[widget_id][0]: (value, cache_entries[widget_id][1]) for widget_id, value in computed.items()},
+                expire=settings.DASHBOARD_CACHE_TTL,
+                delta=time.time() - started,
+                versions=versions
+            )
+            results.update(computed)
+        
+        await async_cache.record_window_access([
+            (dashboard_widget_window(spec), widget_id in cached_ids)
+            for widget_id, spec in specs.items()
+        ])
+        
+        return trusted_json_response({
+            "widgets": {widget.id: results[widget.id] for widget in request.widgets},
+            "cache": {
+                "hits": len(request.widgets) - len(missing),
+                "misses": len(missing)
+            }
+        })
+        
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except Exception as e:
+        logger.error(f"批量获取仪表盘组件失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"批量获取仪表盘组件失败: {str(e)}")
+
+@router.get(
+    "/dashboard/cache-stats",
+    response_model=dict,
+    responses={500: {"model": ErrorResponse}},
+    summary="获取仪表盘缓存命中率",
+    description="按时间窗口预设统计最近若干天的仪表盘缓存命中率，用于调整预热窗口"
+)
+async def get_dashboard_cache_stats(
+    days: int = Query(settings.CACHE_WINDOW_STATS_DAYS, ge=1, le=30, description="统计天数")
+):
+    """获取仪表盘缓存命中率"""
+    try:
+        return {
+            "days": days,
+            "windows": await async_cache.get_window_stats(days)
+        }
+        
+    except Exception as e:
+        logger.error(f"获取缓存命中率失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"获取缓存命中率失败: {str(e)}")
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
-from typing import List, Optional
-from app.config.database import get_db
-from app.schemas import HotelDataResponse, DateRangeRequest, ErrorResponse, PaginatedResponse
-from app.services.data_service import DataService
+from typing import List, Optional, Union
+from app.config.database import get_async_db, run_with_session
+from app.config.cache import ALL_DATA_TAG, date_range_tags
+from app.schemas import HotelDataResponse, DateRangeRequest, ErrorResponse, PaginatedResponse, CursorPaginatedResponse
+from app.services.data_service import DataService, AsyncDataService, DEFAULT_TOTAL_MODE
+from app.utils.exceptions import ValidationError
+from app.utils.http_cache import check_data_version
+from app.utils.responses import trusted_json_response
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -12,26 +16,67 @@ logger = logging.getLogger(__name__)
 # 创建路由器
 router = APIRouter()
 
+# 列表响应中每条记录的字段，与 HotelDataResponse 一致
+HOTEL_RESPONSE_FIELDS = list(HotelDataResponse.model_fields)
+
+def _hotel_items(hotels: List) -> List[dict]:
+    """将ORM对象按 HotelDataResponse 的字段投影为字典，跳过逐行的模型校验"""
+    items = []
+    for hotel in hotels:
+        row = hotel.to_dict()
+        items.append({field: row.get(field) for field in HOTEL_RESPONSE_FIELDS})
+    return items
+
 @router.get(
     "/data/hotels",
-    response_model=PaginatedResponse,
-    responses={500: {"model": ErrorResponse}},
+    response_model=Union[PaginatedResponse, CursorPaginatedResponse],
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
     summary="获取酒店数据列表",
-    description="分页获取酒店数据列表"
+    description="分页获取酒店数据列表，pagination=cursor时使用游标分页"
 )
 async def get_hotels(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(10, ge=1, le=100, description="每页数量"),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$", description="分页方式：offset页码分页，cursor游标分页"),
+    cursor: Optional[str] = Query(None, description="游标分页时上一页返回的next_cursor"),
+    total_mode: str = Query(DEFAULT_TOTAL_MODE, pattern="^(none|estimate|exact)$", description="游标分页的总数计算方式"),
     hotel_name: Optional[str] = Query(None, description="酒店名称过滤"),
     location: Optional[str] = Query(None, description="位置过滤"),
     start_date: Optional[str] = Query(None, description="开始日期 (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取酒店数据列表"""
     try:
-        data_service = DataService(db)
-        hotels, total = data_service.get_hotels(
+        # 名称为子串过滤，只能按月份判断数据版本
+        not_modified = await check_data_version(request, response, date_range_tags(start_date, end_date))
+        if not_modified is not None:
+            return not_modified
+        
+        data_service = AsyncDataService(db)
+        
+        if pagination == "cursor":
+            page_data = await data_service.get_hotels_by_cursor(
+                size=size,
+                cursor=cursor,
+                hotel_name=hotel_name,
+                location=location,
+                start_date=start_date,
+                end_date=end_date,
+                total_mode=total_mode
+            )
+            return trusted_json_response({
+                "items": _hotel_items(page_data["items"]),
+                "size": size,
+                "next_cursor": page_data["next_cursor"],
+                "has_more": page_data["has_more"],
+                "total": page_data["total"],
+                "total_is_estimate": page_data["total_is_estimate"]
+            }, response)
+        
+        hotels, total = await data_service.get_hotels(
             page=page,
             size=size,
             hotel_name=hotel_name,
@@ -43,17 +88,17 @@ async def get_hotels(
         # 计算总页数
         pages = (total + size - 1) // size
         
-        # 转换为响应模型
-        items = [HotelDataResponse(**hotel.to_dict()) for hotel in hotels]
-        
-        return PaginatedResponse(
-            items=items,
-            total=total,
-            page=page,
-            size=size,
-            pages=pages
-        )
+        # 仓库层数据结构确定，直接编码，不再逐行构建响应模型
+        return trusted_json_response({
+            "items": _hotel_items(hotels),
+            "total": total,
+            "page": page,
+            "size": size,
+            "pages": pages
+        }, response)
         
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except Exception as e:
         logger.error(f"获取酒店数据失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取酒店数据失败: {str(e)}")
@@ -66,13 +111,20 @@ async def get_hotels(
     description="根据ID获取单个酒店数据详情"
 )
 async def get_hotel(
+    request: Request,
+    response: Response,
     hotel_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取单个酒店数据"""
     try:
-        data_service = DataService(db)
-        hotel = data_service.get_hotel_by_id(hotel_id)
+        # 记录所属月份在查询前未知，使用任何导入都会推进的版本
+        not_modified = await check_data_version(request, response, [ALL_DATA_TAG])
+        if not_modified is not None:
+            return not_modified
+        
+        data_service = AsyncDataService(db)
+        hotel = await data_service.get_hotel_by_id(hotel_id)
         
         if not hotel:
             raise HTTPException(status_code=404, detail=f"未找到酒店ID: {hotel_id}")
@@ -93,14 +145,19 @@ async def get_hotel(
     description="获取酒店数据的摘要统计信息"
 )
 async def get_data_summary(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = Query(None, description="开始日期 (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)")
 ):
     """获取数据摘要"""
     try:
-        data_service = DataService(db)
-        summary = data_service.get_data_summary(start_date, end_date)
+        not_modified = await check_data_version(request, response, date_range_tags(start_date, end_date))
+        if not_modified is not None:
+            return not_modified
+        
+        # 同步服务在有界线程池中执行，不阻塞事件循环
+        summary = await run_with_session(lambda db: DataService(db).get_data_summary(start_date, end_date))
         
         return summary
         
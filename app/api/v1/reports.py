@@ -1,18 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+import contextlib
 import logging
+import math
 from typing import List, Optional, Dict, Any
-from app.config.database import get_db
-from app.schemas import ReportGenerationRequest, ReportResponse, ErrorResponse, PaginatedResponse, ReportCreate
+from app.config.database import get_db, run_with_session
+from app.schemas import ReportGenerationRequest, ReportResponse, ErrorResponse, PaginatedResponse, ReportCreate, BatchAnalysisRequest
 from typing import List
 from app.services.report_service import ReportService
 from datetime import datetime
 import json
 from app.utils.file_handler import generate_download_url
+from app.utils.http_cache import check_not_modified, datetime_version
+from app.utils.responses import sse_event
+from app.utils.exceptions import AIRateLimitError
 from app.models import Report
 # 删除不存在的导入
 from app.tasks.report_generation import generate_pdf_report, generate_ppt_report
-from app.tasks.ai_analysis import generate_ai_analysis
+from app.tasks.ai_analysis import generate_ai_analysis, generate_ai_analysis_batch
 from app.services.ai_service import AIService
 from app.api.middleware.auth import get_current_user
 import app.models as models
@@ -109,6 +115,8 @@ async def get_reports(
     description="根据ID获取报告详情"
 )
 async def get_report(
+    request: Request,
+    response: Response,
     report_id: int,
     db: Session = Depends(get_db)
 ):
@@ -120,6 +128,11 @@ async def get_report(
         if not report:
             raise HTTPException(status_code=404, detail=f"未找到报告ID: {report_id}")
         
+        # 报告状态由后台任务更新，以报告的更新时间作为版本
+        not_modified = check_not_modified(request, response, datetime_version(report.updated_at))
+        if not_modified is not None:
+            return not_modified
+        
         return ReportResponse(**report.to_dict())
         
     except HTTPException:
@@ -341,6 +354,19 @@ def regenerate_report(report_id: int, background_tasks: BackgroundTasks, db: Ses
     
     return {"message": "报告重新生成任务已启动"}
 
+@router.post("/analyze/batch")
+def analyze_reports_batch(request: BatchAnalysisRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """批量对报告进行AI分析，AI调用在任务中并发进行"""
+    found = {report_id for (report_id,) in db.query(Report.id).filter(Report.id.in_(request.report_ids)).all()}
+    missing = [report_id for report_id in request.report_ids if report_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"报告不存在: {missing}")
+    
+    # 启动批量AI分析任务
+    background_tasks.add_task(generate_ai_analysis_batch.delay, request.report_ids)
+    
+    return {"message": "批量AI分析任务已启动", "count": len(request.report_ids)}
+
 @router.post("/{report_id}/analyze")
 def analyze_report(report_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """对报告进行AI分析"""
@@ -355,6 +381,8 @@ def analyze_report(report_id: int, background_tasks: BackgroundTasks, db: Sessio
 
 @router.get("/{report_id}/analysis", response_model=Dict[str, Any])
 def get_report_analysis(
+    request: Request,
+    response: Response,
     report_id: int,
     analysis_type: str = Query("comprehensive", description="分析类型: comprehensive, revenue, operational, competitive, forecast"),
     db: Session = Depends(get_db)
@@ -366,6 +394,9 @@ def get_report_analysis(
     
     # 如果报告已有AI分析结果
     if report.ai_insights:
+        not_modified = check_not_modified(request, response, datetime_version(report.updated_at))
+        if not_modified is not None:
+            return not_modified
         return report.ai_insights
     
     # 如果没有分析结果，但有内容数据，尝试即时生成
@@ -388,7 +419,86 @@ def get_report_analysis(
             
             return analysis_result
             
+        except AIRateLimitError as e:
+            # 限流时告知客户端稍后重试
+            raise HTTPException(
+                status_code=429,
+                detail=e.message,
+                headers={"Retry-After": str(math.ceil(e.retry_after))}
+            )
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"生成AI分析失败: {str(e)}")
     
     raise HTTPException(status_code=404, detail="报告没有AI分析结果或内容数据")
+
+@router.get("/{report_id}/analysis/stream")
+async def stream_report_analysis(
+    report_id: int,
+    analysis_type: str = Query("comprehensive", description="分析类型: comprehensive, revenue, operational, competitive, forecast")
+):
+    """以server-sent events流式返回报告的AI分析
+    
+    事件依次为：若干 delta（{"text": 增量文本}），最后一个 result（解析后的完整结果，与
+    /{report_id}/analysis 相同）；失败时发送 error（{"detail": 错误信息}，限流时另有
+    retry_after，为建议的重试等待秒数）。
+    已有分析结果或命中缓存时直接发送 result。
+    """
+    def load_report(db: Session) -> Optional[Dict[str, Any]]:
+        report = db.query(Report).filter(Report.id == report_id).first()
+        if not report:
+            return None
+        return {"ai_insights": report.ai_insights, "content_data": report.content_data}
+    
+    report = await run_with_session(load_report)
+    if report is None:
+        raise HTTPException(status_code=404, detail="报告不存在")
+    if not report["ai_insights"] and not report["content_data"]:
+        raise HTTPException(status_code=404, detail="报告没有AI分析结果或内容数据")
+    
+    def save_insights(db: Session, analysis_result: Dict[str, Any]) -> None:
+        db.query(Report).filter(Report.id == report_id).update(
+            {"ai_insights": analysis_result, "updated_at": datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+    
+    async def events():
+        if report["ai_insights"]:
+            yield sse_event("result", report["ai_insights"])
+            return
+        
+        try:
+            hotel_ids = report["content_data"].get("hotel_ids", [])
+            date_range = report["content_data"].get("date_range", {})
+            cache_key, analysis_result, prompt = await run_with_session(
+                lambda db: AIService(db).prepare_analysis(hotel_ids, date_range, analysis_type)
+            )
+            
+            if analysis_result is None:
+                # 边生成边转发，结束后再整体解析并缓存
+                # 客户端断开时显式关闭上游流，及时释放AI并发名额
+                chunks = []
+                async with contextlib.aclosing(AIService.stream_ai_service(prompt)) as stream:
+                    async for text in stream:
+                        chunks.append(text)
+                        yield sse_event("delta", {"text": text})
+                analysis_result = await run_with_session(
+                    lambda db: AIService(db).complete_analysis(cache_key, "".join(chunks), analysis_type)
+                )
+            
+            await run_with_session(lambda db: save_insights(db, analysis_result))
+            yield sse_event("result", analysis_result)
+            
+        except AIRateLimitError as e:
+            logger.warning(f"流式生成AI分析被限流: {e.message}")
+            yield sse_event("error", {"detail": f"生成AI分析失败: {e.message}", "retry_after": e.retry_after})
+        except Exception as e:
+            logger.error(f"流式生成AI分析失败: {str(e)}")
+            yield sse_event("error", {"detail": f"生成AI分析失败: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # 禁止代理缓冲，保证增量内容立即送达
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
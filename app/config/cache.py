@@ -1,8 +1,18 @@
 import redis
+import redis.asyncio as redis_asyncio
+import asyncio
 import logging
-import json
-from typing import Any, Optional
+import math
+import random
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, Generator, Iterable, List, Optional, Tuple, Union
 from .settings import settings
+from .codec import codec
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -20,6 +30,27 @@ except Exception as e:
     logger.error(f"Redis连接池创建失败: {str(e)}")
     redis_client = None
 
+# 二进制Redis客户端，用于读写编解码后的缓存值
+try:
+    binary_redis_client = redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=False,
+        socket_timeout=5,
+        socket_connect_timeout=5,
+    )
+except Exception as e:
+    logger.error(f"Redis二进制连接池创建失败: {str(e)}")
+    binary_redis_client = None
+
+def get_binary_redis_client():
+    """
+    获取不解码响应的Redis客户端实例
+    
+    Returns:
+        Redis客户端实例
+    """
+    return binary_redis_client
+
 def get_redis_client():
     """
     获取Redis客户端实例
@@ -41,19 +72,608 @@ def get_redis_client():
             return None
     return redis_client
 
+# 缓存相关的键统一使用该前缀，清空缓存时只删除这些键（同一Redis库还承载Celery队列）
+CACHE_KEY_PREFIX = "cache:"
+CACHE_DATA_PREFIX = f"{CACHE_KEY_PREFIX}data:"
+CACHE_TAG_PREFIX = f"{CACHE_KEY_PREFIX}tag:"
+CACHE_LOCK_PREFIX = f"{CACHE_KEY_PREFIX}lock:"
+
+# 按时间窗口统计缓存命中率的计数，不使用缓存前缀，清空缓存时保留
+WINDOW_STATS_PREFIX = "stats:cache_window:"
+WINDOW_STATS_RETENTION = 30 * 86400
+
+# 数据版本水位：每个标签记录最近一次数据变更的时间（毫秒），用于HTTP条件请求
+# 不使用缓存前缀，清空缓存时保留
+DATA_VERSION_PREFIX = "data_version:"
+# 开始记录数据版本的时间，从未变更过的标签以该时间为版本
+DATA_VERSION_BASELINE_KEY = f"{DATA_VERSION_PREFIX}baseline"
+
+# 每次导入都会失效的标签，用于未指定日期范围（按当前日期取默认窗口）的缓存
+ALL_DATA_TAG = "all"
+
+# 仅当锁仍由自己持有时才释放
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# 只把版本调大，避免多个worker时钟偏差导致版本回退
+BUMP_VERSION_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    local current = tonumber(redis.call("get", key) or "0")
+    if tonumber(ARGV[1]) > current then
+        redis.call("set", key, ARGV[1])
+    end
+end
+return 1
+"""
+
+# 计算期间数据版本未变化时才写入缓存，避免导入前开始的计算在失效之后写回旧值
+# KEYS: 缓存键, n个数据版本键, 标签集合键...；ARGV: 缓存值, 有效期, n, n个计算前读取的版本（不存在为空串）, 缓存键名
+STORE_IF_UNCHANGED_SCRIPT = """
+local n = tonumber(ARGV[3])
+for i = 1, n do
+    if (redis.call("get", KEYS[i + 1]) or "") ~= ARGV[i + 3] then
+        return 0
+    end
+end
+redis.call("set", KEYS[1], ARGV[1], "ex", tonumber(ARGV[2]))
+for i = n + 2, #KEYS do
+    redis.call("sadd", KEYS[i], ARGV[n + 4])
+    redis.call("expire", KEYS[i], tonumber(ARGV[2]))
+end
+return 1
+"""
+
+# 原子地读取并删除标签集合及其中的缓存，避免读取后、删除前新加入标签集合的缓存丢失标签成员关系
+# KEYS: 标签集合键；ARGV: 缓存值键前缀。返回被删除的缓存键名（不含前缀）
+INVALIDATE_TAGS_SCRIPT = """
+local members = {}
+local seen = {}
+for _, tag_key in ipairs(KEYS) do
+    for _, member in ipairs(redis.call("smembers", tag_key)) do
+        if not seen[member] then
+            seen[member] = true
+            members[#members + 1] = member
+        end
+    end
+    redis.call("del", tag_key)
+end
+for i = 1, #members, 500 do
+    local batch = {}
+    for j = i, math.min(i + 499, #members) do
+        batch[#batch + 1] = ARGV[1] .. members[j]
+    end
+    redis.call("del", unpack(batch))
+end
+return members
+"""
+
+class LocalLRUCache:
+    """进程内有界LRU缓存（线程安全）"""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取未过期的缓存条目"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, expires_at = item
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+    
+    def set(self, key: str, entry: Dict[str, Any], ttl: float) -> None:
+        """写入缓存条目，超出容量时淘汰最久未使用的条目"""
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (entry, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def delete(self, key: str) -> None:
+        """删除缓存条目"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+# 进程内缓存实例
+local_cache = LocalLRUCache(settings.CACHE_LOCAL_MAX_ENTRIES)
+
+# 进程内按键分段的计算锁，同一进程内同一键只有一个线程重新计算
+_compute_locks = [threading.Lock() for _ in range(64)]
+
+def _compute_lock(key: str) -> threading.Lock:
+    """获取键对应的进程内计算锁"""
+    return _compute_locks[hash(key) % len(_compute_locks)]
+
+class _AsyncLoopState:
+    """单个事件循环内的异步Redis客户端和协程计算锁（redis.asyncio和asyncio对象不能跨事件循环使用）"""
+    
+    def __init__(self):
+        try:
+            self.redis = redis_asyncio.from_url(
+                settings.REDIS_URL,
+                decode_responses=False,
+                socket_timeout=5,
+                socket_connect_timeout=5,
+            )
+        except Exception as e:
+            logger.error(f"Redis异步连接池创建失败: {str(e)}")
+            self.redis = None
+        # 按键分段的协程计算锁
+        self.compute_locks = [asyncio.Lock() for _ in range(len(_compute_locks))]
+
+_async_states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncLoopState]" = weakref.WeakKeyDictionary()
+
+def _async_state() -> _AsyncLoopState:
+    """获取当前事件循环的异步状态，首次使用时创建"""
+    loop = asyncio.get_running_loop()
+    state = _async_states.get(loop)
+    if state is None:
+        state = _AsyncLoopState()
+        _async_states[loop] = state
+    return state
+
+def get_async_redis_client():
+    """
+    获取当前事件循环的异步二进制Redis客户端
+    
+    Returns:
+        redis.asyncio客户端实例，创建失败时返回None
+    """
+    return _async_state().redis
+
+def _should_refresh(entry: Dict[str, Any], beta: float, now: float) -> bool:
+    """
+    XFetch概率提前刷新判断
+    
+    越接近过期、计算耗时越长，越可能提前刷新，避免大量请求在同一时刻同时过期。
+    """
+    return now - entry["delta"] * beta * math.log(1.0 - random.random()) >= entry["expiry"]
+
+def _month_starts(start_day: date, end_day: date) -> List[date]:
+    """[start_day, end_day] 覆盖的各月份的第一天"""
+    months = []
+    month = start_day.replace(day=1)
+    while month <= end_day:
+        months.append(month)
+        month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return months
+
+def date_range_tags(
+    start_date: Optional[Union[str, date]],
+    end_date: Optional[Union[str, date]],
+    hotel_name: Optional[str] = None
+) -> List[str]:
+    """
+    生成日期范围对应的缓存标签
+    
+    每个覆盖的月份一个标签，指定酒店时标签限定到该酒店；
+    日期范围不完整时使用 ALL_DATA_TAG，任何导入都会使其失效。
+    
+    Args:
+        start_date: 开始日期（date或YYYY-MM-DD）
+        end_date: 结束日期（date或YYYY-MM-DD）
+        hotel_name: 可选，酒店名称
+        
+    Returns:
+        标签列表
+    """
+    try:
+        start_day = date.fromisoformat(start_date) if isinstance(start_date, str) else start_date
+        end_day = date.fromisoformat(end_date) if isinstance(end_date, str) else end_date
+    except ValueError:
+        return [ALL_DATA_TAG]
+    if not start_day or not end_day:
+        return [ALL_DATA_TAG]
+    
+    scope = f"hotel:{hotel_name}:" if hotel_name else ""
+    return [f"{scope}month:{month:%Y-%m}" for month in _month_starts(start_day, end_day)]
+
+def ingest_tags(hotel_months: Iterable[Tuple[str, date]]) -> List[str]:
+    """
+    生成一批导入数据需要失效的缓存标签
+    
+    Args:
+        hotel_months: 导入数据涉及的 (酒店名称, 日期) 组合
+        
+    Returns:
+        标签列表，包含全部酒店和单个酒店两种范围的月份标签
+    """
+    tags = {ALL_DATA_TAG}
+    for hotel_name, day in hotel_months:
+        tags.add(f"month:{day:%Y-%m}")
+        tags.add(f"hotel:{hotel_name}:month:{day:%Y-%m}")
+    return sorted(tags)
+
+def _window_stats_keys(days: int) -> List[str]:
+    """最近days天（含今天）的命中率计数键"""
+    today = date.today()
+    return [f"{WINDOW_STATS_PREFIX}{today - timedelta(days=offset):%Y-%m-%d}" for offset in range(days)]
+
+def _summarize_window_stats(daily_counts: Iterable[Dict[Any, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    汇总每日计数为各时间窗口的命中率
+    
+    Args:
+        daily_counts: 每天一个哈希，字段为 "{窗口}:hit" / "{窗口}:miss"
+        
+    Returns:
+        窗口到 hits、misses、requests、hit_rate 的映射
+    """
+    stats: Dict[str, Dict[str, Any]] = {}
+    for counts in daily_counts:
+        for field, count in (counts or {}).items():
+            field = field.decode() if isinstance(field, bytes) else field
+            window, _, outcome = field.rpartition(":")
+            item = stats.setdefault(window, {"hits": 0, "misses": 0})
+            item["hits" if outcome == "hit" else "misses"] += int(count)
+    for item in stats.values():
+        item["requests"] = item["hits"] + item["misses"]
+        item["hit_rate"] = round(item["hits"] / item["requests"], 4) if item["requests"] else 0
+    return stats
+
+class _RedisUnavailable(Exception):
+    """没有可用的Redis客户端"""
+
+# 同步、异步缓存共用的读写流程
+#
+# 流程写成生成器，只描述缓存格式、XFetch和单飞锁等决策，需要I/O时yield一个操作：
+#   ("redis", 方法名, args, kwargs)        执行一条Redis命令
+#   ("pipeline", [(方法名, args, kwargs)])  通过pipeline执行多条命令，返回结果列表
+#   ("sleep", 秒数)                         等待
+#   ("compute",)                            调用计算函数，返回计算结果
+#   ("lock", 键) / ("unlock", 键)           获取/释放进程内（线程或协程）计算锁
+# 由 _SyncCacheDriver / _AsyncCacheDriver 执行操作并把结果或异常送回生成器。
+
+def _decode_entry(key: str, value: Optional[bytes], now: float) -> Optional[Dict[str, Any]]:
+    """解码Redis中的缓存条目并回填进程内缓存，非 get_or_compute 写入的旧格式值按未命中处理"""
+    if not value:
+        return None
+    try:
+        entry = codec.loads(value)
+    except Exception as e:
+        logger.error(f"解析缓存失败: {key}: {str(e)}")
+        return None
+    if not isinstance(entry, dict) or "expiry" not in entry:
+        return None
+    local_cache.set(key, entry, min(settings.CACHE_LOCAL_TTL, entry["expiry"] - now))
+    return entry
+
+def _store_commands(
+    key: str,
+    entry: Dict[str, Any],
+    expire: int,
+    tags: List[str],
+    versions: Optional[Dict[str, Any]] = None
+) -> List[tuple]:
+    """
+    写入缓存条目并登记到各标签键集合的Redis命令
+    
+    给出计算前的数据版本快照时，生成一条脚本命令：基线或任一标签的版本已变化时不写入。
+    """
+    data_key = f"{CACHE_DATA_PREFIX}{key}"
+    payload = codec.dumps(entry)
+    tag_keys = [f"{CACHE_TAG_PREFIX}{tag}" for tag in tags]
+    
+    if versions is not None:
+        checked = [tag for tag in ["baseline"] + tags if tag in versions]
+        version_keys = [f"{DATA_VERSION_PREFIX}{tag}" for tag in checked]
+        expected = [versions[tag] or b"" for tag in checked]
+        return [("eval", (
+            STORE_IF_UNCHANGED_SCRIPT, 1 + len(version_keys) + len(tag_keys),
+            data_key, *version_keys, *tag_keys,
+            payload, expire, len(version_keys), *expected, key
+        ), {})]
+    
+    commands = [("set", (data_key, payload), {"ex": expire})]
+    for tag_key in tag_keys:
+        commands.append(("sadd", (tag_key, key), {}))
+        # 标签集合至少与其中的缓存存活一样久
+        commands.append(("expire", (tag_key, expire), {}))
+    return commands
+
+def _load_entry_flow(key: str):
+    """从Redis读取缓存条目并回填进程内缓存"""
+    try:
+        value = yield ("redis", "get", (f"{CACHE_DATA_PREFIX}{key}",), {})
+    except _RedisUnavailable:
+        return None
+    except Exception as e:
+        logger.error(f"获取缓存失败: {str(e)}")
+        return None
+    return _decode_entry(key, value, time.time())
+
+def _store_entry_flow(
+    key: str,
+    entry: Dict[str, Any],
+    expire: int,
+    tags: List[str],
+    versions: Optional[Dict[str, Any]] = None
+):
+    """写入Redis并登记到各标签的键集合，再写入进程内缓存；数据版本已变化时都不写入"""
+    try:
+        results = yield ("pipeline", _store_commands(key, entry, expire, tags, versions))
+        if versions is not None and not results[0]:
+            logger.info(f"计算期间数据已更新，不写入缓存: {key}")
+            return
+    except _RedisUnavailable:
+        pass
+    except Exception as e:
+        logger.error(f"设置缓存失败: {str(e)}")
+    local_cache.set(key, entry, min(settings.CACHE_LOCAL_TTL, expire))
+
+def _version_snapshot_flow(tags: Iterable[str]):
+    """读取基线和各标签的数据版本，Redis不可用时返回None"""
+    tags = sorted(set(tags) | {"baseline"})
+    try:
+        values = yield ("redis", "mget", ([f"{DATA_VERSION_PREFIX}{tag}" for tag in tags],), {})
+    except _RedisUnavailable:
+        return None
+    except Exception as e:
+        logger.error(f"获取数据版本失败: {str(e)}")
+        return None
+    return dict(zip(tags, values))
+
+def _acquire_lock_flow(lock_key: str, token: str):
+    """获取Redis计算锁，Redis不可用时视为获取成功"""
+    try:
+        acquired = yield ("redis", "set", (lock_key, token), {
+            "nx": True, "px": int(settings.CACHE_LOCK_TIMEOUT * 1000)
+        })
+    except _RedisUnavailable:
+        return True
+    except Exception as e:
+        logger.error(f"获取缓存锁失败: {str(e)}")
+        return True
+    return bool(acquired)
+
+def _release_lock_flow(lock_key: str, token: str):
+    """释放自己持有的Redis计算锁"""
+    try:
+        yield ("redis", "eval", (RELEASE_LOCK_SCRIPT, 1, lock_key, token), {})
+    except _RedisUnavailable:
+        pass
+    except Exception as e:
+        logger.error(f"释放缓存锁失败: {str(e)}")
+
+def _compute_single_flight_flow(key: str, expire: int, tags: List[str], stale: Optional[Dict[str, Any]]):
+    """获取Redis锁后重新计算；锁被占用时返回旧值或等待其他worker的结果"""
+    lock_key = f"{CACHE_LOCK_PREFIX}{key}"
+    token = uuid.uuid4().hex
+    acquired = yield from _acquire_lock_flow(lock_key, token)
+    
+    if not acquired:
+        # 其他worker正在刷新，有旧值时直接返回
+        if stale is not None:
+            return stale["value"]
+        deadline = time.time() + settings.CACHE_LOCK_WAIT
+        while time.time() < deadline:
+            yield ("sleep", 0.05)
+            entry = yield from _load_entry_flow(key)
+            if entry is not None:
+                return entry["value"]
+        logger.warning(f"等待缓存计算超时，自行计算: {key}")
+    
+    try:
+        # 计算前记录数据版本，计算期间发生导入时不写回结果
+        versions = yield from _version_snapshot_flow(tags)
+        started = time.time()
+        value = yield ("compute",)
+        finished = time.time()
+        yield from _store_entry_flow(key, {
+            "value": value,
+            "delta": finished - started,
+            "expiry": finished + expire
+        }, expire, tags, versions)
+        return value
+    finally:
+        if acquired:
+            yield from _release_lock_flow(lock_key, token)
+
+def _get_or_compute_flow(key: str, expire: int, tags: List[str], beta: float):
+    """读取缓存，未命中或需要提前刷新时在进程内锁和Redis锁下重新计算"""
+    entry = local_cache.get(key)
+    if entry is None:
+        entry = yield from _load_entry_flow(key)
+    if entry is not None and not _should_refresh(entry, beta, time.time()):
+        return entry["value"]
+    
+    yield ("lock", key)
+    try:
+        # 等锁期间同一进程内可能已经完成计算
+        latest = local_cache.get(key)
+        if latest is not None and latest is not entry and not _should_refresh(latest, beta, time.time()):
+            return latest["value"]
+        return (yield from _compute_single_flight_flow(key, expire, tags, entry))
+    finally:
+        yield ("unlock", key)
+
+def _get_many_flow(keys: List[str], beta: float):
+    """批量读取缓存，进程内未命中的键通过一次 MGET 从Redis读取"""
+    now = time.time()
+    entries: Dict[str, Dict[str, Any]] = {}
+    remote_keys = []
+    for key in dict.fromkeys(keys):
+        entry = local_cache.get(key)
+        if entry is None:
+            remote_keys.append(key)
+        else:
+            entries[key] = entry
+    
+    if remote_keys:
+        try:
+            values = yield ("redis", "mget", ([f"{CACHE_DATA_PREFIX}{key}" for key in remote_keys],), {})
+        except _RedisUnavailable:
+            values = []
+        except Exception as e:
+            logger.error(f"批量获取缓存失败: {str(e)}")
+            values = []
+        for key, value in zip(remote_keys, values):
+            entry = _decode_entry(key, value, now)
+            if entry is not None:
+                entries[key] = entry
+    
+    return {
+        key: entry["value"]
+        for key, entry in entries.items()
+        if not _should_refresh(entry, beta, now)
+    }
+
+def _set_many_flow(
+    items: Dict[str, Tuple[Any, List[str]]],
+    expire: int,
+    delta: float,
+    versions: Optional[Dict[str, Any]] = None
+):
+    """批量写入缓存，所有键和标签通过一个pipeline写入Redis；给出版本快照时跳过数据已变化的条目"""
+    if not items:
+        return
+    expiry = time.time() + expire
+    entries = {key: {"value": value, "delta": delta, "expiry": expiry} for key, (value, _) in items.items()}
+    commands = []
+    for key, (_, tags) in items.items():
+        commands.extend(_store_commands(key, entries[key], expire, tags, versions))
+    
+    stored = list(entries)
+    try:
+        results = yield ("pipeline", commands)
+        if versions is not None:
+            stored = [key for key, result in zip(entries, results) if result]
+            if len(stored) < len(entries):
+                logger.info(f"计算期间数据已更新，{len(entries) - len(stored)} 个缓存未写入")
+    except _RedisUnavailable:
+        pass
+    except Exception as e:
+        logger.error(f"批量设置缓存失败: {str(e)}")
+    for key in stored:
+        local_cache.set(key, entries[key], min(settings.CACHE_LOCAL_TTL, expire))
+
+def _get_window_stats_flow(days: int):
+    """获取最近days天各时间窗口的缓存命中率"""
+    try:
+        daily_counts = yield ("pipeline", [("hgetall", (stats_key,), {}) for stats_key in _window_stats_keys(days)])
+    except _RedisUnavailable:
+        return {}
+    except Exception as e:
+        logger.error(f"获取缓存命中率失败: {str(e)}")
+        return {}
+    return _summarize_window_stats(daily_counts)
+
+class _SyncCacheDriver:
+    """在当前线程中执行缓存流程的操作"""
+    
+    @staticmethod
+    def run(flow: Generator, compute: Optional[Callable[[], Any]] = None) -> Any:
+        result, error = None, None
+        while True:
+            try:
+                op = flow.throw(error) if error is not None else flow.send(result)
+            except StopIteration as stop:
+                return stop.value
+            result, error = None, None
+            try:
+                result = _SyncCacheDriver._execute(op, compute)
+            except BaseException as e:
+                error = e
+    
+    @staticmethod
+    def _execute(op: tuple, compute: Optional[Callable[[], Any]]) -> Any:
+        kind = op[0]
+        if kind == "compute":
+            return compute()
+        if kind == "lock":
+            _compute_lock(op[1]).acquire()
+            return None
+        if kind == "unlock":
+            _compute_lock(op[1]).release()
+            return None
+        if kind == "sleep":
+            time.sleep(op[1])
+            return None
+        
+        if not binary_redis_client:
+            raise _RedisUnavailable()
+        if kind == "redis":
+            _, method, args, kwargs = op
+            return getattr(binary_redis_client, method)(*args, **kwargs)
+        pipeline = binary_redis_client.pipeline(transaction=False)
+        for method, args, kwargs in op[1]:
+            getattr(pipeline, method)(*args, **kwargs)
+        return pipeline.execute()
+
+class _AsyncCacheDriver:
+    """在当前事件循环中执行缓存流程的操作"""
+    
+    @staticmethod
+    async def run(flow: Generator, compute: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        state = _async_state()
+        result, error = None, None
+        while True:
+            try:
+                op = flow.throw(error) if error is not None else flow.send(result)
+            except StopIteration as stop:
+                return stop.value
+            result, error = None, None
+            try:
+                result = await _AsyncCacheDriver._execute(state, op, compute)
+            except BaseException as e:
+                error = e
+    
+    @staticmethod
+    async def _execute(state: _AsyncLoopState, op: tuple, compute: Optional[Callable[[], Awaitable[Any]]]) -> Any:
+        kind = op[0]
+        if kind == "compute":
+            return await compute()
+        if kind == "lock":
+            await state.compute_locks[hash(op[1]) % len(state.compute_locks)].acquire()
+            return None
+        if kind == "unlock":
+            state.compute_locks[hash(op[1]) % len(state.compute_locks)].release()
+            return None
+        if kind == "sleep":
+            await asyncio.sleep(op[1])
+            return None
+        
+        if not state.redis:
+            raise _RedisUnavailable()
+        if kind == "redis":
+            _, method, args, kwargs = op
+            return await getattr(state.redis, method)(*args, **kwargs)
+        pipeline = state.redis.pipeline(transaction=False)
+        for method, args, kwargs in op[1]:
+            getattr(pipeline, method)(*args, **kwargs)
+        return await pipeline.execute()
+
 class CacheManager:
     """缓存管理器"""
     
     @staticmethod
     def get(key: str) -> Optional[Any]:
         """获取缓存值"""
-        if not redis_client:
+        if not binary_redis_client:
             return None
         
         try:
-            value = redis_client.get(key)
+            value = binary_redis_client.get(f"{CACHE_DATA_PREFIX}{key}")
             if value:
-                return json.loads(value)
+                return codec.loads(value)
             return None
         except Exception as e:
             logger.error(f"获取缓存失败: {str(e)}")
@@ -62,42 +682,328 @@ class CacheManager:
     @staticmethod
     def set(key: str, value: Any, expire: int = 3600) -> bool:
         """设置缓存值"""
-        if not redis_client:
+        if not binary_redis_client:
             return False
         
         try:
-            serialized_value = json.dumps(value)
-            redis_client.set(key, serialized_value, ex=expire)
+            serialized_value = codec.dumps(value)
+            binary_redis_client.set(f"{CACHE_DATA_PREFIX}{key}", serialized_value, ex=expire)
             return True
         except Exception as e:
             logger.error(f"设置缓存失败: {str(e)}")
             return False
     
+    @staticmethod
+    def get_or_compute(
+        key: str,
+        compute: Callable[[], Any],
+        expire: int = 3600,
+        tags: Optional[List[str]] = None,
+        beta: float = settings.CACHE_XFETCH_BETA
+    ) -> Any:
+        """
+        读取缓存，未命中或需要提前刷新时重新计算
+        
+        依次查询进程内LRU和Redis；重新计算时进程内与Redis锁双重单飞，
+        同一时刻只有一个worker计算，其余worker返回旧值或等待新值。
+        
+        Args:
+            key: 缓存键
+            compute: 计算缓存值的函数
+            expire: 缓存有效期（秒）
+            tags: 缓存标签，invalidate_tags 失效任一标签时删除该缓存
+            beta: XFetch提前刷新系数
+            
+        Returns:
+            缓存值或新计算的值
+        """
+        return _SyncCacheDriver.run(_get_or_compute_flow(key, expire, tags or [], beta), compute)
+    
+    @staticmethod
+    def get_many(keys: List[str], beta: float = settings.CACHE_XFETCH_BETA) -> Dict[str, Any]:
+        """
+        批量读取缓存，进程内未命中的键通过一次 MGET 从Redis读取
+        
+        Args:
+            keys: 缓存键列表
+            beta: XFetch提前刷新系数，需要提前刷新的条目按未命中处理
+            
+        Returns:
+            命中的缓存键到缓存值的映射
+        """
+        return _SyncCacheDriver.run(_get_many_flow(keys, beta))
+    
+    @staticmethod
+    def set_many(
+        items: Dict[str, Tuple[Any, List[str]]],
+        expire: int = 3600,
+        delta: float = 0.0,
+        versions: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        批量写入缓存，所有键和标签通过一个pipeline写入Redis
+        
+        Args:
+            items: 缓存键到 (缓存值, 标签列表) 的映射
+            expire: 缓存有效期（秒）
+            delta: 本批计算耗时（秒），用于XFetch提前刷新
+            versions: 计算前 snapshot_data_versions 的结果，标签版本已变化的条目不写入
+        """
+        _SyncCacheDriver.run(_set_many_flow(items, expire, delta, versions))
+    
+    @staticmethod
+    def snapshot_data_versions(tags: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """
+        读取基线和各标签当前的数据版本，在计算前调用并传给 set_many
+        
+        Args:
+            tags: 标签列表
+            
+        Returns:
+            标签到版本的映射，Redis不可用时返回None
+        """
+        return _SyncCacheDriver.run(_version_snapshot_flow(tags))
+    
+    @staticmethod
+    def get_window_stats(days: int = settings.CACHE_WINDOW_STATS_DAYS) -> Dict[str, Dict[str, Any]]:
+        """
+        获取最近days天各时间窗口的缓存命中率
+        
+        Args:
+            days: 统计天数（含今天）
+            
+        Returns:
+            窗口到 hits、misses、requests、hit_rate 的映射
+        """
+        return _SyncCacheDriver.run(_get_window_stats_flow(days))
+    
     @staticmethod
     def delete(key: str) -> bool:
         """删除缓存值"""
+        local_cache.delete(key)
         if not redis_client:
             return False
         
         try:
-            redis_client.delete(key)
+            redis_client.delete(f"{CACHE_DATA_PREFIX}{key}")
             return True
         except Exception as e:
             logger.error(f"删除缓存失败: {str(e)}")
             return False
     
+    @staticmethod
+    def invalidate_tags(tags: Iterable[str]) -> int:
+        """
+        删除带有任一指定标签的缓存，并将这些标签的数据版本更新为当前时间
+        
+        Args:
+            tags: 标签列表
+            
+        Returns:
+            删除的缓存数量
+        """
+        tags = list(tags)
+        tag_keys = [f"{CACHE_TAG_PREFIX}{tag}" for tag in tags]
+        if not tag_keys or not redis_client:
+            return 0
+        
+        CacheManager.bump_data_versions(tags)
+        try:
+            keys = redis_client.eval(INVALIDATE_TAGS_SCRIPT, len(tag_keys), *tag_keys, CACHE_DATA_PREFIX)
+            for key in keys:
+                local_cache.delete(key)
+            
+            logger.info(f"按标签失效缓存: {len(tag_keys)} 个标签, {len(keys)} 个缓存")
+            return len(keys)
+        except Exception as e:
+            logger.error(f"按标签失效缓存失败: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def bump_data_versions(tags: Iterable[str]) -> None:
+        """
+        将标签的数据版本更新为当前时间
+        
+        Args:
+            tags: 标签列表
+        """
+        version_keys = [f"{DATA_VERSION_PREFIX}{tag}" for tag in tags]
+        if not version_keys or not redis_client:
+            return
+        
+        try:
+            redis_client.eval(BUMP_VERSION_SCRIPT, len(version_keys), *version_keys, int(time.time() * 1000))
+        except Exception as e:
+            logger.error(f"更新数据版本失败: {str(e)}")
+    
     @staticmethod
     def clear_all() -> bool:
-        """清空所有缓存"""
+        """
+        清空所有缓存（只删除缓存前缀下的键，不影响同库的Celery数据）
+        
+        清空缓存通常意味着数据在导入之外发生了变化，同时推进数据版本基线，使所有条件请求失效。
+        """
+        local_cache.clear()
         if not redis_client:
             return False
         
+        CacheManager.bump_data_versions(["baseline"])
         try:
-            redis_client.flushdb()
+            batch = []
+            for key in redis_client.scan_iter(match=f"{CACHE_KEY_PREFIX}*", count=1000):
+                batch.append(key)
+                if len(batch) >= 500:
+                    redis_client.delete(*batch)
+                    batch = []
+            if batch:
+                redis_client.delete(*batch)
             return True
         except Exception as e:
             logger.error(f"清空缓存失败: {str(e)}")
             return False
 
+class AsyncCacheManager:
+    """缓存管理器（redis.asyncio版本），与 CacheManager 共用缓存流程，Redis客户端和计算锁按事件循环创建"""
+    
+    @staticmethod
+    async def get_or_compute(
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        expire: int = 3600,
+        tags: Optional[List[str]] = None,
+        beta: float = settings.CACHE_XFETCH_BETA
+    ) -> Any:
+        """
+        读取缓存，未命中或需要提前刷新时重新计算
+        
+        Args:
+            key: 缓存键
+            compute: 计算缓存值的协程函数
+            expire: 缓存有效期（秒）
+            tags: 缓存标签，invalidate_tags 失效任一标签时删除该缓存
+            beta: XFetch提前刷新系数
+            
+        Returns:
+            缓存值或新计算的值
+        """
+        return await _AsyncCacheDriver.run(_get_or_compute_flow(key, expire, tags or [], beta), compute)
+    
+    @staticmethod
+    async def get_many(keys: List[str], beta: float = settings.CACHE_XFETCH_BETA) -> Dict[str, Any]:
+        """
+        批量读取缓存，进程内未命中的键通过一次 MGET 从Redis读取
+        
+        需要提前刷新的条目按未命中处理，由调用方重新计算后通过 set_many 写回。
+        
+        Args:
+            keys: 缓存键列表
+            beta: XFetch提前刷新系数
+            
+        Returns:
+            命中的缓存键到缓存值的映射
+        """
+        return await _AsyncCacheDriver.run(_get_many_flow(keys, beta))
+    
+    @staticmethod
+    async def set_many(
+        items: Dict[str, Tuple[Any, List[str]]],
+        expire: int = 3600,
+        delta: float = 0.0,
+        versions: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        批量写入缓存，所有键和标签通过一个pipeline写入Redis
+        
+        Args:
+            items: 缓存键到 (缓存值, 标签列表) 的映射
+            expire: 缓存有效期（秒）
+            delta: 本批计算耗时（秒），用于XFetch提前刷新
+            versions: 计算前 snapshot_data_versions 的结果，标签版本已变化的条目不写入
+        """
+        await _AsyncCacheDriver.run(_set_many_flow(items, expire, delta, versions))
+    
+    @staticmethod
+    async def snapshot_data_versions(tags: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """
+        读取基线和各标签当前的数据版本，在计算前调用并传给 set_many
+        
+        Args:
+            tags: 标签列表
+            
+        Returns:
+            标签到版本的映射，Redis不可用时返回None
+        """
+        return await _AsyncCacheDriver.run(_version_snapshot_flow(tags))
+    
+    @staticmethod
+    async def get_window_stats(days: int = settings.CACHE_WINDOW_STATS_DAYS) -> Dict[str, Dict[str, Any]]:
+        """
+        获取最近days天各时间窗口的缓存命中率
+        
+        Args:
+            days: 统计天数（含今天）
+            
+        Returns:
+            窗口到 hits、misses、requests、hit_rate 的映射
+        """
+        return await _AsyncCacheDriver.run(_get_window_stats_flow(days))
+    
+    @staticmethod
+    async def record_window_access(accesses: Iterable[Tuple[str, bool]]) -> None:
+        """
+        记录按时间窗口分类的缓存访问，用于评估预热窗口
+        
+        Args:
+            accesses: (窗口名称, 是否命中) 列表
+        """
+        async_redis_client = get_async_redis_client()
+        if not async_redis_client:
+            return
+        
+        stats_key = f"{WINDOW_STATS_PREFIX}{date.today():%Y-%m-%d}"
+        try:
+            pipeline = async_redis_client.pipeline(transaction=False)
+            for window, hit in accesses:
+                pipeline.hincrby(stats_key, f"{window}:{'hit' if hit else 'miss'}", 1)
+            pipeline.expire(stats_key, WINDOW_STATS_RETENTION)
+            await pipeline.execute()
+        except Exception as e:
+            logger.error(f"记录缓存命中率失败: {str(e)}")
+    
+    @staticmethod
+    async def get_data_version(tags: Iterable[str]) -> Optional[int]:
+        """
+        获取一组标签的数据版本水位（各标签与基线版本的最大值）
+        
+        Args:
+            tags: 标签列表
+            
+        Returns:
+            毫秒时间戳，Redis不可用时返回None
+        """
+        async_redis_client = get_async_redis_client()
+        if not async_redis_client:
+            return None
+        
+        keys = [DATA_VERSION_BASELINE_KEY] + [f"{DATA_VERSION_PREFIX}{tag}" for tag in tags]
+        try:
+            values = await async_redis_client.mget(keys)
+            if values[0] is None:
+                # 首次使用时记录基线，此后的数据变更都会推进对应标签的版本
+                await async_redis_client.set(DATA_VERSION_BASELINE_KEY, int(time.time() * 1000), nx=True)
+                values[0] = await async_redis_client.get(DATA_VERSION_BASELINE_KEY)
+            return max(int(value) for value in values if value is not None)
+        except Exception as e:
+            logger.error(f"获取数据版本失败: {str(e)}")
+            return None
+    
+    @staticmethod
+    async def aclose() -> None:
+        """关闭当前事件循环的异步Redis客户端"""
+        state = _async_states.pop(asyncio.get_running_loop(), None)
+        if state is not None and state.redis is not None:
+            await state.redis.close()
+
 # 创建缓存管理器实例
-cache = CacheManager() 
\ No newline at end of file
+cache = CacheManager()
+async_cache = AsyncCacheManager() 
\ No newline at end of file
@@ -0,0 +1,204 @@
+import json
+import logging
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+from .settings import settings
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 条件导入，未安装的编码/压缩库不可用，自动回退
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# 缓存值格式：[版本][编码][压缩][负载]
+# 版本字节不可能是JSON文本的首字节，据此区分编码前写入的旧JSON缓存
+CODEC_VERSION = 1
+HEADER_SIZE = 3
+
+ENCODINGS = {"json": 0, "orjson": 1, "msgpack": 2}
+COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+
+_ENCODING_NAMES = {value: name for name, value in ENCODINGS.items()}
+_COMPRESSION_NAMES = {value: name for name, value in COMPRESSIONS.items()}
+
+
+def _available_encoding(name: str) -> str:
+    """解析配置的编码方式，auto 或库未安装时按 orjson > msgpack > json 回退"""
+    available = {"json": True, "orjson": orjson is not None, "msgpack": msgpack is not None}
+    if name in available and available[name]:
+        return name
+    if name != "auto":
+        logger.warning(f"缓存编码 {name} 不可用，自动选择")
+    return next(candidate for candidate in ("orjson", "msgpack", "json") if available[candidate])
+
+
+def _available_compression(name: str) -> str:
+    """解析配置的压缩方式，auto 或库未安装时按 zstd > lz4 > zlib 回退"""
+    available = {
+        "none": True,
+        "zlib": True,
+        "zstd": zstandard is not None,
+        "lz4": lz4_frame is not None,
+    }
+    if name in available and available[name]:
+        return name
+    if name != "auto":
+        logger.warning(f"缓存压缩 {name} 不可用，自动选择")
+    return next(candidate for candidate in ("zstd", "lz4", "zlib") if available[candidate])
+
+
+def json_default(value: Any) -> Any:
+    """orjson/json/msgpack无法直接序列化的类型，缓存与接口响应共用"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "item"):  # numpy标量
+        return value.item()
+    raise TypeError(f"无法序列化类型: {type(value).__name__}")
+
+
+# orjson编码选项：允许非字符串键（int/date等），序列化numpy数组
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+
+def _key_to_str(key: Any) -> str:
+    if isinstance(key, str):
+        return key
+    if key is None or isinstance(key, (bool, int, float)):
+        return json.dumps(key)
+    return str(json_default(key))
+
+
+def stringify_keys(value: Any) -> Any:
+    """
+    将字典键统一转换为字符串，与orjson的 OPT_NON_STR_KEYS 输出一致
+
+    标准库json不接受date等类型的键，msgpack会保留int键，编码前统一转换，
+    使不同编码写入的缓存解码后结构相同。
+
+    Args:
+        value: 待编码的值
+
+    Returns:
+        字典键均为字符串的值
+    """
+    if isinstance(value, dict):
+        return {_key_to_str(key): stringify_keys(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [stringify_keys(item) for item in value]
+    return value
+
+
+def _encode(value: Any, encoding: str) -> bytes:
+    if encoding == "orjson":
+        return orjson.dumps(value, default=json_default, option=ORJSON_OPTIONS)
+    if encoding == "msgpack":
+        return msgpack.packb(stringify_keys(value), default=json_default, use_bin_type=True)
+    return json.dumps(stringify_keys(value), ensure_ascii=False, default=json_default).encode()
+
+
+def _decode(payload: bytes, encoding: str) -> Any:
+    if encoding == "orjson":
+        return orjson.loads(payload)
+    if encoding == "msgpack":
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload)
+
+
+def _compress(payload: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(payload)
+    if compression == "lz4":
+        return lz4_frame.compress(payload)
+    if compression == "zlib":
+        return zlib.compress(payload, 1)
+    return payload
+
+
+def _decompress(payload: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if compression == "lz4":
+        return lz4_frame.decompress(payload)
+    if compression == "zlib":
+        return zlib.decompress(payload)
+    return payload
+
+
+class CacheCodec:
+    """缓存值编解码器：二进制编码 + 超过阈值时压缩"""
+
+    def __init__(self, encoding: str = "auto", compression: str = "auto", compress_threshold: int = 1024):
+        """
+        Args:
+            encoding: 编码方式，auto/orjson/msgpack/json
+            compression: 压缩方式，auto/zstd/lz4/zlib/none
+            compress_threshold: 编码后超过该字节数才压缩
+        """
+        self.encoding = _available_encoding(encoding)
+        self.compression = _available_compression(compression)
+        self.compress_threshold = compress_threshold
+
+    def dumps(self, value: Any) -> bytes:
+        """
+        编码缓存值
+
+        Args:
+            value: 可JSON序列化的值
+
+        Returns:
+            带格式头的字节串
+        """
+        payload = _encode(value, self.encoding)
+        compression = self.compression if len(payload) >= self.compress_threshold else "none"
+        header = bytes([CODEC_VERSION, ENCODINGS[self.encoding], COMPRESSIONS[compression]])
+        return header + _compress(payload, compression)
+
+    def loads(self, data: bytes) -> Any:
+        """
+        解码缓存值，按格式头中的编码和压缩方式解析，与当前配置无关
+
+        Args:
+            data: dumps 生成的字节串，或旧版本写入的JSON文本
+
+        Returns:
+            解码后的值
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        if not data or data[0] != CODEC_VERSION:
+            # 旧版本直接写入的JSON文本
+            return json.loads(data)
+
+        encoding = _ENCODING_NAMES[data[1]]
+        compression = _COMPRESSION_NAMES[data[2]]
+        return _decode(_decompress(data[HEADER_SIZE:], compression), encoding)
+
+
+# 默认编解码器实例
+codec = CacheCodec(
+    encoding=settings.CACHE_CODEC_ENCODING,
+    compression=settings.CACHE_CODEC_COMPRESSION,
+    compress_threshold=settings.CACHE_COMPRESS_THRESHOLD
+)
@@ -1,9 +1,14 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Callable, Optional, TypeVar
+import anyio
 import logging
 from .settings import settings
 
+T = TypeVar("T")
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -24,6 +29,22 @@ except Exception as e:
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 创建异步数据库引擎（asyncpg），未安装驱动时异步路由不可用
+try:
+    async_engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=5,
+        max_overflow=10,
+        pool_recycle=3600,
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+    logger.info("异步数据库引擎创建成功")
+except Exception as e:
+    logger.error(f"异步数据库引擎创建失败: {str(e)}")
+    async_engine = None
+    AsyncSessionLocal = None
+
 # 创建基类
 Base = declarative_base()
 
@@ -35,11 +56,51 @@ def get_db():
     finally:
         db.close()
 
+# 获取异步数据库会话
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("异步数据库引擎不可用，请安装asyncpg")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# 同步数据库操作的线程池容量限制（需在事件循环内创建）
+_db_threadpool_limiter: Optional[anyio.CapacityLimiter] = None
+
+def _get_db_threadpool_limiter() -> anyio.CapacityLimiter:
+    global _db_threadpool_limiter
+    if _db_threadpool_limiter is None:
+        _db_threadpool_limiter = anyio.CapacityLimiter(settings.DB_THREADPOOL_SIZE)
+    return _db_threadpool_limiter
+
+async def run_with_session(func: Callable[[Session], T]) -> T:
+    """
+    在有界线程池中使用独立的同步会话执行函数，避免阻塞事件循环
+    
+    线程数上限与同步连接池容量一致，超出的请求在事件循环中排队等待，而不是占用线程等待连接。
+    
+    Args:
+        func: 接收同步会话的函数，例如调用现有的同步服务
+        
+    Returns:
+        func 的返回值
+    """
+    def call() -> T:
+        db = SessionLocal()
+        try:
+            return func(db)
+        finally:
+            db.close()
+    
+    return await anyio.to_thread.run_sync(call, limiter=_get_db_threadpool_limiter())
+
 # 初始化数据库
 def init_db():
     try:
         # 创建所有表
         # 注意: 生产环境应该使用迁移工具如Alembic
+        with engine.begin() as connection:
+            # 子串搜索的GIN索引依赖pg_trgm扩展
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         Base.metadata.create_all(bind=engine)
         logger.info("数据库表创建成功")
     except Exception as e:
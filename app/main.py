@@ -1,10 +1,15 @@
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
 import time
 import logging
 from typing import Callable
 
+from app.api.middleware.compression import CompressionMiddleware
+from app.config.settings import settings
+from app.utils.responses import FastJSONResponse
+
 # 导入API路由
 from app.api.v1.upload import router as upload_router
 from app.api.v1.data import router as data_router
@@ -24,6 +29,7 @@ app = FastAPI(
     title="酒店业BI报告平台",
     description="智能化酒店业务数据分析与报告生成平台",
     version="0.1.0",
+    default_response_class=FastJSONResponse,
 )
 
 # 添加CORS中间件
@@ -35,6 +41,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩中间件（按Accept-Encoding协商br/gzip）
+if settings.RESPONSE_COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.RESPONSE_COMPRESSION_MIN_SIZE,
+        gzip_level=settings.RESPONSE_GZIP_LEVEL,
+        brotli_quality=settings.RESPONSE_BROTLI_QUALITY,
+    )
+
 # 请求处理时间中间件
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next: Callable):
@@ -76,12 +91,30 @@ async def startup_event():
         logger.info("数据库初始化成功")
     except Exception as e:
         logger.error(f"数据库初始化失败: {str(e)}")
+    
+    # 部署后预热常用时间窗口的仪表盘缓存（已缓存的组件会被跳过）
+    if settings.CACHE_WARM_ON_STARTUP:
+        from app.tasks.cache_warming import warm_dashboard_cache
+        
+        def trigger_cache_warm():
+            try:
+                warm_dashboard_cache.delay()
+            except Exception as e:
+                logger.warning(f"触发仪表盘缓存预热失败: {str(e)}")
+        
+        # 消息队列不可用时投递会重试，不阻塞启动
+        asyncio.get_running_loop().run_in_executor(None, trigger_cache_warm)
 
 # 应用关闭事件
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("应用关闭")
-    # 可以在这里添加资源清理操作
+    # 释放异步数据库连接池和Redis连接
+    from app.config.database import async_engine
+    from app.config.cache import async_cache
+    if async_engine is not None:
+        await async_engine.dispose()
+    await async_cache.aclose()
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,6 +1,7 @@
 from .hotel_data import HotelData
 from .kpi import KPIMetric
 from .report import Report
+from .rollup import HotelDataRollup, HotelDataRollupWatermark
 from .task import TaskStatus
 from ..config.database import Base
 
@@ -10,5 +11,7 @@ __all__ = [
     "HotelData",
     "KPIMetric",
     "Report",
+    "HotelDataRollup",
+    "HotelDataRollupWatermark",
     "TaskStatus"
 ] 
\ No newline at end of file
@@ -1,15 +1,49 @@
-from sqlalchemy import Column, String, Integer, Float, Date, Boolean, JSON, DateTime
+from sqlalchemy import Column, String, Integer, Float, Date, Boolean, JSON, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..config.database import Base
 
+# 同一酒店同一日期只保留一条记录，批量写入的 ON CONFLICT 依赖该约束
+HOTEL_DATA_UNIQUE_CONSTRAINT = "uq_hotel_data_hotel_name_date_recorded"
+
+def hotel_data_partition_name(month_start) -> str:
+    """hotel_data 月分区的表名，例如 hotel_data_p202610"""
+    return f"hotel_data_p{month_start.year:04d}{month_start.month:02d}"
+
 class HotelData(Base):
     """酒店数据模型"""
     
     __tablename__ = "hotel_data"
-    
-    # 主键
-    id = Column(Integer, primary_key=True, index=True)
+    __table_args__ = (
+        UniqueConstraint("hotel_name", "date_recorded", name=HOTEL_DATA_UNIQUE_CONSTRAINT),
+        # 覆盖日期范围分组查询，避免回表
+        Index(
+            "ix_hotel_data_date_recorded_hotel_name",
+            "date_recorded",
+            "hotel_name",
+            postgresql_include=["revenue", "rooms_occupied", "room_count"]
+        ),
+        # 游标分页按 (date_recorded, id) 倒序扫描
+        Index("ix_hotel_data_date_recorded_id", "date_recorded", "id"),
+        # 名称、位置子串搜索（ILIKE '%...%'）使用 pg_trgm GIN 索引
+        Index(
+            "ix_hotel_data_hotel_name_trgm",
+            "hotel_name",
+            postgresql_using="gin",
+            postgresql_ops={"hotel_name": "gin_trgm_ops"}
+        ),
+        Index(
+            "ix_hotel_data_location_trgm",
+            "location",
+            postgresql_using="gin",
+            postgresql_ops={"location": "gin_trgm_ops"}
+        ),
+        # 按 date_recorded 月度范围分区，分区键必须包含在主键和唯一约束中
+        {"postgresql_partition_by": "RANGE (date_recorded)"},
+    )
+    
+    # 主键（数据库主键为 (id, date_recorded)，ORM仍以id标识对象）
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     
     # 创建时间
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -41,8 +75,8 @@ class HotelData(Base):
     # 每可用房收入 (Revenue Per Available Room)
     revpar = Column(Float, nullable=True)
     
-    # 记录日期
-    date_recorded = Column(Date, nullable=True, index=True)
+    # 记录日期（分区键）
+    date_recorded = Column(Date, primary_key=True, nullable=False)
     
     # 数据来源
     data_source = Column(String(100), nullable=True)
@@ -56,8 +90,14 @@ class HotelData(Base):
     # 创建人ID
     created_by = Column(Integer, nullable=True)
     
-    # 关联的KPI指标
-    kpi_metrics = relationship("KPIMetric", back_populates="hotel_data")
+    # 关联的KPI指标（分区表的id不能单独作为外键目标，关联条件显式声明）
+    kpi_metrics = relationship(
+        "KPIMetric",
+        primaryjoin="HotelData.id == foreign(KPIMetric.hotel_id)",
+        back_populates="hotel_data"
+    )
+    
+    __mapper_args__ = {"primary_key": [id]}
     
     def __repr__(self):
         return f"<HotelData(id={self.id}, hotel_name='{self.hotel_name}', date='{self.date_recorded}')>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Date, ForeignKey, DateTime
+from sqlalchemy import Column, String, Integer, Float, Date, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..config.database import Base
@@ -7,6 +7,9 @@ class KPIMetric(Base):
     """KPI指标模型"""
     
     __tablename__ = "kpi_metric"
+    __table_args__ = (
+        Index("ix_kpi_metric_hotel_id_metric_name_period_start", "hotel_id", "metric_name", "period_start"),
+    )
     
     # 主键
     id = Column(Integer, primary_key=True, index=True)
@@ -17,8 +20,8 @@ class KPIMetric(Base):
     # 更新时间
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
-    # 关联的酒店数据ID
-    hotel_id = Column(Integer, ForeignKey("hotel_data.id"), nullable=False, index=True)
+    # 关联的酒店数据ID（hotel_data为分区表，不建立数据库外键）
+    hotel_id = Column(Integer, nullable=False)
     
     # 指标名称
     metric_name = Column(String(100), nullable=False)
@@ -39,7 +42,11 @@ class KPIMetric(Base):
     period_end = Column(Date, nullable=True)
     
     # 关联的酒店数据
-    hotel_data = relationship("HotelData", back_populates="kpi_metrics")
+    hotel_data = relationship(
+        "HotelData",
+        primaryjoin="foreign(KPIMetric.hotel_id) == HotelData.id",
+        back_populates="kpi_metrics"
+    )
     
     def __repr__(self):
         return f"<KPIMetric(id={self.id}, name='{self.metric_name}', value={self.metric_value})>"
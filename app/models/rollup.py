@@ -0,0 +1,104 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Date, DateTime, UniqueConstraint, Index
+from datetime import datetime
+from ..config.database import Base
+
+# 组合（全部酒店）汇总行使用的酒店名称
+PORTFOLIO_HOTEL_NAME = "__portfolio__"
+
+# 汇总粒度
+ROLLUP_GRAINS = ("day", "week", "month")
+
+# 汇总行唯一约束，增量刷新的 ON CONFLICT 依赖该约束
+HOTEL_DATA_ROLLUP_UNIQUE_CONSTRAINT = "uq_hotel_data_rollup_grain_hotel_period"
+
+# 覆盖水位表只有一行
+ROLLUP_WATERMARK_ID = 1
+
+class HotelDataRollup(Base):
+    """酒店数据预聚合模型（按日/周/月汇总，分酒店及全部酒店）"""
+    
+    __tablename__ = "hotel_data_rollup"
+    __table_args__ = (
+        UniqueConstraint("grain", "hotel_name", "period_start", name=HOTEL_DATA_ROLLUP_UNIQUE_CONSTRAINT),
+        # 覆盖跨酒店的周期范围查询（排名、窗口汇总）
+        Index(
+            "ix_hotel_data_rollup_grain_period_start",
+            "grain",
+            "period_start",
+            postgresql_include=["hotel_name", "revenue", "rooms_occupied", "rooms_available", "record_count"]
+        ),
+        # 酒店名称子串解析
+        Index(
+            "ix_hotel_data_rollup_hotel_name_trgm",
+            "hotel_name",
+            postgresql_using="gin",
+            postgresql_ops={"hotel_name": "gin_trgm_ops"}
+        ),
+    )
+    
+    # 主键
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # 创建时间
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # 更新时间
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # 汇总粒度 ('day', 'week', 'month')
+    grain = Column(String(10), nullable=False)
+    
+    # 酒店名称，全部酒店的汇总为 PORTFOLIO_HOTEL_NAME
+    hotel_name = Column(String(200), nullable=False)
+    
+    # 周期开始日期（周以周一开始，月以1日开始）
+    period_start = Column(Date, nullable=False)
+    
+    # 收入合计
+    revenue = Column(Float, nullable=True)
+    
+    # 已入住房间数合计
+    rooms_occupied = Column(BigInteger, nullable=True)
+    
+    # 可用房间数合计
+    rooms_available = Column(BigInteger, nullable=True)
+    
+    # 汇总的原始记录数
+    record_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<HotelDataRollup(grain='{self.grain}', hotel_name='{self.hotel_name}', period='{self.period_start}')>"
+    
+    # 通用方法
+    def to_dict(self):
+        """将模型转换为字典"""
+        result = {}
+        for column in self.__table__.columns:
+            value = getattr(self, column.name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            result[column.name] = value
+        return result
+
+
+class HotelDataRollupWatermark(Base):
+    """
+    预聚合汇总的覆盖水位（单行）
+    
+    period_start 不早于 covered_from 的汇总行与原始数据一致，查询起始日期早于水位
+    或没有水位行（汇总从未完整构建，或关闭汇总期间写入过数据）时改为聚合原始数据。
+    """
+    
+    __tablename__ = "hotel_data_rollup_watermark"
+    
+    # 主键，固定为 ROLLUP_WATERMARK_ID
+    id = Column(Integer, primary_key=True)
+    
+    # 汇总完整覆盖的最早日期
+    covered_from = Column(Date, nullable=False)
+    
+    # 更新时间
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<HotelDataRollupWatermark(covered_from='{self.covered_from}')>"
@@ -1,17 +1,39 @@
-from typing import Dict, List, Optional, Any, Tuple
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Tuple, Union
+import hashlib
+from datetime import date, datetime, timedelta
 import logging
 import pandas as pd
-from sqlalchemy import func, desc, and_, or_, text
+from sqlalchemy import func, desc, and_, or_, text, tuple_, insert, select, literal, null, cast, union_all, Date, Float
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
 from sqlalchemy.orm import Session
 
-from app.models.hotel_data import HotelData
+from app.models.hotel_data import HotelData, HOTEL_DATA_UNIQUE_CONSTRAINT, hotel_data_partition_name
 from app.models.kpi import KPIMetric
+from app.models.rollup import (
+    HotelDataRollup,
+    HotelDataRollupWatermark,
+    PORTFOLIO_HOTEL_NAME,
+    ROLLUP_GRAINS,
+    ROLLUP_WATERMARK_ID,
+    HOTEL_DATA_ROLLUP_UNIQUE_CONSTRAINT
+)
 from app.config.database import get_db
+from app.config.settings import settings
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 批量写入时每批的行数
+BULK_WRITE_BATCH_SIZE = 5000
+
+# 每条酒店数据生成的KPI指标及其类型
+KPI_METRIC_TYPES = {
+    "occupancy_rate": "occupancy",
+    "adr": "revenue",
+    "revpar": "revenue",
+    "revenue": "revenue"
+}
+
 class DataRepository:
     """
     数据仓库 - 封装所有数据库查询操作，提高查询效率
@@ -19,6 +41,12 @@ class DataRepository:
     
     def __init__(self, db: Session = None):
         self.db = db or next(get_db())
+        # 汇总覆盖水位，首次使用时读取
+        self._rollup_watermark_loaded = False
+        self._rollup_covered_from: Optional[date] = None
+        # 已确认存在的 hotel_data 分区，同一仓库实例（一次导入）内只查询一次系统目录
+        self._partitioned: Optional[bool] = None
+        self._known_partitions: Optional[set] = None
     
     def get_hotel_data_by_id(self, hotel_data_id: int) -> Optional[HotelData]:
         """
@@ -32,19 +60,85 @@ class DataRepository:
         """
         return self.db.query(HotelData).filter(HotelData.id == hotel_data_id).first()
     
-    def store_hotel_data(self, df: pd.DataFrame, overwrite: bool = False) -> Dict[str, Any]:
+    def get_hotel_data_by_ids(self, hotel_data_ids: List[int]) -> List[HotelData]:
+        """
+        通过ID批量获取酒店数据
+        
+        Args:
+            hotel_data_ids: 酒店数据ID列表
+            
+        Returns:
+            酒店数据对象列表（顺序不保证与输入一致）
+        """
+        unique_ids = list(dict.fromkeys(hotel_data_ids))
+        rows = []
+        for offset in range(0, len(unique_ids), BULK_WRITE_BATCH_SIZE):
+            batch = unique_ids[offset:offset + BULK_WRITE_BATCH_SIZE]
+            rows.extend(self.db.query(HotelData).filter(HotelData.id.in_(batch)).all())
+        return rows
+    
+    def store_hotel_data(self, df: pd.DataFrame, overwrite: bool = False, bulk: bool = True) -> Dict[str, Any]:
         """
         处理并存储酒店数据
         
         Args:
             df: 包含酒店数据的DataFrame
             overwrite: 是否覆盖已存在的数据
+            bulk: 是否使用批量写入模式（INSERT ... ON CONFLICT），False时逐行写入
             
         Returns:
             包含处理结果的字典
         """
+        df = self._prepare_hotel_frame(df)
+        
+        # 写入前确保目标月份的分区存在
+        if not df.empty:
+            self.ensure_partitions(df["date_recorded"].min(), df["date_recorded"].max())
+        
+        hotel_names = df["hotel_name"].unique().tolist()
+        
+        if bulk:
+            # 原始数据与受影响周期的汇总在同一事务中写入，汇总刷新失败时一起回滚
+            try:
+                # 批量模式同时返回入库后的数据，供calculate_hotel_kpis直接使用
+                stored = self._bulk_upsert_hotel_data(df, overwrite)
+                if not df.empty:
+                    self._refresh_rollups(hotel_names, df["date_recorded"].min(), df["date_recorded"].max())
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                # 事务内可能已更新过缓存的覆盖水位，回滚后重新读取
+                self._rollup_watermark_loaded = False
+                raise
+            return {"hotel_ids": stored["id"].tolist(), "frame": stored}
+        
+        # 逐行模式每行单独提交，汇总刷新失败时清除覆盖水位，查询回退到原始数据直到维护任务重建
+        result = {"hotel_ids": self._store_hotel_data_rowwise(df, overwrite)}
+        if not df.empty:
+            try:
+                self.refresh_rollups(hotel_names, df["date_recorded"].min(), df["date_recorded"].max())
+            except Exception as e:
+                self.db.rollback()
+                self._rollup_watermark_loaded = False
+                logger.error(f"刷新预聚合汇总失败，查询将回退到原始数据: {str(e)}")
+                self._clear_rollup_watermark()
+        
+        return result
+    
+    def _prepare_hotel_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        清洗数据并计算派生指标
+        
+        Args:
+            df: 原始酒店数据DataFrame
+            
+        Returns:
+            清洗后的DataFrame
+        """
         # 清洗数据
-        df = df.dropna(subset=["hotel_name", "date_recorded"])  # 删除关键列为空的行
+        df = df.dropna(subset=["hotel_name", "date_recorded"]).copy()  # 删除关键列为空的行
+        # 统一日期类型，保证与唯一约束 (hotel_name, date_recorded) 的比较口径一致
+        df["date_recorded"] = pd.to_datetime(df["date_recorded"]).dt.date
         df = df.drop_duplicates(subset=["hotel_name", "date_recorded"])  # 删除重复行
         
         # 计算入住率
@@ -63,7 +157,113 @@ class DataRepository:
             # 处理分母为0的情况
             df["revpar"] = df["revpar"].fillna(0)
         
-        # 存储数据
+        return df
+    
+    def _hotel_records(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        将DataFrame转换为hotel_data表的行字典，NaN统一转换为None
+        
+        Args:
+            df: 清洗后的酒店数据DataFrame
+            
+        Returns:
+            行字典列表
+        """
+        now = datetime.utcnow()
+        frame = pd.DataFrame({
+            "hotel_name": df["hotel_name"],
+            "location": df.get("location"),
+            "room_count": df.get("rooms_available"),
+            "rooms_occupied": df.get("rooms_occupied"),
+            "occupancy_rate": df.get("occupancy_rate"),
+            "revenue": df.get("revenue"),
+            "adr": df.get("adr"),
+            "revpar": df.get("revpar"),
+            "date_recorded": df["date_recorded"],
+        })
+        frame = frame.astype(object).where(pd.notna(frame), None)
+        
+        records = frame.to_dict("records")
+        for record in records:
+            record["is_validated"] = True
+            record["created_at"] = now
+            record["updated_at"] = now
+        return records
+    
+    def _bulk_upsert_hotel_data(self, df: pd.DataFrame, overwrite: bool) -> pd.DataFrame:
+        """
+        批量写入酒店数据，覆盖/跳过逻辑由 ON CONFLICT 在数据库端完成（不提交事务）
+        
+        Args:
+            df: 清洗后的酒店数据DataFrame
+            overwrite: 是否覆盖已存在的数据
+            
+        Returns:
+            入库后的数据（id、date_recorded及各指标列），行顺序与输入一致
+        """
+        stored_columns = ["id", "hotel_name", "date_recorded"] + list(KPI_METRIC_TYPES)
+        records = self._hotel_records(df)
+        if not records:
+            return pd.DataFrame(columns=stored_columns)
+        
+        table = HotelData.__table__
+        stmt = pg_insert(table)
+        if overwrite:
+            # 与逐行模式一致，仅覆盖指标字段
+            stmt = stmt.on_conflict_do_update(
+                constraint=HOTEL_DATA_UNIQUE_CONSTRAINT,
+                set_={
+                    "room_count": stmt.excluded.room_count,
+                    "rooms_occupied": stmt.excluded.rooms_occupied,
+                    "occupancy_rate": stmt.excluded.occupancy_rate,
+                    "revenue": stmt.excluded.revenue,
+                    "adr": stmt.excluded.adr,
+                    "revpar": stmt.excluded.revpar,
+                    "updated_at": stmt.excluded.updated_at,
+                }
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(constraint=HOTEL_DATA_UNIQUE_CONSTRAINT)
+        returning_columns = [table.c[column] for column in stored_columns]
+        stmt = stmt.returning(*returning_columns)
+        
+        stored_rows: Dict[Tuple[str, Any], Any] = {}
+        for offset in range(0, len(records), BULK_WRITE_BATCH_SIZE):
+            batch = records[offset:offset + BULK_WRITE_BATCH_SIZE]
+            # executemany + RETURNING 由SQLAlchemy展开为多行 INSERT ... VALUES
+            for row in self.db.execute(stmt, batch):
+                stored_rows[(row.hotel_name, row.date_recorded)] = row
+        
+        keys = [(record["hotel_name"], record["date_recorded"]) for record in records]
+        
+        # ON CONFLICT DO NOTHING 不返回已存在的记录，补查一次
+        missing_keys = [key for key in keys if key not in stored_rows]
+        for offset in range(0, len(missing_keys), BULK_WRITE_BATCH_SIZE):
+            batch = missing_keys[offset:offset + BULK_WRITE_BATCH_SIZE]
+            existing = self.db.execute(
+                select(*returning_columns).where(
+                    tuple_(table.c.hotel_name, table.c.date_recorded).in_(batch)
+                )
+            )
+            for row in existing:
+                stored_rows[(row.hotel_name, row.date_recorded)] = row
+        
+        return pd.DataFrame(
+            [tuple(stored_rows[key]) for key in keys if key in stored_rows],
+            columns=stored_columns
+        )
+    
+    def _store_hotel_data_rowwise(self, df: pd.DataFrame, overwrite: bool) -> List[int]:
+        """
+        逐行写入酒店数据（保留用于对比基准和兼容）
+        
+        Args:
+            df: 清洗后的酒店数据DataFrame
+            overwrite: 是否覆盖已存在的数据
+            
+        Returns:
+            酒店数据ID列表
+        """
         hotel_ids = []
         
         for _, row in df.iterrows():
@@ -81,6 +281,7 @@ class DataRepository:
             if existing_record and overwrite:
                 # 如果存在且覆盖，则更新
                 existing_record.room_count = row.get("rooms_available")
+                existing_record.rooms_occupied = row.get("rooms_occupied")
                 existing_record.occupancy_rate = row.get("occupancy_rate")
                 existing_record.revenue = row.get("revenue")
                 existing_record.adr = row.get("adr")
@@ -94,6 +295,7 @@ class DataRepository:
                     hotel_name=row["hotel_name"],
                     location=row.get("location"),
                     room_count=row.get("rooms_available"),
+                    rooms_occupied=row.get("rooms_occupied"),
                     occupancy_rate=row.get("occupancy_rate"),
                     revenue=row.get("revenue"),
                     adr=row.get("adr"),
@@ -105,52 +307,93 @@ class DataRepository:
                 self.db.commit()
                 hotel_ids.append(hotel_data.id)
         
-        return {"hotel_ids": hotel_ids}
+        return hotel_ids
     
-    def calculate_hotel_kpis(self, hotel_ids: List[int]) -> List[int]:
+    def calculate_hotel_kpis(self, hotel_ids: List[int], frame: Optional[pd.DataFrame] = None) -> List[int]:
         """
         计算酒店KPI指标
         
         Args:
             hotel_ids: 酒店数据ID列表
+            frame: 可选，已加载的酒店数据（需包含id、date_recorded及各指标列），
+                   为空时按ID批量查询
             
         Returns:
             KPI指标ID列表
         """
+        if not hotel_ids:
+            return []
+        
+        if frame is None:
+            frame = self._load_kpi_source_frame(hotel_ids)
+        
+        # 按hotel_ids顺序对齐数据，不存在的ID自动跳过
+        source = pd.DataFrame({"id": hotel_ids}).merge(
+            frame[["id", "date_recorded"] + list(KPI_METRIC_TYPES)],
+            on="id",
+            how="inner"
+        )
+        if source.empty:
+            return []
+        
+        # 宽表转长表：每个酒店数据行展开为四条KPI记录
+        source["_position"] = range(len(source))
+        long_frame = source.melt(
+            id_vars=["_position", "id", "date_recorded"],
+            value_vars=list(KPI_METRIC_TYPES),
+            var_name="metric_name",
+            value_name="metric_value"
+        ).sort_values("_position", kind="stable")
+        
+        now = datetime.utcnow()
+        kpi_frame = pd.DataFrame({
+            "hotel_id": long_frame["id"],
+            "metric_name": long_frame["metric_name"],
+            "metric_value": long_frame["metric_value"],
+            "metric_type": long_frame["metric_name"].map(KPI_METRIC_TYPES),
+            "period_type": "daily",
+            "period_start": long_frame["date_recorded"],
+            "period_end": long_frame["date_recorded"],
+            "created_at": now,
+            "updated_at": now,
+        })
+        records = kpi_frame.astype(object).where(pd.notna(kpi_frame), None).to_dict("records")
+        
+        # 批量插入并按参数顺序返回ID
+        table = KPIMetric.__table__
+        stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        
         kpi_ids = []
+        for offset in range(0, len(records), BULK_WRITE_BATCH_SIZE):
+            batch = records[offset:offset + BULK_WRITE_BATCH_SIZE]
+            kpi_ids.extend(self.db.execute(stmt, batch).scalars().all())
         
-        for hotel_id in hotel_ids:
-            # 获取酒店数据
-            hotel = self.db.query(HotelData).filter(HotelData.id == hotel_id).first()
-            if not hotel:
-                continue
-            
-            # 创建KPI指标
-            metrics = [
-                {"name": "occupancy_rate", "value": hotel.occupancy_rate, "type": "occupancy"},
-                {"name": "adr", "value": hotel.adr, "type": "revenue"},
-                {"name": "revpar", "value": hotel.revpar, "type": "revenue"},
-                {"name": "revenue", "value": hotel.revenue, "type": "revenue"}
-            ]
-            
-            for metric in metrics:
-                kpi = KPIMetric(
-                    hotel_id=hotel_id,
-                    metric_name=metric["name"],
-                    metric_value=metric["value"],
-                    metric_type=metric["type"],
-                    period_type="daily",
-                    period_start=hotel.date_recorded,
-                    period_end=hotel.date_recorded
-                )
-                self.db.add(kpi)
-                self.db.flush()
-                kpi_ids.append(kpi.id)
-            
-            self.db.commit()
+        self.db.commit()
         
         return kpi_ids
     
+    def _load_kpi_source_frame(self, hotel_ids: List[int]) -> pd.DataFrame:
+        """
+        按ID批量加载计算KPI所需的酒店数据
+        
+        Args:
+            hotel_ids: 酒店数据ID列表
+            
+        Returns:
+            包含id、date_recorded及各指标列的DataFrame
+        """
+        columns = [HotelData.id, HotelData.date_recorded] + [
+            getattr(HotelData, metric) for metric in KPI_METRIC_TYPES
+        ]
+        
+        rows = []
+        unique_ids = list(dict.fromkeys(hotel_ids))
+        for offset in range(0, len(unique_ids), BULK_WRITE_BATCH_SIZE):
+            batch = unique_ids[offset:offset + BULK_WRITE_BATCH_SIZE]
+            rows.extend(self.db.query(*columns).filter(HotelData.id.in_(batch)).all())
+        
+        return pd.DataFrame(rows, columns=["id", "date_recorded"] + list(KPI_METRIC_TYPES))
+    
     def get_hotel_data_by_date_range(
         self, 
         start_date: datetime, 
@@ -178,6 +421,32 @@ class DataRepository:
             
         return query.all()
     
+    def get_hotel_data_by_names(
+        self,
+        hotel_names: List[str],
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[HotelData]:
+        """
+        一次查询获取多个酒店在指定日期范围内的数据
+        
+        Args:
+            hotel_names: 酒店名称列表
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            按酒店名称和日期排序的酒店数据列表
+        """
+        if not hotel_names:
+            return []
+        
+        return self.db.query(HotelData).filter(
+            HotelData.hotel_name.in_(list(dict.fromkeys(hotel_names))),
+            HotelData.date_recorded >= start_date,
+            HotelData.date_recorded <= end_date
+        ).order_by(HotelData.hotel_name, HotelData.date_recorded).all()
+    
     def get_kpi_metrics_by_hotel_data_id(self, hotel_data_id: int) -> List[KPIMetric]:
         """
         获取指定酒店数据的KPI指标
@@ -190,6 +459,638 @@ class DataRepository:
         """
         return self.db.query(KPIMetric).filter(KPIMetric.hotel_id == hotel_data_id).all()
     
+    def ensure_partitions(self, start_date: date, end_date: date) -> List[str]:
+        """
+        确保覆盖日期范围的 hotel_data 月分区存在
+        
+        hotel_data 不是分区表（尚未执行分区迁移）时不做任何操作。
+        已存在的分区在仓库实例内缓存，分块导入时只在遇到新月份时查询系统目录。
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            新创建的分区名称列表
+        """
+        if self._partitioned is None:
+            self._partitioned = self._is_partitioned()
+        if not self._partitioned:
+            return []
+        
+        months = _month_starts(_as_date(start_date), _as_date(end_date))
+        if self._known_partitions is not None and all(
+            hotel_data_partition_name(month_start) in self._known_partitions for month_start in months
+        ):
+            return []
+        
+        self._known_partitions = {partition["name"] for partition in self.list_partitions()}
+        missing = [
+            month_start for month_start in months
+            if hotel_data_partition_name(month_start) not in self._known_partitions
+        ]
+        if not missing:
+            return []
+        
+        # 多个worker可能同时写入同一新月份，用事务级咨询锁串行化建分区
+        self.db.execute(text("SELECT pg_advisory_xact_lock(hashtext('hotel_data_partitions'))"))
+        created = []
+        for month_start in missing:
+            name = hotel_data_partition_name(month_start)
+            next_month = _period_end(month_start, "month") + timedelta(days=1)
+            self.db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF hotel_data "
+                f"FOR VALUES FROM ('{month_start.isoformat()}') TO ('{next_month.isoformat()}')"
+            ))
+            created.append(name)
+        self.db.commit()
+        self._known_partitions.update(created)
+        
+        logger.info(f"已创建hotel_data分区: {', '.join(created)}")
+        return created
+    
+    def list_partitions(self) -> List[Dict[str, Any]]:
+        """
+        列出 hotel_data 当前挂载的月分区
+        
+        Returns:
+            分区列表，包含name和month_start，按月份升序
+        """
+        rows = self.db.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass('hotel_data')"
+        ))
+        partitions = []
+        for (name,) in rows:
+            suffix = name[len("hotel_data_p"):]
+            if not name.startswith("hotel_data_p") or not suffix.isdigit() or len(suffix) != 6:
+                continue
+            partitions.append({
+                "name": name,
+                "month_start": date(int(suffix[:4]), int(suffix[4:]), 1)
+            })
+        return sorted(partitions, key=lambda partition: partition["month_start"])
+    
+    def archive_partitions(self, before: date, drop: bool = False) -> List[str]:
+        """
+        分离早于指定日期所在月份的 hotel_data 分区
+        
+        分离后的分区默认移动到归档schema（settings.PARTITION_ARCHIVE_SCHEMA），
+        需要时可以重新挂载；drop为True时直接删除。
+        依赖这些数据的 kpi_metric 行和截止月份之前的预聚合汇总行同时移到归档schema的同名表
+        （drop时删除），截止日期所在周的周汇总按剩余数据重新汇总，
+        汇总表和KPI始终与在线数据一致，之后再导入已归档的月份也只会按新数据汇总。
+        
+        Args:
+            before: 截止日期，早于该日期所在月份的分区会被分离
+            drop: 是否直接删除分离出的分区
+            
+        Returns:
+            被分离的分区名称列表
+        """
+        if not self._is_partitioned():
+            return []
+        
+        cutoff = _period_start(_as_date(before), "month")
+        schema = settings.PARTITION_ARCHIVE_SCHEMA
+        if not drop:
+            self.db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+            for table in ("kpi_metric", "hotel_data_rollup"):
+                self.db.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {schema}.{table} (LIKE {table} INCLUDING DEFAULTS)"
+                ))
+        
+        archived = []
+        for partition in self.list_partitions():
+            if partition["month_start"] >= cutoff:
+                break
+            name = partition["name"]
+            self.db.execute(text(f"ALTER TABLE hotel_data DETACH PARTITION {name}"))
+            kpi_filter = f"hotel_id IN (SELECT id FROM {name})"
+            if drop:
+                self.db.execute(text(f"DELETE FROM kpi_metric WHERE {kpi_filter}"))
+                self.db.execute(text(f"DROP TABLE {name}"))
+            else:
+                self._move_rows("kpi_metric", kpi_filter, schema)
+                self.db.execute(text(f"ALTER TABLE {name} SET SCHEMA {schema}"))
+            archived.append(name)
+        
+        if archived:
+            rollup_filter = f"period_start < '{cutoff.isoformat()}'"
+            if drop:
+                self.db.execute(text(f"DELETE FROM hotel_data_rollup WHERE {rollup_filter}"))
+            else:
+                self._move_rows("hotel_data_rollup", rollup_filter, schema)
+            # 跨截止日期的周按剩余数据重新汇总
+            if cutoff.weekday() != 0:
+                self._upsert_rollups(None, cutoff, cutoff)
+        self.db.commit()
+        
+        if self._known_partitions is not None:
+            self._known_partitions.difference_update(archived)
+        if archived:
+            logger.info(f"已{'删除' if drop else '归档'}hotel_data分区: {', '.join(archived)}")
+        return archived
+    
+    def _move_rows(self, table: str, condition: str, schema: str) -> None:
+        """将表中满足条件的行移动到归档schema的同名表（不提交事务）"""
+        self.db.execute(text(
+            f"WITH moved AS (DELETE FROM {table} WHERE {condition} RETURNING *) "
+            f"INSERT INTO {schema}.{table} SELECT * FROM moved"
+        ))
+    
+    def _is_partitioned(self) -> bool:
+        """hotel_data 是否为分区表"""
+        return bool(self.db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('hotel_data'))"
+        )).scalar())
+    
+    def refresh_rollups(self, hotel_names: List[str], start_date: date, end_date: date) -> None:
+        """
+        增量刷新受影响周期的预聚合汇总并提交
+        
+        受影响的日/周/月周期按原始数据整体重新汇总后写回汇总表，
+        同时刷新对应酒店和全部酒店（组合）的汇总行。
+        关闭汇总时只清除覆盖水位，重新启用后查询回退到原始数据，直到维护任务重建汇总。
+        
+        Args:
+            hotel_names: 本次写入涉及的酒店名称
+            start_date: 本次写入的最早日期
+            end_date: 本次写入的最晚日期
+        """
+        self._refresh_rollups(hotel_names, start_date, end_date)
+        self.db.commit()
+    
+    def _refresh_rollups(self, hotel_names: List[str], start_date: date, end_date: date) -> None:
+        """增量刷新受影响周期的预聚合汇总（不提交事务，参数同 refresh_rollups）"""
+        if not hotel_names:
+            return
+        if not settings.ROLLUP_ENABLED:
+            self._clear_rollup_watermark()
+            return
+        
+        start_day = _as_date(start_date)
+        end_day = _as_date(end_date)
+        self._upsert_rollups(hotel_names, start_day, end_day)
+        
+        # 写入早于水位的数据时，水位与本次写入之间没有原始数据才能把水位前移
+        covered_from = self.get_rollup_covered_from()
+        if covered_from is not None and start_day < covered_from:
+            gap_has_data = self.db.query(
+                self.db.query(HotelData.id).filter(
+                    HotelData.date_recorded > end_day,
+                    HotelData.date_recorded < covered_from
+                ).exists()
+            ).scalar()
+            if not gap_has_data:
+                self._set_rollup_watermark(start_day)
+    
+    def _upsert_rollups(self, hotel_names: Optional[List[str]], start_day: date, end_day: date) -> None:
+        """
+        按原始数据重新汇总受影响的完整周期并写回汇总表（不提交事务）
+        
+        Args:
+            hotel_names: 酒店名称，为None时汇总全部酒店
+            start_day: 最早日期
+            end_day: 最晚日期
+        """
+        table = HotelDataRollup.__table__
+        now = datetime.utcnow()
+        insert_columns = [
+            "grain", "hotel_name", "period_start", "revenue", "rooms_occupied",
+            "rooms_available", "record_count", "created_at", "updated_at"
+        ]
+        update_columns = ["revenue", "rooms_occupied", "rooms_available", "record_count", "updated_at"]
+        
+        for grain in ROLLUP_GRAINS:
+            # 扩展到完整周期，保证受影响周期按该周期的全部原始数据重新汇总
+            range_start = _period_start(start_day, grain)
+            range_end = _period_end(end_day, grain)
+            period_expr = _raw_period_expr(grain)
+            sums = [
+                func.sum(HotelData.revenue),
+                func.sum(HotelData.rooms_occupied),
+                func.sum(HotelData.room_count),
+                func.count(HotelData.id),
+                literal(now),
+                literal(now)
+            ]
+            date_filter = and_(
+                HotelData.date_recorded >= range_start,
+                HotelData.date_recorded <= range_end
+            )
+            
+            hotel_select = select(
+                literal(grain), HotelData.hotel_name, period_expr, *sums
+            ).where(date_filter)
+            if hotel_names is not None:
+                hotel_select = hotel_select.where(HotelData.hotel_name.in_(hotel_names))
+            hotel_select = hotel_select.group_by(HotelData.hotel_name, period_expr)
+            
+            portfolio_select = select(
+                literal(grain), literal(PORTFOLIO_HOTEL_NAME), period_expr, *sums
+            ).where(date_filter).group_by(period_expr)
+            
+            for source in (hotel_select, portfolio_select):
+                stmt = pg_insert(table).from_select(insert_columns, source)
+                stmt = stmt.on_conflict_do_update(
+                    constraint=HOTEL_DATA_ROLLUP_UNIQUE_CONSTRAINT,
+                    set_={column: stmt.excluded[column] for column in update_columns}
+                )
+                self.db.execute(stmt)
+    
+    def rebuild_rollups(self) -> None:
+        """
+        按全部原始数据重建预聚合汇总，并将覆盖水位设为最早
+        
+        在一个事务内清空汇总表后重新汇总，由维护任务在汇总不完整时调用。
+        """
+        self.db.execute(text("SELECT pg_advisory_xact_lock(hashtext('hotel_data_rollup_rebuild'))"))
+        self.db.query(HotelDataRollup).delete(synchronize_session=False)
+        
+        min_date, max_date = self.db.query(
+            func.min(HotelData.date_recorded),
+            func.max(HotelData.date_recorded)
+        ).one()
+        if min_date is not None:
+            self._upsert_rollups(None, _as_date(min_date), _as_date(max_date))
+        
+        self._set_rollup_watermark(date.min)
+        self.db.commit()
+        logger.info(f"已重建预聚合汇总: {min_date} ~ {max_date}")
+    
+    def rollups_complete(self) -> bool:
+        """
+        汇总是否覆盖全部原始数据
+        
+        Returns:
+            覆盖水位存在且不晚于最早的原始数据日期时返回True
+        """
+        covered_from = self.get_rollup_covered_from()
+        if covered_from is None:
+            return False
+        min_date = self.db.query(func.min(HotelData.date_recorded)).scalar()
+        return min_date is None or covered_from <= _as_date(min_date)
+    
+    def get_rollup_covered_from(self) -> Optional[date]:
+        """
+        读取汇总的覆盖水位（同一仓库实例内只查询一次）
+        
+        Returns:
+            汇总完整覆盖的最早日期，汇总不可用时返回None
+        """
+        if not self._rollup_watermark_loaded:
+            watermark = self.db.get(HotelDataRollupWatermark, ROLLUP_WATERMARK_ID)
+            self._rollup_covered_from = watermark.covered_from if watermark else None
+            self._rollup_watermark_loaded = True
+        return self._rollup_covered_from
+    
+    def _set_rollup_watermark(self, covered_from: date) -> None:
+        """写入覆盖水位（不提交事务）"""
+        stmt = pg_insert(HotelDataRollupWatermark.__table__).values(
+            id=ROLLUP_WATERMARK_ID, covered_from=covered_from, updated_at=datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={"covered_from": stmt.excluded.covered_from, "updated_at": stmt.excluded.updated_at}
+        )
+        self.db.execute(stmt)
+        self._rollup_covered_from = covered_from
+        self._rollup_watermark_loaded = True
+    
+    def _clear_rollup_watermark(self) -> None:
+        """清除覆盖水位：此后写入的数据不在汇总表中"""
+        if self.get_rollup_covered_from() is None:
+            return
+        self.db.query(HotelDataRollupWatermark).delete(synchronize_session=False)
+        self.db.commit()
+        self._rollup_covered_from = None
+        logger.warning("预聚合汇总已关闭，写入的数据不会进入汇总表，已清除汇总覆盖水位")
+    
+    def _use_rollup(self, start_date: Union[date, datetime]) -> bool:
+        """
+        日期范围能否由汇总表回答
+        
+        需要启用汇总，且查询起始日期不早于覆盖水位；否则回退到原始数据。
+        """
+        if not settings.ROLLUP_ENABLED:
+            return False
+        covered_from = self.get_rollup_covered_from()
+        return covered_from is not None and covered_from <= _as_date(start_date)
+    
+    def _aggregate_sums(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        group_by: str = "day",
+        hotel_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        按周期汇总收入、已入住房间数和可用房间数
+        
+        汇总表覆盖该日期范围时，完整的周/月直接读取对应粒度的汇总行，首尾不完整的部分读取日汇总，
+        查询量只与周期数相关；否则直接聚合原始数据。
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            group_by: 分组方式，可选值：day, week, month
+            hotel_name: 可选，酒店名称，为空时汇总全部酒店
+            
+        Returns:
+            按周期排序的汇总列表，包含period、revenue、rooms_occupied、rooms_available
+        """
+        statement = self._aggregate_sums_select(start_date, end_date, group_by, hotel_name)
+        statement = statement.order_by(statement.selected_columns.period)
+        
+        return [_sums_row(row, period=row.period) for row in self.db.execute(statement)]
+    
+    def _aggregate_sums_select(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        group_by: str = "day",
+        hotel_name: Optional[str] = None,
+        label: Optional[str] = None
+    ):
+        """
+        构建按周期汇总的查询语句（不排序），_aggregate_sums 和合并查询共用
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            group_by: 分组方式，可选值：day, week, month
+            hotel_name: 可选，酒店名称，为空时汇总全部酒店
+            label: 可选，结果行的标签列，用于 UNION ALL 合并后区分来源
+            
+        Returns:
+            列为 [label,] period、revenue、rooms_occupied、rooms_available 的select语句
+        """
+        if group_by not in ROLLUP_GRAINS:
+            group_by = "day"
+        start_day = _as_date(start_date)
+        end_day = _as_date(end_date)
+        
+        if self._use_rollup(start_day):
+            rollup = HotelDataRollup
+            if group_by == "day":
+                period_expr = rollup.period_start
+            else:
+                period_expr = cast(func.date_trunc(group_by, rollup.period_start), Date)
+            sums = (
+                func.sum(rollup.revenue),
+                func.sum(rollup.rooms_occupied),
+                func.sum(rollup.rooms_available)
+            )
+            conditions = [
+                rollup.hotel_name == (hotel_name or PORTFOLIO_HOTEL_NAME),
+                _rollup_segment_filter(start_day, end_day, group_by)
+            ]
+        else:
+            period_expr = _raw_period_expr(group_by)
+            sums = (
+                func.sum(HotelData.revenue),
+                func.sum(HotelData.rooms_occupied),
+                func.sum(HotelData.room_count)
+            )
+            conditions = [
+                HotelData.date_recorded >= start_day,
+                HotelData.date_recorded <= end_day
+            ]
+            # 添加酒店名称过滤
+            if hotel_name:
+                conditions.append(HotelData.hotel_name == hotel_name)
+        
+        columns = [
+            period_expr.label('period'),
+            sums[0].label('revenue'),
+            sums[1].label('rooms_occupied'),
+            sums[2].label('rooms_available')
+        ]
+        if label is not None:
+            columns.insert(0, literal(label).label('label'))
+        
+        # 分组
+        return select(*columns).where(*conditions).group_by(period_expr)
+    
+    def _aggregate_sums_by_hotel(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+        """
+        按酒店汇总指定日期范围内的收入、已入住房间数和可用房间数
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            汇总列表，包含hotel_name、revenue、rooms_occupied、rooms_available
+        """
+        start_day = _as_date(start_date)
+        end_day = _as_date(end_date)
+        
+        if self._use_rollup(start_day):
+            rollup = HotelDataRollup
+            query = self.db.query(
+                rollup.hotel_name,
+                func.sum(rollup.revenue).label('revenue'),
+                func.sum(rollup.rooms_occupied).label('rooms_occupied'),
+                func.sum(rollup.rooms_available).label('rooms_available')
+            ).filter(
+                rollup.hotel_name != PORTFOLIO_HOTEL_NAME,
+                _rollup_segment_filter(start_day, end_day, "month")
+            ).group_by(rollup.hotel_name)
+        else:
+            query = self.db.query(
+                HotelData.hotel_name,
+                func.sum(HotelData.revenue).label('revenue'),
+                func.sum(HotelData.rooms_occupied).label('rooms_occupied'),
+                func.sum(HotelData.room_count).label('rooms_available')
+            ).filter(
+                HotelData.date_recorded >= start_day,
+                HotelData.date_recorded <= end_day
+            ).group_by(HotelData.hotel_name)
+        
+        return [_sums_row(row, hotel_name=row.hotel_name) for row in query.all()]
+    
+    def get_data_fingerprint(self, start_date: datetime, end_date: datetime) -> str:
+        """
+        计算日期范围内数据的内容指纹
+        
+        由全部酒店的逐日汇总（启用汇总表时读取汇总行）和各酒店的区间明细统计组成，
+        明细统计覆盖AI提示词用到的全部字段（行数、收入、房间数、入住率、ADR、RevPAR、位置），
+        数据被修正、补录或删除时指纹随之改变；重新导入相同数据时指纹不变。
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            十六进制指纹字符串
+        """
+        digest = hashlib.sha1()
+        
+        def update(label: str, sums: Dict[str, Any]) -> None:
+            # 收入按分保留，避免浮点求和顺序造成的差异
+            digest.update(
+                f"{label}|{round(sums['revenue'], 2)}|{sums['rooms_occupied']:.0f}|{sums['rooms_available']:.0f};".encode()
+            )
+        
+        for row in self._aggregate_sums(start_date, end_date, group_by="day"):
+            update(str(row["period"]), row)
+        
+        # 各酒店的明细统计直接读取原始数据，位置按日期顺序拼接后在数据库中取摘要
+        location = func.coalesce(HotelData.location, '')
+        query = self.db.query(
+            HotelData.hotel_name,
+            func.count(HotelData.id).label('record_count'),
+            func.sum(HotelData.revenue).label('revenue'),
+            func.sum(HotelData.rooms_occupied).label('rooms_occupied'),
+            func.sum(HotelData.room_count).label('rooms_available'),
+            func.sum(HotelData.occupancy_rate).label('occupancy_rate'),
+            func.sum(HotelData.adr).label('adr'),
+            func.sum(HotelData.revpar).label('revpar'),
+            func.md5(func.string_agg(
+                location, aggregate_order_by(literal('|'), HotelData.date_recorded, location)
+            )).label('locations')
+        ).filter(
+            HotelData.date_recorded >= _as_date(start_date),
+            HotelData.date_recorded <= _as_date(end_date)
+        ).group_by(HotelData.hotel_name).order_by(HotelData.hotel_name)
+        
+        for row in query.all():
+            update(row.hotel_name, _sums_row(row))
+            rates = "|".join(
+                f"{round(float(value), 4) if value is not None else ''}"
+                for value in (row.occupancy_rate, row.adr, row.revpar)
+            )
+            digest.update(f"{row.record_count}|{rates}|{row.locations};".encode())
+        
+        return digest.hexdigest()
+    
+    def get_period_summaries(self, periods: Dict[str, Tuple[datetime, datetime]]) -> Dict[str, Dict[str, Any]]:
+        """
+        一次查询获取多个日期窗口的加权KPI汇总
+        
+        每个窗口一个带标签的子查询，通过 UNION ALL 合并为一条语句，
+        入住率、ADR、RevPAR按汇总值加权计算。
+        
+        Args:
+            periods: 窗口标签到 (开始日期, 结束日期) 的映射，例如 {"current": (...), "previous": (...)}
+            
+        Returns:
+            窗口标签到汇总结果的映射，包含revenue、rooms_occupied、rooms_available、
+            occupancy_rate、adr、revpar、hotel_count、record_count
+        """
+        summaries, _ = self.get_dashboard_aggregates(periods, {})
+        return summaries
+    
+    def get_dashboard_aggregates(
+        self,
+        periods: Dict[str, Tuple[datetime, datetime]],
+        trends: Dict[str, Tuple[datetime, datetime, str, List[str]]]
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        一条语句同时获取多个日期窗口的KPI汇总和多个趋势序列
+        
+        窗口汇总与趋势分组查询各自带标签，通过 UNION ALL 合并，只访问一次数据库；
+        窗口的入住率、ADR、RevPAR在同一语句中按汇总值加权计算。
+        
+        Args:
+            periods: 窗口标签到 (开始日期, 结束日期) 的映射
+            trends: 趋势标签到 (开始日期, 结束日期, 分组方式, 指标列表) 的映射
+            
+        Returns:
+            (窗口标签到汇总结果的映射（同 get_period_summaries），
+             趋势标签到趋势数据的映射（同 get_trend_metrics）)
+        """
+        selects = [self._period_summary_select(label, start_date, end_date)
+                   for label, (start_date, end_date) in periods.items()]
+        for label, (start_date, end_date, group_by, _) in trends.items():
+            trend_select = self._aggregate_sums_select(start_date, end_date, group_by, label=label)
+            # 与窗口汇总的列保持一致，趋势的加权指标由各周期的汇总值计算
+            selects.append(trend_select.add_columns(
+                cast(null(), Float).label('occupancy_rate'),
+                cast(null(), Float).label('adr'),
+                cast(null(), Float).label('revpar'),
+                literal(0).label('hotel_count'),
+                literal(0).label('record_count')
+            ))
+        if not selects:
+            return {}, {}
+        
+        statement = selects[0] if len(selects) == 1 else union_all(*selects)
+        
+        summaries = {}
+        trend_sums: Dict[str, List[Dict[str, Any]]] = {label: [] for label in trends}
+        for row in self.db.execute(statement):
+            if row.label in trend_sums:
+                trend_sums[row.label].append(_sums_row(row, period=row.period))
+                continue
+            summary = _sums_row(row)
+            for metric in ("occupancy_rate", "adr", "revpar"):
+                value = getattr(row, metric)
+                summary[metric] = float(value) if value is not None else 0
+            summary["hotel_count"] = int(row.hotel_count or 0)
+            summary["record_count"] = int(row.record_count or 0)
+            summaries[row.label] = summary
+        
+        trend_results = {}
+        for label, (_, _, group_by, metrics) in trends.items():
+            sums = sorted(trend_sums[label], key=lambda item: item["period"])
+            trend_results[label] = _trend_metrics(sums, metrics, None, group_by)
+        
+        return summaries, trend_results
+    
+    def _period_summary_select(self, label: str, start_date: datetime, end_date: datetime):
+        """
+        构建单个日期窗口加权KPI汇总的查询语句，period列为空，与趋势查询的列保持一致
+        
+        Args:
+            label: 窗口标签
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            select语句
+        """
+        start_day = _as_date(start_date)
+        end_day = _as_date(end_date)
+        
+        if self._use_rollup(start_day):
+            # 使用分酒店汇总行，便于同时统计酒店数量
+            source = HotelDataRollup
+            rooms_available_column = source.rooms_available
+            record_count = func.sum(source.record_count)
+            window_filter = and_(
+                source.hotel_name != PORTFOLIO_HOTEL_NAME,
+                _rollup_segment_filter(start_day, end_day, "month")
+            )
+        else:
+            source = HotelData
+            rooms_available_column = source.room_count
+            record_count = func.count(source.id)
+            window_filter = and_(
+                source.date_recorded >= start_day,
+                source.date_recorded <= end_day
+            )
+        
+        revenue = func.sum(source.revenue)
+        rooms_occupied = func.sum(source.rooms_occupied)
+        rooms_available = func.sum(rooms_available_column)
+        
+        return select(
+            literal(label).label('label'),
+            cast(null(), Date).label('period'),
+            revenue.label('revenue'),
+            rooms_occupied.label('rooms_occupied'),
+            rooms_available.label('rooms_available'),
+            (rooms_occupied * 100.0 / func.nullif(rooms_available, 0)).label('occupancy_rate'),
+            (revenue / func.nullif(rooms_occupied, 0)).label('adr'),
+            (revenue / func.nullif(rooms_available, 0)).label('revpar'),
+            func.count(source.hotel_name.distinct()).label('hotel_count'),
+            record_count.label('record_count')
+        ).where(window_filter)
+    
     def calculate_occupancy_rate(
         self, 
         start_date: datetime, 
@@ -209,43 +1110,17 @@ class DataRepository:
         Returns:
             入住率数据列表，包含日期和入住率
         """
-        # 根据分组方式选择日期表达式
-        if group_by == "day":
-            date_expr = func.date(HotelData.date_recorded)
-        elif group_by == "week":
-            date_expr = func.date_trunc('week', HotelData.date_recorded)
-        elif group_by == "month":
-            date_expr = func.date_trunc('month', HotelData.date_recorded)
-        else:
-            date_expr = func.date(HotelData.date_recorded)
-        
-        # 构建查询
-        query = self.db.query(
-            date_expr.label('date'),
-            func.sum(HotelData.rooms_occupied).label('rooms_occupied'),
-            func.sum(HotelData.rooms_available).label('rooms_available'),
-            (func.sum(HotelData.rooms_occupied) / func.nullif(func.sum(HotelData.rooms_available), 0) * 100).label('occupancy_rate')
-        ).filter(
-            HotelData.date_recorded >= start_date,
-            HotelData.date_recorded <= end_date
-        ).group_by(date_expr).order_by(date_expr)
-        
-        # 添加酒店名称过滤
-        if hotel_name:
-            query = query.filter(HotelData.hotel_name == hotel_name)
-        
-        # 执行查询
-        result = query.all()
+        sums = self._aggregate_sums(start_date, end_date, group_by, hotel_name)
         
         # 格式化结果
         return [
             {
-                "date": row.date.isoformat() if hasattr(row.date, 'isoformat') else str(row.date),
-                "rooms_occupied": float(row.rooms_occupied) if row.rooms_occupied is not None else 0,
-                "rooms_available": float(row.rooms_available) if row.rooms_available is not None else 0,
-                "occupancy_rate": float(row.occupancy_rate) if row.occupancy_rate is not None else 0
+                "date": item["period"].isoformat(),
+                "rooms_occupied": item["rooms_occupied"],
+                "rooms_available": item["rooms_available"],
+                "occupancy_rate": _metric_value("occupancy_rate", item)
             }
-            for row in result
+            for item in sums
         ]
     
     def calculate_revenue_metrics(
@@ -267,47 +1142,19 @@ class DataRepository:
         Returns:
             收入指标数据列表，包含日期、收入、ADR和RevPAR
         """
-        # 根据分组方式选择日期表达式
-        if group_by == "day":
-            date_expr = func.date(HotelData.date_recorded)
-        elif group_by == "week":
-            date_expr = func.date_trunc('week', HotelData.date_recorded)
-        elif group_by == "month":
-            date_expr = func.date_trunc('month', HotelData.date_recorded)
-        else:
-            date_expr = func.date(HotelData.date_recorded)
-        
-        # 构建查询
-        query = self.db.query(
-            date_expr.label('date'),
-            func.sum(HotelData.revenue).label('revenue'),
-            func.sum(HotelData.rooms_occupied).label('rooms_occupied'),
-            func.sum(HotelData.rooms_available).label('rooms_available'),
-            (func.sum(HotelData.revenue) / func.nullif(func.sum(HotelData.rooms_occupied), 0)).label('adr'),
-            (func.sum(HotelData.revenue) / func.nullif(func.sum(HotelData.rooms_available), 0)).label('revpar')
-        ).filter(
-            HotelData.date_recorded >= start_date,
-            HotelData.date_recorded <= end_date
-        ).group_by(date_expr).order_by(date_expr)
-        
-        # 添加酒店名称过滤
-        if hotel_name:
-            query = query.filter(HotelData.hotel_name == hotel_name)
-        
-        # 执行查询
-        result = query.all()
+        sums = self._aggregate_sums(start_date, end_date, group_by, hotel_name)
         
         # 格式化结果
         return [
             {
-                "date": row.date.isoformat() if hasattr(row.date, 'isoformat') else str(row.date),
-                "revenue": float(row.revenue) if row.revenue is not None else 0,
-                "adr": float(row.adr) if row.adr is not None else 0,
-                "revpar": float(row.revpar) if row.revpar is not None else 0,
-                "rooms_occupied": float(row.rooms_occupied) if row.rooms_occupied is not None else 0,
-                "rooms_available": float(row.rooms_available) if row.rooms_available is not None else 0
+                "date": item["period"].isoformat(),
+                "revenue": item["revenue"],
+                "adr": _metric_value("adr", item),
+                "revpar": _metric_value("revpar", item),
+                "rooms_occupied": item["rooms_occupied"],
+                "rooms_available": item["rooms_available"]
             }
-            for row in result
+            for item in sums
         ]
     
     def get_hotel_performance_comparison(
@@ -329,47 +1176,21 @@ class DataRepository:
         """
         result = {}
         
-        # 查询所有酒店
-        hotels = self.db.query(HotelData.hotel_name).distinct().all()
-        hotel_names = [hotel.hotel_name for hotel in hotels]
+        # 一次汇总各酒店数据，所有指标共用
+        hotel_sums = self._aggregate_sums_by_hotel(start_date, end_date)
         
-        # 构建查询
         for metric in metrics:
-            if metric == "occupancy_rate":
-                query = self.db.query(
-                    HotelData.hotel_name,
-                    (func.sum(HotelData.rooms_occupied) / func.nullif(func.sum(HotelData.rooms_available), 0) * 100).label('value')
-                )
-            elif metric == "adr":
-                query = self.db.query(
-                    HotelData.hotel_name,
-                    (func.sum(HotelData.revenue) / func.nullif(func.sum(HotelData.rooms_occupied), 0)).label('value')
-                )
-            elif metric == "revpar":
-                query = self.db.query(
-                    HotelData.hotel_name,
-                    (func.sum(HotelData.revenue) / func.nullif(func.sum(HotelData.rooms_available), 0)).label('value')
-                )
-            else:
+            if metric not in ("occupancy_rate", "adr", "revpar"):
                 continue
             
-            # 添加日期过滤
-            query = query.filter(
-                HotelData.date_recorded >= start_date,
-                HotelData.date_recorded <= end_date
-            ).group_by(HotelData.hotel_name).order_by(desc('value'))
-            
-            # 执行查询
-            metric_result = query.all()
-            
-            # 格式化结果
-            result[metric] = [
+            values = [
                 {
-                    "hotel_name": row.hotel_name,
-                    "value": float(row.value) if row.value is not None else 0
+                    "hotel_name": item["hotel_name"],
+                    "value": _metric_value(metric, item)
                 }
-                for row in metric_result
+                for item in hotel_sums
             ]
+            result[metric] = sorted(values, key=lambda item: item["value"], reverse=True)
         
         return result
     
@@ -394,54 +1215,16 @@ class DataRepository:
         Returns:
             趋势分析数据
         """
-        # 根据分组方式选择日期表达式
-        if group_by == "day":
-            date_expr = func.date(HotelData.date_recorded)
-        elif group_by == "week":
-            date_expr = func.date_trunc('week', HotelData.date_recorded)
-        elif group_by == "month":
-            date_expr = func.date_trunc('month', HotelData.date_recorded)
-        else:
-            date_expr = func.date(HotelData.date_recorded)
-        
-        # 构建查询
-        if metric == "occupancy_rate":
-            value_expr = (func.sum(HotelData.rooms_occupied) / func.nullif(func.sum(HotelData.rooms_available), 0) * 100)
-        elif metric == "adr":
-            value_expr = (func.sum(HotelData.revenue) / func.nullif(func.sum(HotelData.rooms_occupied), 0))
-        elif metric == "revpar":
-            value_expr = (func.sum(HotelData.revenue) / func.nullif(func.sum(HotelData.rooms_available), 0))
-        elif metric == "revenue":
-            value_expr = func.sum(HotelData.revenue)
-        else:
-            value_expr = func.sum(HotelData.revenue)  # 默认使用收入
-        
-        query = self.db.query(
-            date_expr.label('date'),
-            value_expr.label('value')
-        ).filter(
-            HotelData.date_recorded >= start_date,
-            HotelData.date_recorded <= end_date
-        )
-        
-        # 添加酒店名称过滤
-        if hotel_name:
-            query = query.filter(HotelData.hotel_name == hotel_name)
-        
-        # 分组和排序
-        query = query.group_by(date_expr).order_by(date_expr)
-        
-        # 执行查询
-        result = query.all()
+        trend_metrics = self.get_trend_metrics(start_date, end_date, [metric], hotel_name, group_by)
         
         # 计算同比和环比数据
         # 这里简化处理，仅返回原始趋势数据
         trend_data = [
             {
-                "date": row.date.isoformat() if hasattr(row.date, 'isoformat') else str(row.date),
-                "value": float(row.value) if row.value is not None else 0
+                "date": date_str,
+                "value": value
             }
-            for row in result
+            for date_str, value in zip(trend_metrics["dates"], trend_metrics["values"][metric])
         ]
         
         return {
@@ -451,6 +1234,32 @@ class DataRepository:
             "trend_data": trend_data
         }
     
+    def get_trend_metrics(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        metrics: List[str],
+        hotel_name: Optional[str] = None,
+        group_by: str = "day"
+    ) -> Dict[str, Any]:
+        """
+        一次分组查询获取多个指标的趋势数据
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            metrics: 指标名称列表
+            hotel_name: 可选，酒店名称
+            group_by: 分组方式，可选值：day, week, month
+            
+        Returns:
+            列式趋势数据，dates为周期列表，values为各指标与dates一一对应的数值列表
+        """
+        # 所有指标共用同一次汇总查询
+        sums = self._aggregate_sums(start_date, end_date, group_by, hotel_name)
+        
+        return _trend_metrics(sums, metrics, hotel_name, group_by)
+    
     def get_seasonal_patterns(
         self,
         year: int,
@@ -472,45 +1281,15 @@ class DataRepository:
         end_date = datetime(year, 12, 31)
         
         # 按月分组
-        date_expr = func.date_trunc('month', HotelData.date_recorded)
-        
-        # 构建查询
-        if metric == "occupancy_rate":
-            value_expr = (func.sum(HotelData.rooms_occupied) / func.nullif(func.sum(HotelData.rooms_available), 0) * 100)
-        elif metric == "adr":
-            value_expr = (func.sum(HotelData.revenue) / func.nullif(func.sum(HotelData.rooms_occupied), 0))
-        elif metric == "revpar":
-            value_expr = (func.sum(HotelData.revenue) / func.nullif(func.sum(HotelData.rooms_available), 0))
-        elif metric == "revenue":
-            value_expr = func.sum(HotelData.revenue)
-        else:
-            value_expr = func.sum(HotelData.revenue)  # 默认使用收入
-        
-        query = self.db.query(
-            func.extract('month', HotelData.date_recorded).label('month'),
-            value_expr.label('value')
-        ).filter(
-            HotelData.date_recorded >= start_date,
-            HotelData.date_recorded <= end_date
-        )
-        
-        # 添加酒店名称过滤
-        if hotel_name:
-            query = query.filter(HotelData.hotel_name == hotel_name)
-        
-        # 分组和排序
-        query = query.group_by('month').order_by('month')
-        
-        # 执行查询
-        result = query.all()
+        sums = self._aggregate_sums(start_date, end_date, "month", hotel_name)
         
         # 格式化结果
         monthly_data = [
             {
-                "month": int(row.month),
-                "value": float(row.value) if row.value is not None else 0
+                "month": item["period"].month,
+                "value": _metric_value(metric, item)
             }
-            for row in result
+            for item in sums
         ]
         
         return {
@@ -539,34 +1318,142 @@ class DataRepository:
         Returns:
             酒店排名数据
         """
-        # 构建查询
-        if metric == "occupancy_rate":
-            value_expr = (func.sum(HotelData.rooms_occupied) / func.nullif(func.sum(HotelData.rooms_available), 0) * 100)
-        elif metric == "adr":
-            value_expr = (func.sum(HotelData.revenue) / func.nullif(func.sum(HotelData.rooms_occupied), 0))
-        elif metric == "revpar":
-            value_expr = (func.sum(HotelData.revenue) / func.nullif(func.sum(HotelData.rooms_available), 0))
-        elif metric == "revenue":
-            value_expr = func.sum(HotelData.revenue)
-        else:
-            value_expr = func.sum(HotelData.revenue)  # 默认使用收入
-        
-        query = self.db.query(
-            HotelData.hotel_name,
-            value_expr.label('value')
-        ).filter(
-            HotelData.date_recorded >= start_date,
-            HotelData.date_recorded <= end_date
-        ).group_by(HotelData.hotel_name).order_by(desc('value')).limit(limit)
-        
-        # 执行查询
-        result = query.all()
+        hotel_sums = self._aggregate_sums_by_hotel(start_date, end_date)
         
         # 格式化结果
-        return [
+        rankings = [
             {
-                "hotel_name": row.hotel_name,
-                "value": float(row.value) if row.value is not None else 0
+                "hotel_name": item["hotel_name"],
+                "value": _metric_value(metric, item)
             }
-            for row in result
-        ]
\ No newline at end of file
+            for item in hotel_sums
+        ]
+        return sorted(rankings, key=lambda item: item["value"], reverse=True)[:limit]
+
+
+def _as_date(value: Union[date, datetime]) -> date:
+    """将datetime统一转换为date"""
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _period_start(day: date, grain: str) -> date:
+    """获取日期所在周期的开始日期（周以周一开始）"""
+    if grain == "week":
+        return day - timedelta(days=day.weekday())
+    if grain == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _period_end(day: date, grain: str) -> date:
+    """获取日期所在周期的结束日期"""
+    if grain == "week":
+        return _period_start(day, "week") + timedelta(days=6)
+    if grain == "month":
+        next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return next_month - timedelta(days=1)
+    return day
+
+
+def _month_starts(start_day: date, end_day: date) -> List[date]:
+    """[start_day, end_day] 覆盖的各月份的第一天"""
+    months = []
+    month_start = _period_start(start_day, "month")
+    while month_start <= end_day:
+        months.append(month_start)
+        month_start = _period_end(month_start, "month") + timedelta(days=1)
+    return months
+
+
+def _raw_period_expr(grain: str):
+    """原始数据按粒度分组的周期表达式（结果为周期开始日期）"""
+    if grain in ("week", "month"):
+        return cast(func.date_trunc(grain, HotelData.date_recorded), Date)
+    return HotelData.date_recorded
+
+
+def _rollup_segment_filter(start_day: date, end_day: date, grain: str):
+    """
+    构建覆盖 [start_day, end_day] 的汇总行过滤条件
+    
+    完整的周期读取grain粒度的汇总行，首尾不完整的部分读取日汇总行。
+    """
+    rollup = HotelDataRollup
+    
+    def day_rows(segment_start: date, segment_end: date):
+        return and_(
+            rollup.grain == "day",
+            rollup.period_start >= segment_start,
+            rollup.period_start <= segment_end
+        )
+    
+    if grain == "day":
+        return day_rows(start_day, end_day)
+    
+    first_full = start_day
+    if _period_start(start_day, grain) != start_day:
+        first_full = _period_end(start_day, grain) + timedelta(days=1)
+    last_full = end_day
+    if _period_end(end_day, grain) != end_day:
+        last_full = _period_start(end_day, grain) - timedelta(days=1)
+    
+    # 范围内没有完整周期
+    if first_full > last_full:
+        return day_rows(start_day, end_day)
+    
+    conditions = [
+        and_(
+            rollup.grain == grain,
+            rollup.period_start >= first_full,
+            rollup.period_start <= _period_start(last_full, grain)
+        )
+    ]
+    if start_day < first_full:
+        conditions.append(day_rows(start_day, first_full - timedelta(days=1)))
+    if last_full < end_day:
+        conditions.append(day_rows(last_full + timedelta(days=1), end_day))
+    return or_(*conditions)
+
+
+def _sums_row(row: Any, **keys: Any) -> Dict[str, Any]:
+    """将汇总查询结果行转换为字典，空值按0处理"""
+    return {
+        **keys,
+        "revenue": float(row.revenue) if row.revenue is not None else 0,
+        "rooms_occupied": float(row.rooms_occupied) if row.rooms_occupied is not None else 0,
+        "rooms_available": float(row.rooms_available) if row.rooms_available is not None else 0
+    }
+
+
+def _metric_value(metric: str, sums: Dict[str, Any]) -> float:
+    """根据汇总值计算加权指标，分母为0时返回0"""
+    revenue = sums["revenue"]
+    rooms_occupied = sums["rooms_occupied"]
+    rooms_available = sums["rooms_available"]
+    
+    if metric == "occupancy_rate":
+        return rooms_occupied / rooms_available * 100 if rooms_available else 0
+    if metric == "adr":
+        return revenue / rooms_occupied if rooms_occupied else 0
+    if metric == "revpar":
+        return revenue / rooms_available if rooms_available else 0
+    return revenue  # 默认使用收入
+
+
+def _trend_metrics(
+    sums: List[Dict[str, Any]],
+    metrics: List[str],
+    hotel_name: Optional[str],
+    group_by: str
+) -> Dict[str, Any]:
+    """将按周期排序的汇总转换为列式趋势数据（get_trend_metrics 的结果格式）"""
+    return {
+        "metrics": metrics,
+        "hotel_name": hotel_name,
+        "group_by": group_by,
+        "dates": [item["period"].isoformat() for item in sums],
+        "values": {
+            metric: [_metric_value(metric, item) for item in sums]
+            for metric in metrics
+        }
+    }
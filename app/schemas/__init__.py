@@ -3,7 +3,10 @@ from .requests import (
     DateRangeRequest,
     KPICalculationRequest,
     ReportGenerationRequest,
-    ReportCreate
+    ReportCreate,
+    DashboardWidgetSpec,
+    DashboardBatchRequest,
+    BatchAnalysisRequest
 )
 
 from .responses import (
@@ -14,7 +17,8 @@ from .responses import (
     KPIMetricResponse,
     ReportResponse,
     TaskStatusResponse,
-    PaginatedResponse
+    PaginatedResponse,
+    CursorPaginatedResponse
 )
 
 from .tasks import (
@@ -31,6 +35,9 @@ __all__ = [
     "KPICalculationRequest",
     "ReportGenerationRequest",
     "ReportCreate",
+    "DashboardWidgetSpec",
+    "DashboardBatchRequest",
+    "BatchAnalysisRequest",
     "BaseResponse",
     "ErrorResponse",
     "FileUploadResponse",
@@ -39,6 +46,7 @@ __all__ = [
     "ReportResponse",
     "TaskStatusResponse",
     "PaginatedResponse",
+    "CursorPaginatedResponse",
     "TaskBase",
     "TaskCreate",
     "TaskUpdate",
@@ -76,4 +76,57 @@ class ReportCreate(BaseModel):
         allowed_types = ['analysis', 'comparison', 'forecast']
         if v not in allowed_types:
             raise ValueError(f"不支持的报告类型，允许的类型: {', '.join(allowed_types)}")
-        return v 
\ No newline at end of file
+        return v 
+class DashboardWidgetSpec(BaseModel):
+    """仪表盘组件请求，参数与对应的单组件接口一致"""
+    id: str = Field(..., description="组件ID，响应中按该ID返回结果")
+    type: str = Field(..., description="组件类型: summary, trends, comparison")
+    start_date: Optional[str] = Field(None, description="开始日期 (YYYY-MM-DD)，summary/trends使用")
+    end_date: Optional[str] = Field(None, description="结束日期 (YYYY-MM-DD)，summary/trends使用")
+    metrics: str = Field("occupancy_rate,adr,revpar", description="趋势指标，逗号分隔，trends使用")
+    period: str = Field("daily", description="趋势周期: daily, weekly, monthly，trends使用")
+    metric: str = Field("occupancy_rate", description="对比指标，comparison使用")
+    current_start: Optional[str] = Field(None, description="当前周期开始日期，comparison使用")
+    current_end: Optional[str] = Field(None, description="当前周期结束日期，comparison使用")
+    previous_start: Optional[str] = Field(None, description="上一周期开始日期，comparison使用")
+    previous_end: Optional[str] = Field(None, description="上一周期结束日期，comparison使用")
+    
+    @validator('type')
+    def validate_type(cls, v):
+        allowed_types = ['summary', 'trends', 'comparison']
+        if v not in allowed_types:
+            raise ValueError(f"不支持的组件类型，允许的类型: {', '.join(allowed_types)}")
+        return v
+    
+    @validator('current_start', 'current_end', 'previous_start', 'previous_end', always=True)
+    def validate_comparison_dates(cls, v, values):
+        if values.get('type') == 'comparison' and not v:
+            raise ValueError("comparison组件必须提供当前周期和上一周期的日期")
+        return v
+
+class DashboardBatchRequest(BaseModel):
+    """仪表盘批量请求"""
+    widgets: List[DashboardWidgetSpec] = Field(..., description="组件列表")
+    
+    @validator('widgets')
+    def validate_widgets(cls, v):
+        if not v:
+            raise ValueError("组件列表不能为空")
+        if len(v) > 50:
+            raise ValueError("单次最多请求50个组件")
+        ids = [widget.id for widget in v]
+        if len(ids) != len(set(ids)):
+            raise ValueError("组件ID不能重复")
+        return v
+
+class BatchAnalysisRequest(BaseModel):
+    """批量AI分析请求"""
+    report_ids: List[int] = Field(..., description="报告ID列表")
+    
+    @validator('report_ids')
+    def validate_report_ids(cls, v):
+        if not v:
+            raise ValueError("报告ID列表不能为空")
+        if len(v) > 1000:
+            raise ValueError("单次最多分析1000个报告")
+        return list(dict.fromkeys(v))
@@ -73,6 +73,15 @@ class PaginatedResponse(BaseModel):
     size: int = Field(..., description="每页大小")
     pages: int = Field(..., description="总页数")
 
+class CursorPaginatedResponse(BaseModel):
+    """游标分页响应"""
+    items: List[Any] = Field(..., description="数据项")
+    size: int = Field(..., description="每页大小")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示没有更多数据")
+    has_more: bool = Field(..., description="是否还有更多数据")
+    total: Optional[int] = Field(None, description="总数（total_mode为none时为空）")
+    total_is_estimate: bool = Field(False, description="总数是否为查询计划估算值")
+
 class FileUrlResponse(BaseModel):
     """文件URL响应模式"""
     file_url: str
@@ -0,0 +1,441 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, TypeVar, Union
+import httpx
+import redis.asyncio as redis_asyncio
+from ..config.settings import settings
+from ..utils.exceptions import AIServiceError, AIRateLimitError
+from .ai_rate_limiter import (
+    AIRateLimiter,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_ORDER,
+    estimate_request_tokens,
+    estimate_tokens
+)
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 条件导入，未安装h2时使用HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 需要重试的HTTP状态码
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+SYSTEM_PROMPT = "你是一位专业的酒店业数据分析师，擅长分析酒店运营数据并提供洞察和建议。"
+
+T = TypeVar("T")
+
+
+def build_messages(prompt: str) -> List[Dict[str, str]]:
+    """
+    构建对话消息
+
+    Args:
+        prompt: 用户提示词
+
+    Returns:
+        包含系统提示和用户提示的消息列表
+    """
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头
+
+    Args:
+        value: 秒数或HTTP日期
+
+    Returns:
+        需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class PrioritySemaphore:
+    """
+    按优先级唤醒等待者的信号量：交互请求先于批量请求，同优先级先到先得
+
+    只在单个事件循环（进程）内生效；跨进程由共享限流器的批量保留配额和Celery的独立队列区分优先级。
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: List[tuple] = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority: str = PRIORITY_INTERACTIVE) -> None:
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITY_ORDER.get(priority, 0), next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 已被唤醒但随即取消时，把名额交给下一个等待者
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+    @asynccontextmanager
+    async def slot(self, priority: str = PRIORITY_INTERACTIVE) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class _LoopState:
+    """单个事件循环内的连接池、并发信号量和限流器（httpx、asyncio和redis.asyncio对象不能跨事件循环使用）"""
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(
+            http2=settings.AI_HTTP2 and HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(settings.AI_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.AI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AI_MAX_CONNECTIONS,
+                keepalive_expiry=60.0
+            )
+        )
+        self.semaphore = PrioritySemaphore(settings.AI_MAX_CONCURRENCY)
+        try:
+            self.redis = redis_asyncio.from_url(settings.REDIS_URL, socket_timeout=5, socket_connect_timeout=5)
+        except Exception as e:
+            logger.error(f"AI限流Redis连接创建失败: {str(e)}")
+            self.redis = None
+        self.rate_limiter = AIRateLimiter(self.redis)
+
+
+class _Attempt:
+    """一次AI请求：成功的响应，以及调用方读取完响应后登记的实际用量"""
+
+    def __init__(self):
+        self.response: Optional[httpx.Response] = None
+        self.completed = False
+        self.total_tokens: Optional[int] = None
+
+    def complete(self, total_tokens: Optional[int]) -> None:
+        """
+        登记响应已完整读取
+
+        Args:
+            total_tokens: 实际用量，未知时为None（保留估算值，不修正）
+        """
+        self.completed = True
+        self.total_tokens = total_tokens
+
+
+class AIClient:
+    """
+    AI接口客户端（进程内共享）
+
+    每个事件循环复用一个连接池（支持HTTP/2时使用HTTP/2），并发数受优先级信号量限制；
+    发送前按估算的token数从Redis共享的RPM/TPM配额中扣减，响应后按实际用量修正；
+    429/5xx按 Retry-After 或指数退避重试，收到429时所有进程一起暂停。
+    同步代码（Celery任务、同步服务）通过 run_sync 在后台事件循环中执行。
+    """
+
+    def __init__(self):
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+        self._paused_until = 0.0
+        self._background_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._background_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = _LoopState()
+            self._states[loop] = state
+        return state
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        priority: str = PRIORITY_INTERACTIVE
+    ) -> str:
+        """
+        调用对话补全接口
+
+        Args:
+            messages: 对话消息
+            temperature: 采样温度
+            max_tokens: 最大输出token数
+            priority: 请求优先级，interactive 或 batch
+
+        Returns:
+            AI响应内容
+        """
+        payload = self._build_payload(messages, temperature, max_tokens)
+        estimated_tokens = estimate_request_tokens(messages, max_tokens)
+        async with self._request(payload, priority=priority, estimated_tokens=estimated_tokens) as usage:
+            result = usage.response.json()
+            usage.complete((result.get("usage") or {}).get("total_tokens"))
+
+        # 提取回答
+        if "choices" in result and len(result["choices"]) > 0:
+            return result["choices"][0]["message"]["content"]
+        raise AIServiceError("AI响应格式无效")
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        priority: str = PRIORITY_INTERACTIVE
+    ) -> AsyncIterator[str]:
+        """
+        以流式方式调用对话补全接口（stream: true），逐段返回生成的文本
+
+        只在收到响应前重试；流开始后中断会抛出 AIServiceError。
+
+        Args:
+            messages: 对话消息
+            temperature: 采样温度
+            max_tokens: 最大输出token数
+            priority: 请求优先级，interactive 或 batch
+
+        Yields:
+            增量文本片段
+        """
+        payload = self._build_payload(messages, temperature, max_tokens)
+        payload["stream"] = True
+        estimated_tokens = estimate_request_tokens(messages, max_tokens)
+        completion_tokens = 0
+        async with self._request(
+            payload, stream=True, priority=priority, estimated_tokens=estimated_tokens
+        ) as usage:
+            try:
+                async for line in usage.response.aiter_lines():
+                    # SSE格式：data: {...}，以 data: [DONE] 结束
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or []
+                    content = choices[0].get("delta", {}).get("content") if choices else None
+                    if content:
+                        completion_tokens += estimate_tokens(content)
+                        yield content
+            except httpx.HTTPError as e:
+                logger.error(f"AI服务流式响应中断: {str(e)}")
+                raise AIServiceError(f"AI服务流式响应中断: {str(e)}")
+            except ValueError as e:
+                logger.error(f"AI服务流式响应格式无效: {str(e)}")
+                raise AIServiceError("AI响应格式无效")
+            # 流式响应不含用量，按估算的输出token数修正
+            usage.complete(estimated_tokens - max_tokens + completion_tokens)
+
+    async def complete_many(self, message_lists: List[List[Dict[str, str]]], **kwargs: Any) -> List[Union[str, Exception]]:
+        """
+        并发调用多个对话补全，并发数受信号量限制
+
+        Args:
+            message_lists: 每个请求的对话消息
+            **kwargs: 传给 complete 的参数
+
+        Returns:
+            与输入顺序一致的响应内容，失败的请求对应异常对象
+        """
+        return await asyncio.gather(
+            *(self.complete(messages, **kwargs) for messages in message_lists),
+            return_exceptions=True
+        )
+
+    @staticmethod
+    def _build_payload(messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        return {
+            "model": settings.AI_MODEL,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+
+    @asynccontextmanager
+    async def _request(
+        self,
+        payload: Dict[str, Any],
+        stream: bool = False,
+        priority: str = PRIORITY_INTERACTIVE,
+        estimated_tokens: int = 0
+    ) -> AsyncIterator[_Attempt]:
+        """
+        等待配额后发送请求，按需重试，返回成功的一次请求
+
+        响应在上下文内有效，期间一直占用一个并发名额（流式响应读取完毕前不释放）。
+        调用方读取完响应后调用 complete 登记实际用量；每次请求结束时按用量修正TPM桶，
+        未得到完整响应的请求（重试、网络错误、调用方出错或中断）退还全部token，只保留请求次数的扣减。
+        """
+        if not settings.AI_API_KEY:
+            raise AIServiceError("未配置AI API密钥")
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {settings.AI_API_KEY}"
+        }
+        state = self._state()
+
+        for attempt in range(settings.AI_MAX_RETRIES + 1):
+            # 其他请求收到429时一起暂停
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                # 加随机抖动，避免暂停结束时所有请求同时重发
+                await asyncio.sleep(pause + self._jitter())
+            # 所有进程共享的RPM/TPM配额，等待过久时抛出 AIRateLimitError
+            await state.rate_limiter.acquire(estimated_tokens, priority)
+            attempt_usage = _Attempt()
+
+            try:
+                async with state.semaphore.slot(priority):
+                    request = state.client.build_request("POST", settings.AI_API_URL, json=payload, headers=headers)
+                    try:
+                        response = await state.client.send(request, stream=stream)
+                    except httpx.RequestError as e:
+                        if attempt >= settings.AI_MAX_RETRIES:
+                            logger.error(f"AI服务请求错误: {str(e)}")
+                            raise AIServiceError(f"AI服务请求错误: {str(e)}")
+                        delay = self._backoff(attempt)
+                        logger.warning(f"AI服务请求错误，{delay:.1f}秒后重试: {str(e)}")
+                    else:
+                        try:
+                            if response.status_code in RETRYABLE_STATUS_CODES and attempt < settings.AI_MAX_RETRIES:
+                                retry_after = parse_retry_after(response.headers.get("retry-after"))
+                                if retry_after is not None:
+                                    delay = min(retry_after, settings.AI_RETRY_MAX_DELAY)
+                                else:
+                                    delay = self._backoff(attempt)
+                                if response.status_code == 429:
+                                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                                    await state.rate_limiter.pause(delay)
+                                if retry_after is not None:
+                                    delay += self._jitter()
+                                logger.warning(f"AI服务返回{response.status_code}，{delay:.1f}秒后重试（第{attempt + 1}次）")
+                            else:
+                                if response.status_code >= 400:
+                                    await response.aread()
+                                self._raise_for_status(response)
+                                attempt_usage.response = response
+                                yield attempt_usage
+                                return
+                        finally:
+                            await response.aclose()
+            finally:
+                await state.rate_limiter.settle(
+                    estimated_tokens, attempt_usage.total_tokens if attempt_usage.completed else 0
+                )
+
+            # 等待期间不占用并发名额
+            await asyncio.sleep(delay)
+
+        raise AIServiceError("AI服务重试次数已用尽")
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """带随机抖动的指数退避"""
+        delay = settings.AI_RETRY_BASE_DELAY * (2 ** attempt)
+        return min(settings.AI_RETRY_MAX_DELAY, delay) * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _jitter() -> float:
+        """Retry-After 之外附加的随机等待，分散同时重试的请求"""
+        return random.uniform(0, settings.AI_RETRY_BASE_DELAY)
+
+    @staticmethod
+    def _raise_for_status(response: httpx.Response) -> None:
+        """将HTTP错误转换为 AIServiceError（429为 AIRateLimitError）"""
+        if response.status_code < 400:
+            return
+        logger.error(f"AI服务HTTP错误: {response.status_code} {response.text[:200]}")
+
+        # 处理常见HTTP错误
+        if response.status_code == 401:
+            raise AIServiceError("AI服务认证失败，请检查API密钥")
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            raise AIRateLimitError(
+                "AI服务请求过于频繁，请稍后再试",
+                retry_after=retry_after if retry_after is not None else settings.AI_RETRY_MAX_DELAY
+            )
+        if response.status_code >= 500:
+            raise AIServiceError("AI服务暂时不可用，请稍后再试")
+        raise AIServiceError(f"AI服务HTTP错误: {response.status_code}")
+
+    def _ensure_background_loop(self) -> asyncio.AbstractEventLoop:
+        """启动（或在fork后重新启动）后台事件循环线程"""
+        with self._lock:
+            if self._background_loop is None or self._background_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="ai-client-loop", daemon=True)
+                thread.start()
+                self._background_loop = loop
+                self._background_pid = os.getpid()
+            return self._background_loop
+
+    def run_sync(self, coroutine: Awaitable[T]) -> T:
+        """
+        在后台事件循环中执行协程并等待结果，供同步代码使用
+
+        同一进程内的所有同步调用共用后台事件循环的连接池和信号量。
+
+        Args:
+            coroutine: 要执行的协程，例如 ai_client.complete(...)
+
+        Returns:
+            协程的返回值
+        """
+        loop = self._ensure_background_loop()
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环的连接池"""
+        state = self._states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.client.aclose()
+            if state.redis is not None:
+                await state.redis.aclose()
+
+
+# 进程内共享的AI客户端
+ai_client = AIClient()
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+from ..config.settings import settings
+from ..utils.exceptions import AIRateLimitError
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 请求优先级：交互请求（用户触发的分析）优先于批量请求（夜间批量分析）
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITY_ORDER = {PRIORITY_INTERACTIVE: 0, PRIORITY_BATCH: 1}
+
+# 限流相关的键，不使用缓存前缀，清空缓存时保留
+RATE_LIMIT_PREFIX = "ai_ratelimit:"
+RPM_BUCKET_KEY = f"{RATE_LIMIT_PREFIX}rpm"
+TPM_BUCKET_KEY = f"{RATE_LIMIT_PREFIX}tpm"
+PAUSE_KEY = f"{RATE_LIMIT_PREFIX}paused_until"
+
+# Redis出错后暂停使用限流的时长（秒），避免每次请求都等待连接超时
+REDIS_ERROR_BACKOFF = 30
+
+# 同时从RPM和TPM两个令牌桶扣减，任一不足时都不扣减，返回需要等待的毫秒数
+# KEYS: RPM桶, TPM桶, 暂停键；ARGV: RPM配额, TPM配额, 请求数, token数, 保留比例
+# 桶按每分钟配额匀速补充，使用Redis服务器时间，不受worker时钟偏差影响
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call("time")
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local paused_until = tonumber(redis.call("get", KEYS[3]) or "0")
+if paused_until > now then
+    return paused_until - now
+end
+
+local reserve = tonumber(ARGV[5])
+local wait = 0
+local levels = {}
+for i = 1, 2 do
+    local limit = tonumber(ARGV[i])
+    if limit > 0 then
+        local data = redis.call("hmget", KEYS[i], "tokens", "ts")
+        local tokens = tonumber(data[1]) or limit
+        local ts = tonumber(data[2]) or now
+        tokens = math.min(limit, tokens + math.max(0, now - ts) * limit / 60000)
+        -- 超过桶容量的请求在桶满时放行
+        local cost = math.min(tonumber(ARGV[i + 2]), limit)
+        local required = math.min(limit, cost + reserve * limit)
+        if tokens < required then
+            wait = math.max(wait, math.ceil((required - tokens) * 60000 / limit))
+        end
+        levels[i] = {tokens - cost, limit}
+    end
+end
+
+if wait > 0 then
+    return wait
+end
+for i, level in pairs(levels) do
+    redis.call("hset", KEYS[i], "tokens", level[1], "ts", now)
+    redis.call("pexpire", KEYS[i], 120000)
+end
+return 0
+"""
+
+# 按实际用量修正TPM桶：ARGV[1]为多扣（正数退还）或少扣（负数补扣）的token数
+SETTLE_SCRIPT = """
+local tokens = tonumber(redis.call("hget", KEYS[1], "tokens"))
+if not tokens then
+    return 0
+end
+redis.call("hset", KEYS[1], "tokens", math.min(tonumber(ARGV[2]), tokens + tonumber(ARGV[1])))
+return 1
+"""
+
+# 只把暂停截止时间调大
+PAUSE_SCRIPT = """
+local now_parts = redis.call("time")
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local until_ms = now + tonumber(ARGV[1])
+if until_ms > tonumber(redis.call("get", KEYS[1]) or "0") then
+    redis.call("set", KEYS[1], until_ms, "px", tonumber(ARGV[1]))
+end
+return 1
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的token数
+
+    中日韩字符约0.6个token，其他字符约0.3个token，偏保守，实际用量在响应后修正。
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的token数
+    """
+    cjk = sum(1 for char in text if "\u3000" <= char <= "\u9fff" or "\uff00" <= char <= "\uffef")
+    return int(cjk * 0.6 + (len(text) - cjk) * 0.3) + 1
+
+
+def estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """
+    估算一次对话补全请求占用的token配额（提示词 + 最大输出）
+
+    Args:
+        messages: 对话消息
+        max_tokens: 最大输出token数
+
+    Returns:
+        估算的token数
+    """
+    # 每条消息约有4个token的格式开销
+    return sum(estimate_tokens(message.get("content", "")) + 4 for message in messages) + max_tokens
+
+
+class AIRateLimiter:
+    """
+    所有进程共享的AI请求配额（基于Redis的RPM/TPM令牌桶）
+
+    批量请求只能使用 AI_BATCH_RESERVE 之外的配额，保留部分始终留给交互请求；
+    任一进程收到429时写入共享的暂停时间，所有进程一起暂停。
+    Redis不可用时暂时不限流（仍受进程内并发数限制）。
+    """
+
+    def __init__(self, redis_client: Any):
+        """
+        Args:
+            redis_client: 当前事件循环的 redis.asyncio 客户端，可以为None
+        """
+        self.redis = redis_client
+        self._disabled_until = 0.0
+
+    def _available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._disabled_until
+
+    def _on_error(self, action: str, error: Exception) -> None:
+        logger.warning(f"{action}失败，{REDIS_ERROR_BACKOFF}秒内不限流: {str(error)}")
+        self._disabled_until = time.monotonic() + REDIS_ERROR_BACKOFF
+
+    async def acquire(self, tokens: int, priority: str = PRIORITY_INTERACTIVE) -> None:
+        """
+        等待配额并扣减一次请求和token
+
+        Args:
+            tokens: 估算的token数
+            priority: 请求优先级
+
+        Raises:
+            AIRateLimitError: 需要等待的时间超过 AI_RATE_LIMIT_MAX_WAIT
+        """
+        if not self._available():
+            return
+        reserve = settings.AI_BATCH_RESERVE if priority == PRIORITY_BATCH else 0.0
+        waited = 0.0
+
+        while True:
+            try:
+                wait_ms = await self.redis.eval(
+                    ACQUIRE_SCRIPT, 3, RPM_BUCKET_KEY, TPM_BUCKET_KEY, PAUSE_KEY,
+                    settings.AI_RPM_LIMIT, settings.AI_TPM_LIMIT, 1, tokens, reserve
+                )
+            except Exception as e:
+                self._on_error("AI限流检查", e)
+                return
+            if not wait_ms:
+                return
+
+            delay = wait_ms / 1000
+            if waited + delay > settings.AI_RATE_LIMIT_MAX_WAIT:
+                raise AIRateLimitError(f"AI服务配额不足，约{delay:.0f}秒后可重试", retry_after=delay)
+            # 加随机抖动，避免等待同一配额的请求同时醒来
+            delay += random.uniform(0, min(1.0, delay))
+            waited += delay
+            await asyncio.sleep(delay)
+
+    async def settle(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """
+        按实际用量修正TPM桶
+
+        Args:
+            estimated_tokens: acquire 时扣减的token数
+            actual_tokens: 响应中的实际用量，未知时不修正
+        """
+        if not self._available() or not settings.AI_TPM_LIMIT or actual_tokens is None:
+            return
+        try:
+            await self.redis.eval(
+                SETTLE_SCRIPT, 1, TPM_BUCKET_KEY,
+                min(estimated_tokens, settings.AI_TPM_LIMIT) - actual_tokens, settings.AI_TPM_LIMIT
+            )
+        except Exception as e:
+            self._on_error("修正AI token用量", e)
+
+    async def pause(self, seconds: float) -> None:
+        """
+        让所有进程暂停发送请求
+
+        Args:
+            seconds: 暂停时长（秒）
+        """
+        if not self._available() or seconds <= 0:
+            return
+        try:
+            await self.redis.eval(PAUSE_SCRIPT, 1, PAUSE_KEY, int(seconds * 1000))
+        except Exception as e:
+            self._on_error("写入AI暂停时间", e)
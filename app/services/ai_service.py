@@ -1,19 +1,48 @@
+import contextlib
 import logging
 import json
 import hashlib
-import httpx
-from typing import Dict, List, Optional, Any, Union
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple, Union
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from ..config.settings import settings
-from ..config.cache import get_redis_client
+from ..config.cache import CACHE_KEY_PREFIX, get_binary_redis_client
+from ..config.codec import codec
 from ..models import HotelData, KPIMetric, Report
-from ..utils.exceptions import AIServiceError
+from ..utils.exceptions import AIServiceError, AIRateLimitError
 from ..repositories.data_repository import DataRepository
+from .ai_client import ai_client, build_messages
+from .ai_rate_limiter import PRIORITY_BATCH, PRIORITY_INTERACTIVE, estimate_tokens
+from .prompt_summary import summarize_hotel_data
+from .kpi_service import previous_window
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 提示词版本，修改提示词模板或数据摘要格式时递增，使旧的分析缓存失效
+PROMPT_VERSION = 2
+
+# AI分析缓存键位于缓存前缀下，清空缓存时一并删除
+AI_CACHE_PREFIX = f"{CACHE_KEY_PREFIX}ai_analysis:"
+
+# 写入分析结果，并原子地把同一请求参数的最新键指向它、删除旧指纹的结果
+# KEYS: 结果键, 最新键；ARGV: 编码后的结果, 有效期（秒，0表示不过期）
+AI_CACHE_STORE_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+local previous = redis.call("get", KEYS[2])
+if ttl > 0 then
+    redis.call("set", KEYS[1], ARGV[1], "ex", ttl)
+    redis.call("set", KEYS[2], KEYS[1], "ex", ttl)
+else
+    redis.call("set", KEYS[1], ARGV[1])
+    redis.call("set", KEYS[2], KEYS[1])
+end
+if previous and previous ~= KEYS[1] then
+    redis.call("del", previous)
+end
+return 1
+"""
+
 class AIService:
     """AI分析服务类，提供与AI模型交互的功能"""
     
@@ -24,18 +53,20 @@ class AIService:
             db: 数据库会话
         """
         self.db = db
-        self.redis_client = get_redis_client()
-        self.cache_ttl = 3600 * 24  # 缓存有效期，默认24小时
+        self.redis_client = get_binary_redis_client()
+        self.cache_ttl = settings.AI_CACHE_TTL  # 0表示不过期，数据变化时由指纹区分
         self.data_repository = DataRepository(db)
     
     def generate_analysis(self, hotel_ids: List[int], date_range: Dict[str, str], 
-                         analysis_type: str = "comprehensive") -> Dict[str, Any]:
+                         analysis_type: str = "comprehensive",
+                         priority: str = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
         """生成AI分析
         
         Args:
             hotel_ids: 酒店ID列表
             date_range: 日期范围，包含start_date和end_date
             analysis_type: 分析类型，可选值：comprehensive, revenue, operational, competitive, forecast
+            priority: AI请求优先级，interactive 或 batch
             
         Returns:
             分析结果字典
@@ -57,7 +88,7 @@ class AIService:
             prompt = self._build_prompt(hotel_data, analysis_type)
             
             # 调用AI服务
-            ai_response = self._call_ai_service(prompt)
+            ai_response = self._call_ai_service(prompt, priority)
             
             # 解析AI响应
             parsed_result = self._parse_ai_response(ai_response, analysis_type)
@@ -67,32 +98,148 @@ class AIService:
             
             return parsed_result
             
+        except AIRateLimitError:
+            # 保留限流错误类型，调用方（如Celery任务）据此稍后重试
+            raise
         except Exception as e:
             logger.error(f"生成AI分析失败: {str(e)}")
             raise AIServiceError(f"生成AI分析失败: {str(e)}")
     
+    def generate_analyses(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """批量生成AI分析
+        
+        数据查询和提示词构建依次进行（共用一个数据库会话），AI调用并发进行，
+        并发数由 AI_MAX_CONCURRENCY 限制，遇到429时按 Retry-After 退避。
+        
+        Args:
+            requests: 分析请求列表，每项包含hotel_ids、date_range和analysis_type
+            
+        Returns:
+            与输入顺序一致的结果列表，每项包含status（completed/failed）以及result或error；
+            因限流失败的项还包含retry_after（秒）
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        pending = []  # (序号, 缓存键, 分析类型, 提示词)
+        
+        for index, item in enumerate(requests):
+            analysis_type = item.get("analysis_type", "comprehensive")
+            try:
+                cache_key, cached_result, prompt = self.prepare_analysis(
+                    item["hotel_ids"], item["date_range"], analysis_type
+                )
+                if cached_result:
+                    results[index] = {"status": "completed", "result": cached_result}
+                else:
+                    pending.append((index, cache_key, analysis_type, prompt))
+            except Exception as e:
+                logger.error(f"准备AI分析数据失败: {str(e)}")
+                results[index] = {"status": "failed", "error": f"生成AI分析失败: {str(e)}"}
+        
+        if pending:
+            responses = ai_client.run_sync(
+                ai_client.complete_many(
+                    [build_messages(prompt) for _, _, _, prompt in pending],
+                    priority=PRIORITY_BATCH
+                )
+            )
+            for (index, cache_key, analysis_type, _), ai_response in zip(pending, responses):
+                if isinstance(ai_response, Exception):
+                    logger.error(f"生成AI分析失败: {str(ai_response)}")
+                    results[index] = {"status": "failed", "error": f"生成AI分析失败: {str(ai_response)}"}
+                    if isinstance(ai_response, AIRateLimitError):
+                        results[index]["retry_after"] = ai_response.retry_after
+                    continue
+                results[index] = {
+                    "status": "completed",
+                    "result": self.complete_analysis(cache_key, ai_response, analysis_type)
+                }
+        
+        logger.info(f"批量AI分析完成: 共{len(requests)}项，调用AI {len(pending)}次")
+        return results
+    
+    def prepare_analysis(self, hotel_ids: List[int], date_range: Dict[str, str],
+                         analysis_type: str = "comprehensive") -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+        """查询缓存并准备提示词，供批量和流式分析使用
+        
+        Args:
+            hotel_ids: 酒店ID列表
+            date_range: 日期范围，包含start_date和end_date
+            analysis_type: 分析类型
+            
+        Returns:
+            (缓存键, 缓存的结果, 提示词)，命中缓存时提示词为None，否则缓存的结果为None
+        """
+        cache_key = self._generate_cache_key(hotel_ids, date_range, analysis_type)
+        cached_result = self._get_from_cache(cache_key)
+        if cached_result:
+            logger.info(f"从缓存获取AI分析结果: {cache_key}")
+            return cache_key, cached_result, None
+        
+        hotel_data = self._get_hotel_data(hotel_ids, date_range)
+        return cache_key, None, self._build_prompt(hotel_data, analysis_type)
+    
+    def complete_analysis(self, cache_key: str, ai_response: str, analysis_type: str) -> Dict[str, Any]:
+        """解析完整的AI响应并缓存结果
+        
+        Args:
+            cache_key: prepare_analysis 返回的缓存键
+            ai_response: AI响应全文
+            analysis_type: 分析类型
+            
+        Returns:
+            分析结果字典
+        """
+        parsed_result = self._parse_ai_response(ai_response, analysis_type)
+        self._cache_result(cache_key, parsed_result)
+        return parsed_result
+    
     def _generate_cache_key(self, hotel_ids: List[int], date_range: Dict[str, str], 
                            analysis_type: str) -> str:
         """生成缓存键
         
+        键由请求参数和数据指纹两部分组成：相同参数在数据未变化时命中同一结果，
+        数据修正后指纹改变，自然生成新的分析。
+        
         Args:
             hotel_ids: 酒店ID列表
             date_range: 日期范围
             analysis_type: 分析类型
             
         Returns:
-            缓存键字符串
+            缓存键字符串，格式为 cache:ai_analysis:{参数哈希}:{数据指纹}
         """
         # 对输入参数进行排序和序列化，确保相同参数生成相同的键
         key_data = {
             "hotel_ids": sorted(hotel_ids),
             "date_range": date_range,
-            "analysis_type": analysis_type
+            "analysis_type": analysis_type,
+            # 模型或提示词变化时同样需要重新生成
+            "model": settings.AI_MODEL,
+            "prompt_version": PROMPT_VERSION
         }
         key_str = json.dumps(key_data, sort_keys=True)
         
         # 使用MD5生成缓存键
-        return f"ai_analysis:{hashlib.md5(key_str.encode()).hexdigest()}"
+        return f"{AI_CACHE_PREFIX}{hashlib.md5(key_str.encode()).hexdigest()}:{self._data_fingerprint(date_range)}"
+    
+    def _data_fingerprint(self, date_range: Dict[str, str]) -> str:
+        """计算分析所用数据（当前周期和上一周期）的内容指纹
+        
+        Args:
+            date_range: 日期范围，包含start_date和end_date
+            
+        Returns:
+            数据指纹，日期范围不完整时返回固定值
+        """
+        start_date = date_range.get("start_date")
+        end_date = date_range.get("end_date")
+        if not start_date or not end_date:
+            return "none"
+        
+        start_date_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        end_date_dt = datetime.strptime(end_date, "%Y-%m-%d")
+        prev_start_date, _ = previous_window(start_date_dt, end_date_dt)
+        return self.data_repository.get_data_fingerprint(prev_start_date, end_date_dt)[:16]
     
     def _get_from_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """从缓存获取结果
@@ -108,23 +255,27 @@ class AIService:
             
         cached_data = self.redis_client.get(cache_key)
         if cached_data:
-            return json.loads(cached_data)
+            return codec.loads(cached_data)
         return None
     
     def _cache_result(self, cache_key: str, result: Dict[str, Any]) -> None:
         """缓存结果
         
+        同一请求参数只保留最新数据指纹对应的结果，旧指纹的结果在写入时由脚本原子删除；
+        结果按 AI_CACHE_TTL 过期，不再请求的参数组合不会一直占用Redis。
+        
         Args:
             cache_key: 缓存键
             result: 要缓存的结果
         """
         if not self.redis_client:
             return
-            
-        self.redis_client.setex(
-            cache_key,
-            self.cache_ttl,
-            json.dumps(result, ensure_ascii=False)
+        
+        params_hash = cache_key[len(AI_CACHE_PREFIX):].split(":")[0]
+        latest_key = f"{AI_CACHE_PREFIX}latest:{params_hash}"
+        self.redis_client.eval(
+            AI_CACHE_STORE_SCRIPT, 2, cache_key, latest_key,
+            codec.dumps(result), max(self.cache_ttl, 0)
         )
     
     def _get_hotel_data(self, hotel_ids: List[int], date_range: Dict[str, str]) -> Dict[str, Any]:
@@ -153,12 +304,14 @@ class AIService:
         start_date_dt = datetime.strptime(start_date, "%Y-%m-%d")
         end_date_dt = datetime.strptime(end_date, "%Y-%m-%d")
         
-        # 获取酒店数据
-        hotels = []
+        # 一次查询解析ID对应的酒店；多个ID（同一酒店不同日期的记录）只保留一家酒店
+        hotels_by_name = {}
+        hotels_by_id = {hotel.id: hotel for hotel in self.data_repository.get_hotel_data_by_ids(hotel_ids)}
         for hotel_id in hotel_ids:
-            hotel_data = self.data_repository.get_hotel_data_by_id(hotel_id)
-            if hotel_data:
-                hotels.append(hotel_data)
+            hotel_data = hotels_by_id.get(hotel_id)
+            if hotel_data and hotel_data.hotel_name not in hotels_by_name:
+                hotels_by_name[hotel_data.hotel_name] = hotel_data
+        hotels = list(hotels_by_name.values())
         
         # 计算当前周期的KPI指标
         occupancy_data = self.data_repository.calculate_occupancy_rate(
@@ -193,27 +346,23 @@ class AIService:
             "end_date": prev_end_date.strftime("%Y-%m-%d")
         }
         
-        # 处理酒店数据
-        for hotel_data in hotels:
-            hotel_metrics = self.db.query(HotelData).filter(
-                HotelData.hotel_name == hotel_data.hotel_name,
-                HotelData.date_recorded >= start_date_dt,
-                HotelData.date_recorded <= end_date_dt
-            ).all()
-            
-            for hotel in hotel_metrics:
-                result["hotels"].append({
-                    "id": hotel.id,
-                    "name": hotel.hotel_name,
-                    "location": hotel.location,
-                    "date": hotel.date_recorded.strftime("%Y-%m-%d"),
-                    "occupancy_rate": hotel.occupancy_rate,
-                    "adr": hotel.adr,
-                    "revpar": hotel.revpar,
-                    "revenue": hotel.revenue,
-                    "cost": hotel.cost if hasattr(hotel, 'cost') else None,
-                    "profit": hotel.profit if hasattr(hotel, 'profit') else None
-                })
+        # 一次查询获取所有酒店在当前周期内的每日数据
+        hotel_metrics = self.data_repository.get_hotel_data_by_names(
+            list(hotels_by_name), start_date_dt, end_date_dt
+        )
+        for hotel in hotel_metrics:
+            result["hotels"].append({
+                "id": hotel.id,
+                "name": hotel.hotel_name,
+                "location": hotel.location,
+                "date": hotel.date_recorded.strftime("%Y-%m-%d"),
+                "occupancy_rate": hotel.occupancy_rate,
+                "adr": hotel.adr,
+                "revpar": hotel.revpar,
+                "revenue": hotel.revenue,
+                "cost": hotel.cost if hasattr(hotel, 'cost') else None,
+                "profit": hotel.profit if hasattr(hotel, 'profit') else None
+            })
         
         # 计算KPI汇总
         avg_occupancy = sum(item["occupancy_rate"] for item in occupancy_data) / len(occupancy_data) if occupancy_data else 0
@@ -317,65 +466,24 @@ class AIService:
         
         result["regional_kpis"] = region_kpis
         
-        # 获取趋势数据
-        trend_data = self.data_repository.get_trend_analysis(
+        # 一次查询获取每日各项KPI
+        daily_metrics = ["occupancy_rate", "adr", "revpar", "revenue"]
+        trend_metrics = self.data_repository.get_trend_metrics(
             start_date=start_date_dt,
             end_date=end_date_dt,
-            metric="occupancy_rate",
+            metrics=daily_metrics,
             group_by="day"
         )
         
         # 格式化为每日KPI格式
-        if trend_data and trend_data.get("trend_data"):
-            daily_kpis = {}
-            
-            # 获取每日入住率
-            for item in trend_data["trend_data"]:
-                date_str = item["date"]
-                daily_kpis[date_str] = {
-                    "occupancy_rate": item["value"]
+        if trend_metrics["dates"]:
+            result["daily_kpis"] = {
+                date_str: {
+                    metric: trend_metrics["values"][metric][index]
+                    for metric in daily_metrics
                 }
-            
-            # 获取每日ADR
-            adr_trend = self.data_repository.get_trend_analysis(
-                start_date=start_date_dt,
-                end_date=end_date_dt,
-                metric="adr",
-                group_by="day"
-            )
-            
-            for item in adr_trend.get("trend_data", []):
-                date_str = item["date"]
-                if date_str in daily_kpis:
-                    daily_kpis[date_str]["adr"] = item["value"]
-            
-            # 获取每日RevPAR
-            revpar_trend = self.data_repository.get_trend_analysis(
-                start_date=start_date_dt,
-                end_date=end_date_dt,
-                metric="revpar",
-                group_by="day"
-            )
-            
-            for item in revpar_trend.get("trend_data", []):
-                date_str = item["date"]
-                if date_str in daily_kpis:
-                    daily_kpis[date_str]["revpar"] = item["value"]
-            
-            # 获取每日收入
-            revenue_trend = self.data_repository.get_trend_analysis(
-                start_date=start_date_dt,
-                end_date=end_date_dt,
-                metric="revenue",
-                group_by="day"
-            )
-            
-            for item in revenue_trend.get("trend_data", []):
-                date_str = item["date"]
-                if date_str in daily_kpis:
-                    daily_kpis[date_str]["revenue"] = item["value"]
-            
-            result["daily_kpis"] = daily_kpis
+                for index, date_str in enumerate(trend_metrics["dates"])
+            }
     
     # _calculate_average 方法已被删除，因为我们现在使用数据仓库进行计算
     
@@ -407,9 +515,12 @@ class AIService:
         revenue = current_kpis.get("revenue", 0)
         revenue_change = changes.get("revenue", 0)
         
+        # 原始每日数据压缩为规模固定的统计特征，提示词长度与日期范围无关
+        summary = summarize_hotel_data(hotel_data)
+        
         # 填充模板
         prompt = template.format(
-            hotel_count=len(hotel_data.get('hotels', [])),
+            hotel_count=summary["hotel_count"],
             start_date=hotel_data.get('period', {}).get('start_date'),
             end_date=hotel_data.get('period', {}).get('end_date'),
             occupancy_rate=occupancy_rate,
@@ -420,8 +531,9 @@ class AIService:
             revpar_change=revpar_change,
             revenue=revenue,
             revenue_change=revenue_change,
-            data_details=json.dumps(hotel_data, ensure_ascii=False, indent=2)
+            data_details=json.dumps(summary, ensure_ascii=False, separators=(",", ":"))
         )
+        logger.info(f"AI提示词约{estimate_tokens(prompt)}个token")
         
         return prompt
     
@@ -442,10 +554,10 @@ class AIService:
 - 酒店数量：{hotel_count}家
 - 分析周期：{start_date} 至 {end_date}
 - 主要指标：
-  - 平均入住率: {occupancy_rate:.2f}% ({'+' if occupancy_change and occupancy_change > 0 else ''}{occupancy_change:.2f}% 同比)
-  - 平均房价(ADR): {adr:.2f} ({'+' if adr_change and adr_change > 0 else ''}{adr_change:.2f}% 同比)
-  - 每可用房收入(RevPAR): {revpar:.2f} ({'+' if revpar_change and revpar_change > 0 else ''}{revpar_change:.2f}% 同比)
-  - 总收入: {revenue:.2f} ({'+' if revenue_change and revenue_change > 0 else ''}{revenue_change:.2f}% 同比)
+  - 平均入住率: {occupancy_rate:.2f}% ({occupancy_change:+.2f}% 环比)
+  - 平均房价(ADR): {adr:.2f} ({adr_change:+.2f}% 环比)
+  - 每可用房收入(RevPAR): {revpar:.2f} ({revpar_change:+.2f}% 环比)
+  - 总收入: {revenue:.2f} ({revenue_change:+.2f}% 环比)
 
 {analysis_sections}
 
@@ -455,7 +567,8 @@ class AIService:
 - 突出关键洞察
 - 使用图表说明（如需要）
 
-**数据详情：**
+**数据详情（统计摘要，JSON）：**
+说明：hotels为各酒店指标的分布统计（mean/std/p25/p50/p75）和趋势（slope_per_day为每日变化量，period_change_pct为按趋势推算的周期变化百分比）；top_movers为RevPAR趋势变化最大的酒店；anomalies为偏离该酒店均值最多的日期（z_score为标准差倍数）；portfolio_daily为整体每日KPI的统计和星期分布。
 {data_details}
 """
         
@@ -575,76 +688,46 @@ class AIService:
         # 获取对应的分析部分，如果不存在则使用综合分析
         section = analysis_sections.get(analysis_type, analysis_sections["comprehensive"])
         
-        # 填充模板
-        return base_template.format(analysis_sections=section, **{})
+        # 只替换分析部分，其余占位符由 _build_prompt 填充
+        return base_template.replace("{analysis_sections}", section)
     
-    def _call_ai_service(self, prompt: str) -> str:
+    def _call_ai_service(self, prompt: str, priority: str = PRIORITY_INTERACTIVE) -> str:
         """调用AI服务
         
+        请求通过进程内共享的AI客户端发送，复用连接池，受并发数和共享的RPM/TPM配额限制。
+        
         Args:
             prompt: 提示词
+            priority: 请求优先级，interactive 或 batch
             
         Returns:
             AI响应内容
         """
         try:
-            # 准备请求参数
-            api_url = settings.AI_API_URL
-            api_key = settings.AI_API_KEY
-            
-            if not api_key:
-                raise AIServiceError("未配置AI API密钥")
-            
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}"
-            }
-            
-            payload = {
-                "model": settings.AI_MODEL,
-                "messages": [
-                    {"role": "system", "content": "你是一位专业的酒店业数据分析师，擅长分析酒店运营数据并提供洞察和建议。"},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 4000
-            }
-            
-            # 发送请求
-            with httpx.Client(timeout=settings.AI_TIMEOUT) as client:
-                response = client.post(api_url, json=payload, headers=headers)
-                response.raise_for_status()
-                
-                # 解析响应
-                result = response.json()
-                
-                # 提取回答
-                if "choices" in result and len(result["choices"]) > 0:
-                    return result["choices"][0]["message"]["content"]
-                else:
-                    raise AIServiceError("AI响应格式无效")
-                    
-        except httpx.RequestError as e:
-            logger.error(f"AI服务请求错误: {str(e)}")
-            raise AIServiceError(f"AI服务请求错误: {str(e)}")
-            
-        except httpx.HTTPStatusError as e:
-            logger.error(f"AI服务HTTP错误: {str(e)}")
-            
-            # 处理常见HTTP错误
-            if e.response.status_code == 401:
-                raise AIServiceError("AI服务认证失败，请检查API密钥")
-            elif e.response.status_code == 429:
-                raise AIServiceError("AI服务请求过于频繁，请稍后再试")
-            elif e.response.status_code >= 500:
-                raise AIServiceError("AI服务暂时不可用，请稍后再试")
-            else:
-                raise AIServiceError(f"AI服务HTTP错误: {str(e)}")
-            
+            return ai_client.run_sync(ai_client.complete(build_messages(prompt), priority=priority))
+        except AIServiceError:
+            raise
         except Exception as e:
             logger.error(f"调用AI服务失败: {str(e)}")
             raise AIServiceError(f"调用AI服务失败: {str(e)}")
     
+    @staticmethod
+    async def stream_ai_service(prompt: str) -> AsyncIterator[str]:
+        """以流式方式调用AI服务（stream: true），逐段返回生成的文本
+        
+        不依赖数据库会话，可直接在事件循环中使用。
+        
+        Args:
+            prompt: 提示词
+            
+        Yields:
+            增量文本片段
+        """
+        # 调用方提前关闭时同时关闭上游流，释放连接和并发名额
+        async with contextlib.aclosing(ai_client.stream(build_messages(prompt))) as stream:
+            async for content in stream:
+                yield content
+    
     def _parse_ai_response(self, response: str, analysis_type: str) -> Dict[str, Any]:
         """解析AI响应
         
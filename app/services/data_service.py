@@ -1,8 +1,11 @@
+import base64
+import json
 import logging
-from datetime import datetime
+from datetime import date, datetime
 from typing import Tuple, List, Optional, Dict, Any
 from fastapi import BackgroundTasks
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, tuple_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..models import HotelData, TaskStatus
 from ..utils.exceptions import ValidationError, NotFoundError, DatabaseError
@@ -11,6 +14,109 @@ from ..tasks.data_processing import process_excel_data, process_excel_data as pr
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 游标分页默认的总数计算方式（接口与服务共用）
+DEFAULT_TOTAL_MODE = "estimate"
+
+def escape_like(value: str) -> str:
+    """转义 LIKE 模式中的通配符，使用户输入按字面匹配"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def encode_hotel_cursor(date_recorded: date, hotel_data_id: int) -> str:
+    """将 (date_recorded, id) 编码为不透明的游标字符串"""
+    payload = json.dumps([date_recorded.isoformat(), hotel_data_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_hotel_cursor(cursor: str) -> Tuple[date, int]:
+    """解析游标字符串为 (date_recorded, id)
+    
+    Raises:
+        ValidationError: 游标格式无效
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_value, hotel_data_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return date.fromisoformat(date_value), int(hotel_data_id)
+    except Exception:
+        raise ValidationError("无效的分页游标", details={"cursor": cursor})
+
+def hotel_filters(
+    hotel_name: Optional[str] = None,
+    location: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> List[Any]:
+    """构建酒店数据列表的过滤条件（同步、异步查询共用）"""
+    filters = []
+    
+    # 子串匹配由pg_trgm GIN索引支持；直接匹配原始数据，不依赖汇总表是否完整
+    if hotel_name:
+        filters.append(HotelData.hotel_name.ilike(f"%{escape_like(hotel_name)}%", escape="\\"))
+    
+    if location:
+        filters.append(HotelData.location.ilike(f"%{escape_like(location)}%", escape="\\"))
+    
+    if start_date:
+        filters.append(HotelData.date_recorded >= _parse_date(start_date, "start_date"))
+    
+    if end_date:
+        filters.append(HotelData.date_recorded <= _parse_date(end_date, "end_date"))
+    
+    return filters
+
+def _parse_date(value: str, field: str) -> date:
+    """解析 YYYY-MM-DD 日期参数"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError("日期格式无效，应为 YYYY-MM-DD", details={"field": field, "value": value})
+
+def hotel_list_statement(filters: List[Any]):
+    """带过滤条件的酒店数据查询"""
+    return select(HotelData).where(*filters)
+
+def hotel_count_statement(filters: List[Any]):
+    """带过滤条件的酒店数据计数查询"""
+    return select(func.count()).select_from(HotelData).where(*filters)
+
+def hotel_page_statement(
+    filters: List[Any],
+    limit: int,
+    offset: int = 0,
+    position: Optional[Tuple[date, int]] = None
+):
+    """按 (date_recorded, id) 倒序的分页查询，position为游标位置"""
+    statement = hotel_list_statement(filters)
+    if position:
+        statement = statement.where(tuple_(HotelData.date_recorded, HotelData.id) < tuple_(*position))
+    statement = statement.order_by(desc(HotelData.date_recorded), desc(HotelData.id))
+    if offset:
+        statement = statement.offset(offset)
+    return statement.limit(limit)
+
+def cursor_page(hotels: List[HotelData], size: int, total: Optional[int], total_mode: str) -> Dict[str, Any]:
+    """将多取一行的查询结果整理为游标分页结果"""
+    has_more = len(hotels) > size
+    hotels = list(hotels[:size])
+    
+    next_cursor = None
+    if has_more:
+        last = hotels[-1]
+        next_cursor = encode_hotel_cursor(last.date_recorded, last.id)
+    
+    return {
+        "items": hotels,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "total": total,
+        "total_is_estimate": total_mode == "estimate"
+    }
+
+def plan_row_estimate(plan: Any) -> int:
+    """从 EXPLAIN (FORMAT JSON) 的结果中取出估算行数"""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
 class DataService:
     """数据服务"""
     
@@ -98,32 +204,17 @@ class DataService:
         Returns:
             酒店数据列表和总数
         """
+        filters = hotel_filters(hotel_name, location, start_date, end_date)
+        
         try:
-            # 构建查询
-            query = self.db.query(HotelData)
-            
-            # 应用过滤条件
-            if hotel_name:
-                query = query.filter(HotelData.hotel_name.ilike(f"%{hotel_name}%"))
-            
-            if location:
-                query = query.filter(HotelData.location.ilike(f"%{location}%"))
-            
-            if start_date:
-                query = query.filter(HotelData.date_recorded >= start_date)
-            
-            if end_date:
-                query = query.filter(HotelData.date_recorded <= end_date)
-            
             # 计算总数
-            total = query.count()
+            total = self.db.execute(hotel_count_statement(filters)).scalar()
             
             # 应用分页
-            query = query.order_by(desc(HotelData.date_recorded))
-            query = query.offset((page - 1) * size).limit(size)
+            statement = hotel_page_statement(filters, size, offset=(page - 1) * size)
             
             # 执行查询
-            hotels = query.all()
+            hotels = self.db.scalars(statement).all()
             
             return hotels, total
             
@@ -131,6 +222,66 @@ class DataService:
             logger.error(f"获取酒店数据失败: {str(e)}")
             raise DatabaseError(f"获取酒店数据失败: {str(e)}")
     
+    def get_hotels_by_cursor(
+        self,
+        size: int = 10,
+        cursor: Optional[str] = None,
+        hotel_name: Optional[str] = None,
+        location: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        total_mode: str = DEFAULT_TOTAL_MODE
+    ) -> Dict[str, Any]:
+        """按游标分页获取酒店数据列表
+        
+        按 (date_recorded, id) 倒序做键集分页，每页只读取游标之后的size+1行，
+        翻页成本与页码无关。
+        
+        Args:
+            size: 每页大小
+            cursor: 上一页返回的游标，为空时从第一页开始
+            hotel_name: 酒店名称过滤
+            location: 位置过滤
+            start_date: 开始日期
+            end_date: 结束日期
+            total_mode: 总数计算方式，none不计算，estimate使用查询计划估算，exact精确计数
+            
+        Returns:
+            包含items、next_cursor、has_more、total、total_is_estimate的字典
+        """
+        position = decode_hotel_cursor(cursor) if cursor else None
+        filters = hotel_filters(hotel_name, location, start_date, end_date)
+        
+        try:
+            total = None
+            if total_mode == "exact":
+                total = self.db.execute(hotel_count_statement(filters)).scalar()
+            elif total_mode == "estimate":
+                total = self._estimate_row_count(hotel_list_statement(filters))
+            
+            # 多取一行判断是否还有下一页
+            hotels = self.db.scalars(hotel_page_statement(filters, size + 1, position=position)).all()
+            return cursor_page(hotels, size, total, total_mode)
+            
+        except Exception as e:
+            logger.error(f"获取酒店数据失败: {str(e)}")
+            raise DatabaseError(f"获取酒店数据失败: {str(e)}")
+    
+    def _estimate_row_count(self, statement) -> int:
+        """使用查询计划的估算行数代替 COUNT(*)
+        
+        Args:
+            statement: 带过滤条件的查询语句
+            
+        Returns:
+            估算行数
+        """
+        compiled = statement.compile(dialect=self.db.get_bind().dialect)
+        plan = self.db.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+        ).scalar()
+        return plan_row_estimate(plan)
+    
     def get_hotel_by_id(self, hotel_id: int) -> Optional[HotelData]:
         """根据ID获取酒店数据
         
@@ -213,3 +364,94 @@ class DataService:
         except Exception as e:
             logger.error(f"获取数据摘要失败: {str(e)}")
             raise DatabaseError(f"获取数据摘要失败: {str(e)}")
+
+class AsyncDataService:
+    """数据服务（异步会话版本），查询语句与 DataService 共用"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_hotels(
+        self,
+        page: int = 1,
+        size: int = 10,
+        hotel_name: Optional[str] = None,
+        location: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Tuple[List[HotelData], int]:
+        """获取酒店数据列表
+        
+        Args:
+            page: 页码
+            size: 每页大小
+            hotel_name: 酒店名称过滤
+            location: 位置过滤
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            酒店数据列表和总数
+        """
+        filters = hotel_filters(hotel_name, location, start_date, end_date)
+        
+        try:
+            total = (await self.db.execute(hotel_count_statement(filters))).scalar()
+            statement = hotel_page_statement(filters, size, offset=(page - 1) * size)
+            hotels = (await self.db.scalars(statement)).all()
+            return hotels, total
+            
+        except Exception as e:
+            logger.error(f"获取酒店数据失败: {str(e)}")
+            raise DatabaseError(f"获取酒店数据失败: {str(e)}")
+    
+    async def get_hotels_by_cursor(
+        self,
+        size: int = 10,
+        cursor: Optional[str] = None,
+        hotel_name: Optional[str] = None,
+        location: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        total_mode: str = DEFAULT_TOTAL_MODE
+    ) -> Dict[str, Any]:
+        """按游标分页获取酒店数据列表，参数与返回值同 DataService.get_hotels_by_cursor"""
+        position = decode_hotel_cursor(cursor) if cursor else None
+        filters = hotel_filters(hotel_name, location, start_date, end_date)
+        
+        try:
+            total = None
+            if total_mode == "exact":
+                total = (await self.db.execute(hotel_count_statement(filters))).scalar()
+            elif total_mode == "estimate":
+                total = await self._estimate_row_count(hotel_list_statement(filters))
+            
+            hotels = (await self.db.scalars(hotel_page_statement(filters, size + 1, position=position))).all()
+            return cursor_page(hotels, size, total, total_mode)
+            
+        except Exception as e:
+            logger.error(f"获取酒店数据失败: {str(e)}")
+            raise DatabaseError(f"获取酒店数据失败: {str(e)}")
+    
+    async def _estimate_row_count(self, statement) -> int:
+        """使用查询计划的估算行数代替 COUNT(*)"""
+        connection = await self.db.connection()
+        # asyncpg为位置参数，参数值以字面量形式内联到EXPLAIN语句中
+        compiled = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+        plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+        return plan_row_estimate(plan)
+    
+    async def get_hotel_by_id(self, hotel_id: int) -> Optional[HotelData]:
+        """根据ID获取酒店数据
+        
+        Args:
+            hotel_id: 酒店ID
+            
+        Returns:
+            酒店数据对象，不存在时返回None
+        """
+        try:
+            return (await self.db.scalars(select(HotelData).where(HotelData.id == hotel_id))).first()
+        except Exception as e:
+            logger.error(f"获取酒店数据失败: {str(e)}")
+            raise DatabaseError(f"获取酒店数据失败: {str(e)}")
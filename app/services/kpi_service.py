@@ -1,15 +1,23 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 from ..models import HotelData, KPIMetric
-from ..utils.exceptions import NotFoundError, DatabaseError
+from ..utils.exceptions import NotFoundError, DatabaseError, ValidationError
 from ..repositories.data_repository import DataRepository
+from ..config.cache import date_range_tags
+from ..utils.date_windows import match_window_preset
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 支持的KPI指标
+VALID_METRICS = ["occupancy_rate", "adr", "revpar", "revenue"]
+
+# 趋势周期类型到分组粒度的映射
+PERIOD_GROUP_BY = {"daily": "day", "weekly": "week", "monthly": "month"}
+
 class KPIService:
     """KPI服务"""
     
@@ -29,138 +37,198 @@ class KPIService:
         """
         try:
             # 转换日期格式
-            start_date_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
-            end_date_dt = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
+            start_date_dt = _parse_widget_date(start_date)
+            end_date_dt = _parse_widget_date(end_date)
             
-            # 使用数据仓库获取收入指标
-            if start_date_dt and end_date_dt:
-                revenue_metrics = self.data_repository.calculate_revenue_metrics(
-                    start_date=start_date_dt,
-                    end_date=end_date_dt
-                )
-                
-                # 使用数据仓库获取入住率
-                occupancy_data = self.data_repository.calculate_occupancy_rate(
-                    start_date=start_date_dt,
-                    end_date=end_date_dt
-                )
-            else:
-                # 如果没有提供日期范围，返回空摘要
-                return {
-                    "kpi_summary": {
-                        "current": {
-                            "occupancy_rate": 0,
-                            "adr": 0,
-                            "revpar": 0,
-                            "revenue": 0
-                        }
-                    },
-                    "hotel_count": 0,
-                    "date_range": {
-                        "start_date": start_date,
-                        "end_date": end_date
-                    }
-                }
+            # 如果没有提供日期范围，返回空摘要
+            if not start_date_dt or not end_date_dt:
+                return self._empty_dashboard_summary(start_date, end_date)
             
-            # 如果没有数据，返回空摘要
-            if not revenue_metrics:
-                return {
-                    "kpi_summary": {
-                        "current": {
-                            "occupancy_rate": 0,
-                            "adr": 0,
-                            "revpar": 0,
-                            "revenue": 0
-                        }
-                    },
-                    "hotel_count": 0,
-                    "date_range": {
-                        "start_date": start_date,
-                        "end_date": end_date
-                    }
-                }
+            # 一次查询同时获取当前周期和上一周期（紧邻之前的等长窗口）的加权KPI
+            summaries = self.data_repository.get_period_summaries({
+                "current": (start_date_dt, end_date_dt),
+                "previous": previous_window(start_date_dt, end_date_dt)
+            })
+            current = summaries.get("current")
+            previous = summaries.get("previous")
             
-            # 计算当前周期KPI
-            total_revenue = sum(item["revenue"] for item in revenue_metrics)
-            avg_adr = sum(item["adr"] for item in revenue_metrics) / len(revenue_metrics) if revenue_metrics else 0
-            avg_revpar = sum(item["revpar"] for item in revenue_metrics) / len(revenue_metrics) if revenue_metrics else 0
-            avg_occupancy = sum(item["occupancy_rate"] for item in occupancy_data) / len(occupancy_data) if occupancy_data else 0
+            return self._build_dashboard_summary(current, previous, start_date, end_date)
             
-            current_kpis = {
-                "occupancy_rate": avg_occupancy,
-                "adr": avg_adr,
-                "revpar": avg_revpar,
-                "revenue": total_revenue
+        except ValidationError:
+            raise
+        except Exception as e:
+            logger.error(f"获取仪表盘摘要失败: {str(e)}")
+            raise DatabaseError(f"获取仪表盘摘要失败: {str(e)}")
+    
+    def _empty_dashboard_summary(self, start_date: Optional[str], end_date: Optional[str]) -> Dict[str, Any]:
+        """构建无数据时的仪表盘摘要
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            空仪表盘摘要
+        """
+        return {
+            "kpi_summary": {
+                "current": {
+                    "occupancy_rate": 0,
+                    "adr": 0,
+                    "revpar": 0,
+                    "revenue": 0
+                }
+            },
+            "hotel_count": 0,
+            "date_range": {
+                "start_date": start_date,
+                "end_date": end_date
             }
+        }
+    
+    def _build_dashboard_summary(
+        self,
+        current: Optional[Dict[str, Any]],
+        previous: Optional[Dict[str, Any]],
+        start_date: Optional[str],
+        end_date: Optional[str]
+    ) -> Dict[str, Any]:
+        """根据两个周期的汇总结果构建仪表盘摘要
+        
+        Args:
+            current: 当前周期汇总（get_period_summaries 的结果项）
+            previous: 上一周期汇总
+            start_date: 开始日期
+            end_date: 结束日期
             
-            # 计算上一周期数据
-            prev_kpis = {}
-            changes = {}
+        Returns:
+            仪表盘摘要数据
+        """
+        # 如果没有数据，返回空摘要
+        if not current or not current["record_count"]:
+            return self._empty_dashboard_summary(start_date, end_date)
+        
+        # 计算当前周期KPI
+        current_kpis = {key: current[key] for key in VALID_METRICS}
+        
+        # 计算上一周期数据
+        prev_kpis = {}
+        changes = {}
+        
+        if previous and previous["record_count"]:
+            prev_kpis = {key: previous[key] for key in VALID_METRICS}
             
-            if start_date_dt and end_date_dt:
-                days_diff = (end_date_dt - start_date_dt).days + 1
-                
-                prev_end_date = start_date_dt - timedelta(days=1)
-                prev_start_date = prev_end_date - timedelta(days=days_diff-1)
-                
-                # 使用数据仓库获取上一周期数据
-                prev_revenue_metrics = self.data_repository.calculate_revenue_metrics(
-                    start_date=prev_start_date,
-                    end_date=prev_end_date
-                )
-                
-                prev_occupancy_data = self.data_repository.calculate_occupancy_rate(
-                    start_date=prev_start_date,
-                    end_date=prev_end_date
-                )
-                
-                if prev_revenue_metrics:
-                    prev_total_revenue = sum(item["revenue"] for item in prev_revenue_metrics)
-                    prev_avg_adr = sum(item["adr"] for item in prev_revenue_metrics) / len(prev_revenue_metrics) if prev_revenue_metrics else 0
-                    prev_avg_revpar = sum(item["revpar"] for item in prev_revenue_metrics) / len(prev_revenue_metrics) if prev_revenue_metrics else 0
-                    prev_avg_occupancy = sum(item["occupancy_rate"] for item in prev_occupancy_data) / len(prev_occupancy_data) if prev_occupancy_data else 0
-                    
-                    prev_kpis = {
-                        "occupancy_rate": prev_avg_occupancy,
-                        "adr": prev_avg_adr,
-                        "revpar": prev_avg_revpar,
-                        "revenue": prev_total_revenue
-                    }
-                    
-                    # 计算同比变化
-                    for key in current_kpis:
-                        if key in prev_kpis and prev_kpis[key] and prev_kpis[key] != 0:
-                            changes[key] = ((current_kpis[key] - prev_kpis[key]) / prev_kpis[key]) * 100
-                        else:
-                            changes[key] = 0
+            # 计算同比变化
+            for key in current_kpis:
+                if key in prev_kpis and prev_kpis[key] and prev_kpis[key] != 0:
+                    changes[key] = ((current_kpis[key] - prev_kpis[key]) / prev_kpis[key]) * 100
+                else:
+                    changes[key] = 0
+        
+        return {
+            "kpi_summary": {
+                "current": current_kpis,
+                "previous": prev_kpis,
+                "changes": changes
+            },
+            "hotel_count": current["hotel_count"],
+            "date_range": {
+                "start_date": start_date,
+                "end_date": end_date
+            }
+        }
+    
+    def _format_trends(
+        self,
+        metrics: List[str],
+        period: str,
+        trend_metrics: Optional[Dict[str, Any]],
+        start_date: Optional[str],
+        end_date: Optional[str]
+    ) -> Dict[str, Any]:
+        """将列式趋势数据格式化为按指标分组的趋势列表
+        
+        Args:
+            metrics: 指标列表
+            period: 周期类型
+            trend_metrics: get_trend_metrics 的结果，为空时返回空趋势
+            start_date: 开始日期
+            end_date: 结束日期
             
-            # 获取酒店数量
-            hotels_query = self.db.query(HotelData.hotel_name).distinct()
-            if start_date_dt:
-                hotels_query = hotels_query.filter(HotelData.date_recorded >= start_date_dt)
-            if end_date_dt:
-                hotels_query = hotels_query.filter(HotelData.date_recorded <= end_date_dt)
-            hotel_count = hotels_query.count()
+        Returns:
+            趋势数据
+        """
+        trends = {metric: [] for metric in metrics}
+        if trend_metrics:
+            trends = {
+                metric: [
+                    {
+                        "period": period_start,
+                        "value": round(value, 2) if value is not None else 0
+                    }
+                    for period_start, value in zip(trend_metrics["dates"], trend_metrics["values"][metric])
+                ]
+                for metric in metrics
+            }
+        
+        return {
+            "trends": trends,
+            "period": period,
+            "date_range": {
+                "start_date": start_date,
+                "end_date": end_date
+            }
+        }
+    
+    def _build_comparison(
+        self,
+        metric: str,
+        current: Optional[Dict[str, Any]],
+        previous: Optional[Dict[str, Any]],
+        current_range: Tuple[str, str],
+        previous_range: Tuple[str, str]
+    ) -> Dict[str, Any]:
+        """根据两个周期的汇总结果构建对比数据
+        
+        Args:
+            metric: 指标
+            current: 当前周期汇总（get_period_summaries 的结果项）
+            previous: 上一周期汇总
+            current_range: 当前周期 (开始日期, 结束日期)
+            previous_range: 上一周期 (开始日期, 结束日期)
             
-            # 构建摘要
-            summary = {
-                "kpi_summary": {
-                    "current": current_kpis,
-                    "previous": prev_kpis,
-                    "changes": changes
+        Returns:
+            对比数据
+        """
+        current_value = current[metric] if current else 0
+        previous_value = previous[metric] if previous else 0
+        
+        # 计算变化率
+        if previous_value and previous_value != 0:
+            change_rate = ((current_value - previous_value) / previous_value) * 100
+        else:
+            change_rate = 0
+        
+        return {
+            "metric": metric,
+            "current": {
+                "value": round(current_value, 2),
+                "date_range": {
+                    "start_date": current_range[0],
+                    "end_date": current_range[1]
                 },
-                "hotel_count": hotel_count,
+                "hotel_count": current["hotel_count"] if current else 0
+            },
+            "previous": {
+                "value": round(previous_value, 2),
                 "date_range": {
-                    "start_date": start_date,
-                    "end_date": end_date
-                }
-            }
-            
-            return summary
-            
-        except Exception as e:
-            logger.error(f"获取仪表盘摘要失败: {str(e)}")
-            raise DatabaseError(f"获取仪表盘摘要失败: {str(e)}")
+                    "start_date": previous_range[0],
+                    "end_date": previous_range[1]
+                },
+                "hotel_count": previous["hotel_count"] if previous else 0
+            },
+            "change_rate": round(change_rate, 2)
+        }
     
     def get_trends(self, metrics: List[str], period: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
         """获取趋势数据
@@ -176,69 +244,30 @@ class KPIService:
         """
         try:
             # 验证指标
-            valid_metrics = ["occupancy_rate", "adr", "revpar", "revenue"]
-            metrics = [m for m in metrics if m in valid_metrics]
+            metrics = [m for m in metrics if m in VALID_METRICS]
             
             if not metrics:
-                raise ValueError("未提供有效的指标")
+                raise ValidationError("未提供有效的指标")
             
             # 转换日期格式
-            start_date_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
-            end_date_dt = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
+            start_date_dt = _parse_widget_date(start_date)
+            end_date_dt = _parse_widget_date(end_date)
             
             # 如果没有提供日期范围，返回空趋势
             if not start_date_dt or not end_date_dt:
-                return {
-                    "trends": {metric: [] for metric in metrics},
-                    "period": period,
-                    "date_range": {
-                        "start_date": start_date,
-                        "end_date": end_date
-                    }
-                }
-            
-            # 将period转换为group_by参数
-            group_by = "day"
-            if period == "weekly":
-                group_by = "week"
-            elif period == "monthly":
-                group_by = "month"
-            
-            # 使用数据仓库获取趋势数据
-            trends = {metric: [] for metric in metrics}
+                return self._format_trends(metrics, period, None, start_date, end_date)
             
-            for metric in metrics:
-                if metric in ["occupancy_rate", "adr", "revpar", "revenue"]:
-                    # 使用数据仓库的趋势分析方法
-                    trend_data = self.data_repository.get_trend_analysis(
-                        start_date=start_date_dt,
-                        end_date=end_date_dt,
-                        metric=metric,
-                        group_by=group_by
-                    )
-                    
-                    # 格式化结果
-                    trends[metric] = [
-                        {
-                            "period": item["date"],
-                            "value": round(item["value"], 2) if item["value"] is not None else 0
-                        }
-                        for item in trend_data["trend_data"]
-                    ]
-            
-            # 构建趋势数据
-            result = {
-                "trends": trends,
-                "period": period,
-                "date_range": {
-                    "start_date": start_date,
-                    "end_date": end_date
-                }
-            }
+            # 一次查询获取所有指标的趋势数据
+            trend_metrics = self.data_repository.get_trend_metrics(
+                start_date=start_date_dt,
+                end_date=end_date_dt,
+                metrics=metrics,
+                group_by=PERIOD_GROUP_BY.get(period, "day")
+            )
             
-            return result
+            return self._format_trends(metrics, period, trend_metrics, start_date, end_date)
             
-        except ValueError as e:
+        except ValidationError:
             raise
         except Exception as e:
             logger.error(f"获取趋势数据失败: {str(e)}")
@@ -266,99 +295,190 @@ class KPIService:
         """
         try:
             # 验证指标
-            valid_metrics = ["occupancy_rate", "adr", "revpar", "revenue"]
-            if metric not in valid_metrics:
-                raise ValueError(f"无效的指标: {metric}")
+            if metric not in VALID_METRICS:
+                raise ValidationError(f"无效的指标: {metric}")
             
             # 转换日期格式
-            current_start_dt = datetime.strptime(current_start, "%Y-%m-%d") if current_start else None
-            current_end_dt = datetime.strptime(current_end, "%Y-%m-%d") if current_end else None
-            previous_start_dt = datetime.strptime(previous_start, "%Y-%m-%d") if previous_start else None
-            previous_end_dt = datetime.strptime(previous_end, "%Y-%m-%d") if previous_end else None
+            current_start_dt = _parse_widget_date(current_start)
+            current_end_dt = _parse_widget_date(current_end)
+            previous_start_dt = _parse_widget_date(previous_start)
+            previous_end_dt = _parse_widget_date(previous_end)
             
-            # 使用数据仓库获取当前周期数据
-            if metric == "occupancy_rate":
-                current_data = self.data_repository.calculate_occupancy_rate(
-                    start_date=current_start_dt,
-                    end_date=current_end_dt
-                )
-                previous_data = self.data_repository.calculate_occupancy_rate(
-                    start_date=previous_start_dt,
-                    end_date=previous_end_dt
-                )
-                
-                # 计算平均值
-                current_value = sum(item["occupancy_rate"] for item in current_data) / len(current_data) if current_data else 0
-                previous_value = sum(item["occupancy_rate"] for item in previous_data) / len(previous_data) if previous_data else 0
-            else:
-                # 对于其他指标，使用revenue_metrics
-                current_metrics = self.data_repository.calculate_revenue_metrics(
-                    start_date=current_start_dt,
-                    end_date=current_end_dt
-                )
-                previous_metrics = self.data_repository.calculate_revenue_metrics(
-                    start_date=previous_start_dt,
-                    end_date=previous_end_dt
-                )
-                
-                if metric == "revenue":
-                    # 计算总收入
-                    current_value = sum(item["revenue"] for item in current_metrics) if current_metrics else 0
-                    previous_value = sum(item["revenue"] for item in previous_metrics) if previous_metrics else 0
-                elif metric == "adr":
-                    # 计算平均ADR
-                    current_value = sum(item["adr"] for item in current_metrics) / len(current_metrics) if current_metrics else 0
-                    previous_value = sum(item["adr"] for item in previous_metrics) / len(previous_metrics) if previous_metrics else 0
-                elif metric == "revpar":
-                    # 计算平均RevPAR
-                    current_value = sum(item["revpar"] for item in current_metrics) / len(current_metrics) if current_metrics else 0
-                    previous_value = sum(item["revpar"] for item in previous_metrics) / len(previous_metrics) if previous_metrics else 0
-            
-            # 计算变化率
-            if previous_value and previous_value != 0:
-                change_rate = ((current_value - previous_value) / previous_value) * 100
-            else:
-                change_rate = 0
+            # 一次查询获取两个周期的加权KPI和酒店数量
+            summaries = self.data_repository.get_period_summaries({
+                "current": (current_start_dt, current_end_dt),
+                "previous": (previous_start_dt, previous_end_dt)
+            })
             
-            # 获取酒店数量
-            current_hotels_query = self.db.query(HotelData.hotel_name).distinct().filter(
-                HotelData.date_recorded >= current_start_dt,
-                HotelData.date_recorded <= current_end_dt
+            return self._build_comparison(
+                metric,
+                summaries.get("current"),
+                summaries.get("previous"),
+                (current_start, current_end),
+                (previous_start, previous_end)
             )
-            current_hotel_count = current_hotels_query.count()
-            
-            previous_hotels_query = self.db.query(HotelData.hotel_name).distinct().filter(
-                HotelData.date_recorded >= previous_start_dt,
-                HotelData.date_recorded <= previous_end_dt
-            )
-            previous_hotel_count = previous_hotels_query.count()
-            
-            # 构建对比数据
-            result = {
-                "metric": metric,
-                "current": {
-                    "value": round(current_value, 2) if current_value is not None else 0,
-                    "date_range": {
-                        "start_date": current_start,
-                        "end_date": current_end
-                    },
-                    "hotel_count": current_hotel_count
-                },
-                "previous": {
-                    "value": round(previous_value, 2) if previous_value is not None else 0,
-                    "date_range": {
-                        "start_date": previous_start,
-                        "end_date": previous_end
-                    },
-                    "hotel_count": previous_hotel_count
-                },
-                "change_rate": round(change_rate, 2) if change_rate is not None else 0
-            }
-            
-            return result
             
-        except ValueError as e:
+        except ValidationError:
             raise
         except Exception as e:
             logger.error(f"获取对比数据失败: {str(e)}")
             raise DatabaseError(f"获取对比数据失败: {str(e)}")
+    
+    def get_dashboard_batch(self, widgets: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """批量计算仪表盘组件
+        
+        先统一规划再查询：summary和comparison组件的日期窗口去重，trends组件按
+        (日期范围, 粒度) 去重并合并指标，全部通过一次 get_dashboard_aggregates 查询。
+        
+        Args:
+            widgets: 组件参数列表，字段与 DashboardWidgetSpec 一致
+            
+        Returns:
+            组件ID到组件结果的映射，结果格式与对应的单组件接口一致
+        """
+        # 日期窗口 -> 查询标签，相同窗口只查询一次
+        windows: Dict[Tuple[datetime, datetime], str] = {}
+        # (开始日期, 结束日期, 粒度) -> 需要的指标
+        trend_groups: Dict[Tuple[datetime, datetime, str], List[str]] = {}
+        plans = []
+        
+        def window_label(start_dt: datetime, end_dt: datetime) -> str:
+            return windows.setdefault((start_dt, end_dt), f"w{len(windows)}")
+        
+        # 规划阶段只解析和校验参数，不访问数据库
+        for widget in widgets:
+            widget_type = widget["type"]
+            if widget_type == "summary":
+                start_dt = _parse_widget_date(widget.get("start_date"))
+                end_dt = _parse_widget_date(widget.get("end_date"))
+                labels = None
+                if start_dt and end_dt:
+                    labels = (window_label(start_dt, end_dt), window_label(*previous_window(start_dt, end_dt)))
+                plans.append((widget, labels))
+            elif widget_type == "comparison":
+                if widget["metric"] not in VALID_METRICS:
+                    raise ValidationError(f"无效的指标: {widget['metric']}")
+                labels = (
+                    window_label(_parse_widget_date(widget["current_start"]), _parse_widget_date(widget["current_end"])),
+                    window_label(_parse_widget_date(widget["previous_start"]), _parse_widget_date(widget["previous_end"]))
+                )
+                plans.append((widget, labels))
+            else:
+                metrics = [m for m in widget["metrics"].split(",") if m in VALID_METRICS]
+                if not metrics:
+                    raise ValidationError(f"组件 {widget['id']} 未提供有效的指标")
+                start_dt = _parse_widget_date(widget.get("start_date"))
+                end_dt = _parse_widget_date(widget.get("end_date"))
+                group_key = None
+                if start_dt and end_dt:
+                    group_key = (start_dt, end_dt, PERIOD_GROUP_BY.get(widget["period"], "day"))
+                    group_metrics = trend_groups.setdefault(group_key, [])
+                    group_metrics.extend(m for m in metrics if m not in group_metrics)
+                plans.append((widget, (metrics, group_key)))
+        
+        # 窗口汇总和各趋势分组合并为一条语句，一次往返数据库
+        trend_labels = {group_key: f"t{index}" for index, group_key in enumerate(trend_groups)}
+        try:
+            summaries, trend_data = self.data_repository.get_dashboard_aggregates(
+                {label: window for window, label in windows.items()},
+                {
+                    trend_labels[group_key]: (group_key[0], group_key[1], group_key[2], metrics)
+                    for group_key, metrics in trend_groups.items()
+                }
+            )
+        except Exception as e:
+            logger.error(f"批量获取仪表盘数据失败: {str(e)}")
+            raise DatabaseError(f"批量获取仪表盘数据失败: {str(e)}")
+        trend_results = {group_key: trend_data[label] for group_key, label in trend_labels.items()}
+        
+        results = {}
+        for widget, plan in plans:
+            widget_type = widget["type"]
+            if widget_type == "summary":
+                if plan is None:
+                    results[widget["id"]] = self._empty_dashboard_summary(widget.get("start_date"), widget.get("end_date"))
+                else:
+                    results[widget["id"]] = self._build_dashboard_summary(
+                        summaries.get(plan[0]), summaries.get(plan[1]), widget.get("start_date"), widget.get("end_date")
+                    )
+            elif widget_type == "comparison":
+                results[widget["id"]] = self._build_comparison(
+                    widget["metric"],
+                    summaries.get(plan[0]),
+                    summaries.get(plan[1]),
+                    (widget["current_start"], widget["current_end"]),
+                    (widget["previous_start"], widget["previous_end"])
+                )
+            else:
+                metrics, group_key = plan
+                results[widget["id"]] = self._format_trends(
+                    metrics, widget["period"], trend_results.get(group_key),
+                    widget.get("start_date"), widget.get("end_date")
+                )
+        
+        return results
+
+
+def previous_window(start_dt: datetime, end_dt: datetime) -> Tuple[datetime, datetime]:
+    """紧邻 [start_dt, end_dt] 之前的等长窗口"""
+    days_diff = (end_dt - start_dt).days + 1
+    prev_end_date = start_dt - timedelta(days=1)
+    return prev_end_date - timedelta(days=days_diff - 1), prev_end_date
+
+
+def _parse_widget_date(value: Optional[str]) -> Optional[datetime]:
+    """解析组件参数中的日期，格式错误时抛出 ValidationError"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValidationError(f"日期格式错误: {value}，应为 YYYY-MM-DD")
+
+
+def dashboard_cache_entry(widget: Dict[str, Any]) -> Tuple[str, List[str]]:
+    """
+    仪表盘组件的缓存键和标签
+    
+    单组件接口、批量接口和缓存预热共用，保证同一组件在各入口命中同一缓存。
+    
+    Args:
+        widget: 组件参数，字段与 DashboardWidgetSpec 一致
+        
+    Returns:
+        (缓存键, 标签列表)
+    """
+    if widget["type"] == "summary":
+        start_date, end_date = widget.get("start_date"), widget.get("end_date")
+        key = f"dashboard_summary:{start_date}:{end_date}"
+        # 摘要同时比较等长的上一周期，标签覆盖两个周期
+        try:
+            start_day = date.fromisoformat(start_date) if start_date else None
+            end_day = date.fromisoformat(end_date) if end_date else None
+        except ValueError:
+            start_day = end_day = None
+        if start_day and end_day:
+            start_day -= (end_day - start_day) + timedelta(days=1)
+        return key, date_range_tags(start_day, end_day)
+    if widget["type"] == "trends":
+        key = (
+            f"dashboard_trends:{widget['metrics']}:{widget['period']}:"
+            f"{widget.get('start_date')}:{widget.get('end_date')}"
+        )
+        return key, date_range_tags(widget.get("start_date"), widget.get("end_date"))
+    key = (
+        f"dashboard_comparison:{widget['metric']}:{widget['current_start']}:{widget['current_end']}:"
+        f"{widget['previous_start']}:{widget['previous_end']}"
+    )
+    tags = (
+        date_range_tags(widget["current_start"], widget["current_end"])
+        + date_range_tags(widget["previous_start"], widget["previous_end"])
+    )
+    return key, tags
+
+
+def dashboard_widget_window(widget: Dict[str, Any]) -> str:
+    """组件所属的时间窗口预设，对比组件按当前周期判断"""
+    if widget["type"] == "comparison":
+        return match_window_preset(widget["current_start"], widget["current_end"])
+    return match_window_preset(widget.get("start_date"), widget.get("end_date"))
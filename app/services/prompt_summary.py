@@ -0,0 +1,259 @@
+import statistics
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 参与统计的酒店指标
+SUMMARY_METRICS = ("occupancy_rate", "adr", "revpar")
+# 参与异常检测的指标
+ANOMALY_METRICS = ("occupancy_rate", "revpar")
+# 星期名称（date.weekday() 顺序）
+WEEKDAY_NAMES = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+
+
+def _round(value: Optional[float], digits: int = 2) -> Optional[float]:
+    return round(value, digits) if value is not None else None
+
+
+def _distribution(values: List[float]) -> Dict[str, Any]:
+    """
+    计算分布统计量
+
+    Args:
+        values: 非空数值列表
+
+    Returns:
+        包含均值、标准差、最小值、四分位数和最大值的字典
+    """
+    ordered = sorted(values)
+    if len(ordered) >= 2:
+        p25, p50, p75 = statistics.quantiles(ordered, n=4, method="inclusive")
+        std = statistics.pstdev(ordered)
+    else:
+        p25 = p50 = p75 = ordered[0]
+        std = 0.0
+    return {
+        "mean": _round(statistics.fmean(ordered)),
+        "std": _round(std),
+        "min": _round(ordered[0]),
+        "p25": _round(p25),
+        "p50": _round(p50),
+        "p75": _round(p75),
+        "max": _round(ordered[-1])
+    }
+
+
+def _slope(points: List[Tuple[date, float]]) -> Optional[float]:
+    """最小二乘法计算每日变化量，少于两个日期时返回None"""
+    if len(points) < 2:
+        return None
+    xs = [point[0].toordinal() for point in points]
+    ys = [point[1] for point in points]
+    mean_x = statistics.fmean(xs)
+    mean_y = statistics.fmean(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    if denominator == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator
+
+
+def _trend(points: List[Tuple[date, float]]) -> Dict[str, Any]:
+    """
+    计算趋势：每日斜率，以及按斜率推算的整个周期变化幅度（相对均值的百分比）
+
+    Args:
+        points: (日期, 数值) 列表
+
+    Returns:
+        包含slope_per_day和period_change_pct的字典
+    """
+    slope = _slope(points)
+    if slope is None:
+        return {"slope_per_day": None, "period_change_pct": None}
+    span = (max(point[0] for point in points) - min(point[0] for point in points)).days
+    mean = statistics.fmean(point[1] for point in points)
+    change_pct = slope * span / mean * 100 if mean else None
+    return {"slope_per_day": _round(slope, 4), "period_change_pct": _round(change_pct)}
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _group_hotel_rows(rows: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """按酒店名称分组每日数据，去除重复记录"""
+    grouped = defaultdict(dict)
+    for row in rows:
+        row_date = _parse_date(row.get("date"))
+        if row_date is None:
+            continue
+        key = row.get("id") or row_date
+        grouped[row.get("name") or "未知"][key] = {**row, "date": row_date}
+    return {name: sorted(items.values(), key=lambda item: item["date"]) for name, items in grouped.items()}
+
+
+def _summarize_hotel(name: str, rows: List[Dict[str, Any]], anomaly_z: float) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    汇总单个酒店的每日数据
+
+    Args:
+        name: 酒店名称
+        rows: 按日期排序的每日数据
+        anomaly_z: 异常判定的Z分数阈值
+
+    Returns:
+        (酒店特征, 异常点列表)
+    """
+    revenue = [row["revenue"] for row in rows if row.get("revenue") is not None]
+    summary = {
+        "name": name,
+        "location": rows[0].get("location"),
+        "days": len(rows),
+        "total_revenue": _round(sum(revenue)) if revenue else None
+    }
+    anomalies = []
+
+    for metric in SUMMARY_METRICS:
+        points = [(row["date"], row[metric]) for row in rows if row.get(metric) is not None]
+        if not points:
+            continue
+        values = [value for _, value in points]
+        stats = _distribution(values)
+        stats.update(_trend(points))
+        summary[metric] = stats
+
+        if metric not in ANOMALY_METRICS or len(values) < 3:
+            continue
+        mean = statistics.fmean(values)
+        std = statistics.pstdev(values)
+        if std == 0:
+            continue
+        for point_date, value in points:
+            z = (value - mean) / std
+            if abs(z) >= anomaly_z:
+                anomalies.append({
+                    "hotel": name,
+                    "date": point_date.isoformat(),
+                    "metric": metric,
+                    "value": _round(value),
+                    "hotel_mean": _round(mean),
+                    "z_score": _round(z)
+                })
+
+    return summary, anomalies
+
+
+def _summarize_portfolio(daily_kpis: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    汇总整体每日KPI：分布、趋势和星期分布
+
+    Args:
+        daily_kpis: {日期: {指标: 数值}}
+
+    Returns:
+        整体特征字典
+    """
+    series = defaultdict(list)
+    weekdays = defaultdict(lambda: defaultdict(list))
+    for date_str, values in daily_kpis.items():
+        day = _parse_date(date_str)
+        if day is None:
+            continue
+        for metric, value in values.items():
+            if value is None:
+                continue
+            series[metric].append((day, value))
+            weekdays[metric][day.weekday()].append(value)
+
+    result = {}
+    for metric, points in series.items():
+        points.sort(key=lambda point: point[0])
+        stats = _distribution([value for _, value in points])
+        stats.update(_trend(points))
+        if metric in ("occupancy_rate", "adr"):
+            stats["weekday_mean"] = {
+                WEEKDAY_NAMES[weekday]: _round(statistics.fmean(values))
+                for weekday, values in sorted(weekdays[metric].items())
+            }
+        result[metric] = stats
+    return result
+
+
+def _round_nested(value: Any) -> Any:
+    if isinstance(value, float):
+        return _round(value)
+    if isinstance(value, dict):
+        return {key: _round_nested(item) for key, item in value.items()}
+    return value
+
+
+def summarize_hotel_data(
+    hotel_data: Dict[str, Any],
+    max_hotels: int = 20,
+    top_movers: int = 5,
+    max_anomalies: int = 10,
+    anomaly_z: float = 3.0
+) -> Dict[str, Any]:
+    """
+    将 AIService._get_hotel_data 的结果压缩为规模有界的统计特征，用作提示词的数据部分
+
+    特征数量只与酒店数量上限、榜单长度有关，与日期范围长度无关：
+    - 每个酒店各指标的分布统计（均值、标准差、四分位数）和趋势斜率
+    - RevPAR趋势变化最大的酒店（上升/下降）
+    - 偏离自身均值最多的异常日
+    - 整体每日KPI的分布、趋势和星期分布
+
+    Args:
+        hotel_data: _get_hotel_data 返回的数据
+        max_hotels: 逐一列出的酒店数量上限（按总收入排序），其余只计数
+        top_movers: 上升/下降榜单各自的长度
+        max_anomalies: 异常点数量上限（按Z分数绝对值排序）
+        anomaly_z: 异常判定的Z分数阈值
+
+    Returns:
+        统计特征字典
+    """
+    grouped = _group_hotel_rows(hotel_data.get("hotels", []))
+
+    hotels = []
+    anomalies = []
+    for name, rows in grouped.items():
+        summary, hotel_anomalies = _summarize_hotel(name, rows, anomaly_z)
+        hotels.append(summary)
+        anomalies.extend(hotel_anomalies)
+    hotels.sort(key=lambda item: item["total_revenue"] or 0, reverse=True)
+
+    # 按RevPAR周期变化幅度排序
+    movers = [
+        {
+            "hotel": item["name"],
+            "revpar_period_change_pct": item["revpar"]["period_change_pct"],
+            "revpar_mean": item["revpar"]["mean"]
+        }
+        for item in hotels
+        if item.get("revpar", {}).get("period_change_pct") is not None
+    ]
+    movers.sort(key=lambda item: item["revpar_period_change_pct"], reverse=True)
+    anomalies.sort(key=lambda item: abs(item["z_score"]), reverse=True)
+
+    return {
+        "period": hotel_data.get("period"),
+        "previous_period": hotel_data.get("previous_period"),
+        "hotel_count": len(hotels),
+        "kpi_summary": _round_nested(hotel_data.get("kpi_summary", {})),
+        "portfolio_daily": _summarize_portfolio(hotel_data.get("daily_kpis", {})),
+        "regional_kpis": _round_nested(hotel_data.get("regional_kpis", {})),
+        "hotels": hotels[:max_hotels],
+        "omitted_hotel_count": max(0, len(hotels) - max_hotels),
+        "top_movers": {
+            "rising": [item for item in movers[:top_movers] if item["revpar_period_change_pct"] > 0],
+            "falling": [item for item in reversed(movers[-top_movers:]) if item["revpar_period_change_pct"] < 0]
+        },
+        "anomalies": anomalies[:max_anomalies],
+        "anomaly_count": len(anomalies)
+    }
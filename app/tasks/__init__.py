@@ -1,13 +1,19 @@
 from .celery_app import celery_app
 from .data_processing import process_excel_data
-from .ai_analysis import generate_ai_analysis
+from .ai_analysis import generate_ai_analysis, generate_ai_analysis_batch
 from .report_generation import generate_pdf_report, generate_ppt_report
+from .maintenance import maintain_hotel_data_partitions, rebuild_hotel_data_rollups
+from .cache_warming import warm_dashboard_cache
 
 # 导出所有任务
 __all__ = [
     "celery_app",
     "process_excel_data",
     "generate_ai_analysis",
+    "generate_ai_analysis_batch",
     "generate_pdf_report",
-    "generate_ppt_report"
+    "generate_ppt_report",
+    "maintain_hotel_data_partitions",
+    "rebuild_hotel_data_rollups",
+    "warm_dashboard_cache"
 ] 
\ No newline at end of file
@@ -1,19 +1,28 @@
 import logging
 import json
+import random
 import httpx
+from typing import List
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
+from celery.exceptions import Retry
 from .celery_app import celery_app
 from ..config.database import SessionLocal, get_db
 from ..config.settings import settings
 from ..models import HotelData, KPIMetric, Report
-from ..utils.exceptions import AIServiceError
+from ..utils.exceptions import AIServiceError, AIRateLimitError
 from ..services.ai_service import AIService
 from ..services.task_service import TaskService
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+def _retry_countdown(retry_after: float, retries: int) -> float:
+    """限流重试的等待时间：不少于 Retry-After，随重试次数指数增长，并加随机抖动分散重试"""
+    base = max(retry_after, settings.AI_RETRY_BASE_DELAY * (2 ** retries))
+    return min(base, 600) + random.uniform(0, base / 2)
+
+
 @celery_app.task(bind=True, name="generate_ai_analysis")
 def generate_ai_analysis(self, report_id: int, task_id: str = None):
     """生成AI分析报告
@@ -91,6 +100,12 @@ def generate_ai_analysis(self, report_id: int, task_id: str = None):
             db.close()
             
     except Exception as e:
+        # 限流时稍后重试，而不是直接失败
+        if isinstance(e, AIRateLimitError) and self.request.retries < settings.AI_TASK_MAX_RETRIES:
+            countdown = _retry_countdown(e.retry_after, self.request.retries)
+            logger.warning(f"AI服务限流，{countdown:.0f}秒后重试报告{report_id}的分析（第{self.request.retries + 1}次）")
+            raise self.retry(exc=e, countdown=countdown)
+        
         logger.error(f"生成AI分析报告失败: {str(e)}")
         
         # 如果有任务ID，更新任务状态为失败
@@ -106,4 +121,82 @@ def generate_ai_analysis(self, report_id: int, task_id: str = None):
             except Exception as task_error:
                 logger.error(f"更新任务状态失败: {str(task_error)}")
         
-        raise
\ No newline at end of file
+        raise
+
+@celery_app.task(bind=True, name="generate_ai_analysis_batch")
+def generate_ai_analysis_batch(self, report_ids: List[int]):
+    """批量生成AI分析报告（如夜间为全部酒店生成分析）
+    
+    AI调用在进程内并发进行，并发数由 AI_MAX_CONCURRENCY 限制。
+    
+    Args:
+        report_ids: 报告ID列表
+    
+    Returns:
+        Dict: 包含成功和失败报告ID的字典
+    """
+    logger.info(f"开始批量生成AI分析报告: {len(report_ids)}个")
+    self.update_state(state="PROCESSING", meta={"progress": 10})
+    
+    db = SessionLocal()
+    try:
+        reports = db.query(Report).filter(Report.id.in_(report_ids)).all()
+        
+        requests = []
+        for report in reports:
+            content_data = report.content_data or {}
+            requests.append({
+                "hotel_ids": content_data.get("hotel_ids", []),
+                "date_range": content_data.get("date_range", {}),
+                "analysis_type": content_data.get("analysis_type", "comprehensive")
+            })
+        
+        self.update_state(state="PROCESSING", meta={"progress": 20})
+        
+        ai_service = AIService(db)
+        results = ai_service.generate_analyses(requests)
+        
+        self.update_state(state="PROCESSING", meta={"progress": 90})
+        
+        completed, failed, rate_limited = [], {}, {}
+        now = datetime.utcnow()
+        for report, result in zip(reports, results):
+            if result["status"] == "completed":
+                report.ai_insights = result["result"]
+                report.updated_at = now
+                completed.append(report.id)
+            elif "retry_after" in result:
+                rate_limited[report.id] = result["retry_after"]
+            else:
+                failed[report.id] = result["error"]
+        db.commit()
+        
+        # 因限流失败的报告稍后重试，已完成的结果已经保存
+        if rate_limited:
+            if self.request.retries < settings.AI_TASK_MAX_RETRIES:
+                countdown = _retry_countdown(max(rate_limited.values()), self.request.retries)
+                logger.warning(
+                    f"AI服务限流，{countdown:.0f}秒后重试{len(rate_limited)}个报告的分析（第{self.request.retries + 1}次）"
+                )
+                raise self.retry(args=[list(rate_limited)], countdown=countdown)
+            for report_id in rate_limited:
+                failed[report_id] = "AI服务请求过于频繁，重试次数已用尽"
+        
+        missing = set(report_ids) - {report.id for report in reports}
+        for report_id in missing:
+            failed[report_id] = f"未找到报告ID: {report_id}"
+        
+        logger.info(f"批量生成AI分析报告完成: 成功{len(completed)}个，失败{len(failed)}个")
+        return {
+            "success": not failed,
+            "message": "批量AI分析生成完成",
+            "completed": completed,
+            "failed": failed
+        }
+    except Retry:
+        raise
+    except Exception as e:
+        logger.error(f"批量生成AI分析报告失败: {str(e)}")
+        raise
+    finally:
+        db.close()
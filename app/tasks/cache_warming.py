@@ -0,0 +1,116 @@
+import logging
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+from .celery_app import celery_app
+from ..config.cache import cache
+from ..config.database import SessionLocal
+from ..config.settings import settings
+from ..services.kpi_service import KPIService, dashboard_cache_entry, previous_window
+from ..utils.date_windows import parse_window_presets, resolve_window_preset
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+def build_warm_widgets(presets: List[str], today: date) -> List[Dict[str, Any]]:
+    """
+    生成预设窗口需要预热的仪表盘组件
+
+    每个窗口预热摘要、配置的趋势周期，以及各指标与上一等长周期的对比，
+    参数取值与前端调用单组件接口时的默认值一致，保证缓存键相同。
+
+    Args:
+        presets: 时间窗口预设名称列表
+        today: 基准日期
+
+    Returns:
+        组件参数列表，字段与 DashboardWidgetSpec 一致
+    """
+    trend_periods = [period.strip() for period in settings.CACHE_WARM_TREND_PERIODS.split(",") if period.strip()]
+    comparison_metrics = [metric.strip() for metric in settings.CACHE_WARM_COMPARISON_METRICS.split(",") if metric.strip()]
+
+    widgets = []
+    for preset in presets:
+        start_day, end_day = resolve_window_preset(preset, today)
+        previous_start, previous_end = previous_window(start_day, end_day)
+        start_date, end_date = start_day.isoformat(), end_day.isoformat()
+
+        widgets.append({"id": f"{preset}:summary", "type": "summary", "start_date": start_date, "end_date": end_date})
+        for period in trend_periods:
+            widgets.append({
+                "id": f"{preset}:trends:{period}",
+                "type": "trends",
+                "metrics": settings.CACHE_WARM_TREND_METRICS,
+                "period": period,
+                "start_date": start_date,
+                "end_date": end_date
+            })
+        for metric in comparison_metrics:
+            widgets.append({
+                "id": f"{preset}:comparison:{metric}",
+                "type": "comparison",
+                "metric": metric,
+                "current_start": start_date,
+                "current_end": end_date,
+                "previous_start": previous_start.isoformat(),
+                "previous_end": previous_end.isoformat()
+            })
+    return widgets
+
+@celery_app.task(bind=True, name="warm_dashboard_cache")
+def warm_dashboard_cache(self, presets: Optional[List[str]] = None, force: bool = False) -> Dict[str, Any]:
+    """
+    预热常用时间窗口的仪表盘缓存
+
+    定时执行、每次导入完成后及服务启动时触发。已缓存且无需提前刷新的组件跳过，
+    其余组件通过 get_dashboard_batch 合并查询后批量写入缓存。
+
+    Args:
+        presets: 时间窗口预设，默认使用 CACHE_WARM_PRESETS
+        force: 是否忽略已有缓存全部重新计算
+
+    Returns:
+        Dict: 预热组件数量及各时间窗口的缓存命中率
+    """
+    presets = parse_window_presets(",".join(presets) if presets else settings.CACHE_WARM_PRESETS)
+    widgets = build_warm_widgets(presets, date.today())
+    cache_entries = {widget["id"]: dashboard_cache_entry(widget) for widget in widgets}
+
+    cached = {} if force else cache.get_many([key for key, _ in cache_entries.values()])
+    missing = [widget for widget in widgets if cache_entries[widget["id"]][0] not in cached]
+
+    if missing:
+        db = SessionLocal()
+        try:
+            # 计算前记录数据版本，预热期间发生导入的组件不写入缓存
+            versions = cache.snapshot_data_versions(
+                tag for widget in missing for tag in cache_entries[widget["id"]][1]
+            )
+            started = time.time()
+            computed = KPIService(db).get_dashboard_batch(missing)
+            cache.set_many(
+                {cache_entries[widget_id][0]: (value, cache_entries[widget_id][1]) for widget_id, value in computed.items()},
+                expire=settings.DASHBOARD_CACHE_TTL,
+                delta=time.time() - started,
+                versions=versions
+            )
+        except Exception as e:
+            logger.error(f"仪表盘缓存预热失败: {str(e)}")
+            raise
+        finally:
+            db.close()
+
+    window_stats = cache.get_window_stats()
+    logger.info(
+        f"仪表盘缓存预热完成: 窗口{len(presets)}个, 组件{len(widgets)}个, 重新计算{len(missing)}个; "
+        + ", ".join(f"{window}命中率{item['hit_rate']:.1%}({item['requests']})" for window, item in window_stats.items())
+    )
+    return {
+        "status": "success",
+        "result": {
+            "presets": presets,
+            "widgets": len(widgets),
+            "computed": len(missing),
+            "window_stats": window_stats
+        }
+    }
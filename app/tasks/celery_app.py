@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.schedules import crontab
 import logging
 from ..config.settings import settings
 
@@ -25,6 +26,33 @@ celery_app.conf.update(
     worker_prefetch_multiplier=4,
     task_acks_late=True,
     task_reject_on_worker_lost=True,
+    # 进程内的优先级信号量只在单个worker进程内生效，跨进程按队列区分交互和批量AI分析
+    task_default_queue="celery",
+    task_routes={
+        task_name: {"queue": queue}
+        for task_name, queue in (
+            ("generate_ai_analysis", settings.CELERY_AI_INTERACTIVE_QUEUE),
+            ("generate_ai_analysis_batch", settings.CELERY_AI_BATCH_QUEUE),
+        )
+        if queue
+    },
+    beat_schedule={
+        # 每天凌晨提前创建未来月份的hotel_data分区
+        "maintain-hotel-data-partitions": {
+            "task": "maintain_hotel_data_partitions",
+            "schedule": crontab(hour=2, minute=0),
+        },
+        # 汇总不完整时（首次部署、关闭汇总期间写入过数据）重建预聚合汇总
+        "rebuild-hotel-data-rollups": {
+            "task": "rebuild_hotel_data_rollups",
+            "schedule": crontab(hour=2, minute=30),
+        },
+        # 定时预热常用时间窗口的仪表盘缓存
+        "warm-dashboard-cache": {
+            "task": "warm_dashboard_cache",
+            "schedule": settings.CACHE_WARM_INTERVAL_MINUTES * 60.0,
+        },
+    },
 )
 
 # 自动发现任务
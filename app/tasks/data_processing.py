@@ -2,17 +2,23 @@ import pandas as pd
 import logging
 import os
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
+from openpyxl import load_workbook
 from .celery_app import celery_app
 from ..config.database import SessionLocal, get_db
+from ..config.cache import cache, ingest_tags
 from ..models import HotelData, KPIMetric
 from ..utils.exceptions import ValidationError, FileError
 from ..services.task_service import TaskService
 from ..repositories.data_repository import DataRepository
+from .cache_warming import warm_dashboard_cache
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 流式导入时每块的行数
+INGEST_CHUNK_SIZE = 5000
+
 @celery_app.task(bind=True, name="process_excel_data")
 def process_excel_data(self, file_path: str, overwrite: bool = False, task_id: Optional[str] = None) -> Dict[str, Any]:
     """处理Excel数据文件
@@ -30,6 +36,9 @@ def process_excel_data(self, file_path: str, overwrite: bool = False, task_id: O
     # 更新任务状态
     self.update_state(state="PROCESSING", meta={"progress": 10})
     
+    # 已入库的行数，失败时用于记录部分导入
+    rows_processed = 0
+    
     try:
         # 检查文件是否存在
         if not os.path.exists(file_path):
@@ -38,45 +47,85 @@ def process_excel_data(self, file_path: str, overwrite: bool = False, task_id: O
         # 获取数据库会话
         db = SessionLocal()
         try:
-            # 读取Excel文件
-            if file_path.lower().endswith('.csv'):
-                df = pd.read_csv(file_path)
-                logger.info("读取CSV文件成功")
-            else:
-                df = pd.read_excel(file_path)
-                logger.info("读取Excel文件成功")
-            
-            # 更新任务状态
-            self.update_state(state="PROCESSING", meta={"progress": 30})
-            
-            # 验证数据
-            validate_hotel_data(df)
-            
-            # 更新任务状态
-            self.update_state(state="PROCESSING", meta={"progress": 50})
-            
             # 创建数据仓库
             data_repo = DataRepository(db)
+            task_service = TaskService(db) if task_id else None
+            
+            hotel_count = 0
+            kpi_count = 0
+            last_progress = 10
             
-            # 处理数据并存储到数据库
-            results = data_repo.store_hotel_data(df, overwrite)
+            # 先完整验证一遍文件（业务规则只涉及单行），有错误时不写入任何数据，保持导入的原子性
+            rows_validated = 0
+            for chunk, fraction in iter_hotel_data_chunks(file_path):
+                try:
+                    validate_hotel_data(chunk)
+                except ValidationError as e:
+                    e.details = {**(e.details or {}), "row_offset": rows_validated}
+                    raise
+                rows_validated += len(chunk)
+                progress = 10 + int(min(fraction, 1.0) * 20)
+                if progress != last_progress:
+                    self.update_state(
+                        state="PROCESSING",
+                        meta={"progress": progress, "rows_validated": rows_validated}
+                    )
+                    last_progress = progress
             
-            # 更新任务状态
-            self.update_state(state="PROCESSING", meta={"progress": 80})
+            # 再分块入库并计算KPI，内存占用与文件大小无关
+            for chunk, fraction in iter_hotel_data_chunks(file_path):
+                # 转换日期和数值列（上一遍已验证通过）
+                validate_hotel_data(chunk)
+                
+                # 处理数据并存储到数据库
+                results = data_repo.store_hotel_data(chunk, overwrite)
+                
+                # 计算KPI指标
+                kpi_results = data_repo.calculate_hotel_kpis(results["hotel_ids"], results.get("frame"))
+                
+                # 失效本块数据涉及的酒店、月份对应的缓存
+                hotel_months = pd.DataFrame({
+                    "hotel_name": chunk["hotel_name"],
+                    "month": pd.to_datetime(chunk["date_recorded"]).dt.to_period("M").dt.start_time.dt.date
+                }).dropna().drop_duplicates()
+                cache.invalidate_tags(ingest_tags(hotel_months.itertuples(index=False, name=None)))
+                
+                hotel_count += len(results["hotel_ids"])
+                kpi_count += len(kpi_results)
+                rows_processed += len(chunk)
+                
+                # 更新任务状态（30%~95%按文件读取进度分配）
+                progress = 30 + int(min(fraction, 1.0) * 65)
+                self.update_state(
+                    state="PROCESSING",
+                    meta={"progress": progress, "rows_processed": rows_processed}
+                )
+                if task_service and progress != last_progress:
+                    task_service.update_task_status(
+                        task_id=task_id,
+                        status="processing",
+                        progress=progress
+                    )
+                last_progress = progress
+            
+            logger.info(f"文件处理完成: {file_path}, 共 {rows_processed} 行")
             
-            # 计算KPI指标
-            kpi_results = data_repo.calculate_hotel_kpis(results["hotel_ids"])
+            # 导入已使相关缓存失效，重新预热常用时间窗口
+            try:
+                warm_dashboard_cache.delay()
+            except Exception as warm_error:
+                logger.warning(f"触发仪表盘缓存预热失败: {str(warm_error)}")
             
             # 如果有任务ID，更新任务状态
             if task_id:
-                task_service = TaskService(db)
                 task_service.update_task_status(
                     task_id=task_id,
                     status="completed",
                     progress=100,
                     result_data={
-                        "hotel_count": len(results["hotel_ids"]),
-                        "kpi_count": len(kpi_results),
+                        "hotel_count": hotel_count,
+                        "kpi_count": kpi_count,
+                        "rows_processed": rows_processed,
                         "file_path": file_path
                     }
                 )
@@ -85,8 +134,9 @@ def process_excel_data(self, file_path: str, overwrite: bool = False, task_id: O
             return {
                 "success": True,
                 "message": "数据处理成功",
-                "hotel_count": len(results["hotel_ids"]),
-                "kpi_count": len(kpi_results),
+                "hotel_count": hotel_count,
+                "kpi_count": kpi_count,
+                "rows_processed": rows_processed,
                 "file_path": file_path
             }
             
@@ -96,6 +146,10 @@ def process_excel_data(self, file_path: str, overwrite: bool = False, task_id: O
     except Exception as e:
         logger.error(f"处理文件失败: {str(e)}")
         
+        # 入库阶段出错时，之前的数据块已经提交，在结果中记录已导入的行数
+        if rows_processed:
+            logger.error(f"文件部分导入: {file_path}, 已导入 {rows_processed} 行")
+        
         # 如果有任务ID，更新任务状态为失败
         if task_id:
             try:
@@ -104,6 +158,11 @@ def process_excel_data(self, file_path: str, overwrite: bool = False, task_id: O
                 task_service.update_task_status(
                     task_id=task_id,
                     status="failed",
+                    result_data={
+                        "rows_processed": rows_processed,
+                        "partial": rows_processed > 0,
+                        "file_path": file_path
+                    },
                     error_message=str(e)
                 )
             except Exception as task_error:
@@ -160,4 +219,65 @@ def validate_hotel_data(df: pd.DataFrame) -> bool:
     if (df["revenue"] < 0).any():
         raise ValidationError("收入不能为负数", details={"rule": "revenue >= 0"})
     
-    return True 
\ No newline at end of file
+    return True
+
+def normalize_columns(names: Iterable[Any]) -> List[str]:
+    """规范化表头：去除首尾空白，空表头记为空字符串"""
+    return [str(name).strip() if name is not None else "" for name in names]
+
+def iter_hotel_data_chunks(file_path: str, chunk_size: int = INGEST_CHUNK_SIZE) -> Iterator[Tuple[pd.DataFrame, float]]:
+    """分块读取数据文件
+    
+    CSV使用pandas分块读取，XLSX使用openpyxl只读模式逐行读取，
+    其他格式（如旧版xls）整体读取后再切块。
+    
+    Args:
+        file_path: 文件路径
+        chunk_size: 每块的行数
+    
+    Yields:
+        (数据块, 已读取比例 0~1)
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    
+    if extension == ".csv":
+        total_bytes = os.path.getsize(file_path) or 1
+        with open(file_path, "rb") as file_obj:
+            for chunk in pd.read_csv(file_obj, chunksize=chunk_size):
+                chunk.columns = normalize_columns(chunk.columns)
+                yield chunk, file_obj.tell() / total_bytes
+        return
+    
+    if extension in (".xlsx", ".xlsm"):
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = normalize_columns(header)
+            # 只读模式下max_row来自表格维度信息，可能缺失
+            total_rows = max((sheet.max_row or 0) - 1, 1)
+            
+            buffer = []
+            rows_read = 0
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                buffer.append(row)
+                rows_read += 1
+                if len(buffer) >= chunk_size:
+                    yield pd.DataFrame(buffer, columns=columns), rows_read / total_rows
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=columns), 1.0
+        finally:
+            workbook.close()
+        return
+    
+    df = pd.read_excel(file_path)
+    df.columns = normalize_columns(df.columns)
+    total_rows = max(len(df), 1)
+    for offset in range(0, len(df), chunk_size):
+        yield df.iloc[offset:offset + chunk_size].copy(), min(offset + chunk_size, total_rows) / total_rows
@@ -0,0 +1,80 @@
+import logging
+from datetime import date
+from typing import Dict, Any
+import pandas as pd
+from .celery_app import celery_app
+from ..config.database import SessionLocal
+from ..config.settings import settings
+from ..repositories.data_repository import DataRepository
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+@celery_app.task(bind=True, name="maintain_hotel_data_partitions")
+def maintain_hotel_data_partitions(self) -> Dict[str, Any]:
+    """
+    维护 hotel_data 月分区
+    
+    提前创建当前月及未来 PARTITION_PREMAKE_MONTHS 个月的分区；
+    PARTITION_RETENTION_MONTHS 大于0时，将超出保留期的分区及其KPI、汇总行移到归档schema。
+    
+    Returns:
+        Dict: 包含新建和归档分区名称的字典
+    """
+    today = date.today()
+    premake_until = (pd.Timestamp(today) + pd.DateOffset(months=settings.PARTITION_PREMAKE_MONTHS)).date()
+    
+    db = SessionLocal()
+    try:
+        data_repo = DataRepository(db)
+        created = data_repo.ensure_partitions(today.replace(day=1), premake_until)
+        
+        archived = []
+        if settings.PARTITION_RETENTION_MONTHS > 0:
+            cutoff = (pd.Timestamp(today.replace(day=1)) - pd.DateOffset(months=settings.PARTITION_RETENTION_MONTHS)).date()
+            archived = data_repo.archive_partitions(cutoff)
+        
+        logger.info(f"hotel_data分区维护完成: 新建{len(created)}个, 归档{len(archived)}个")
+        return {
+            "status": "success",
+            "result": {
+                "created": created,
+                "archived": archived
+            }
+        }
+    except Exception as e:
+        logger.error(f"hotel_data分区维护失败: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+@celery_app.task(bind=True, name="rebuild_hotel_data_rollups")
+def rebuild_hotel_data_rollups(self, force: bool = False) -> Dict[str, Any]:
+    """
+    重建预聚合汇总
+    
+    汇总覆盖水位缺失或晚于最早的原始数据时（首次部署、关闭汇总期间写入过数据）
+    按全部原始数据重建；force为True时总是重建。未启用汇总时不做任何操作。
+    
+    Args:
+        force: 是否忽略覆盖水位强制重建
+    
+    Returns:
+        Dict: 包含是否执行了重建的字典
+    """
+    if not settings.ROLLUP_ENABLED:
+        return {"status": "skipped", "result": {"rebuilt": False}}
+    
+    db = SessionLocal()
+    try:
+        data_repo = DataRepository(db)
+        if not force and data_repo.rollups_complete():
+            return {"status": "success", "result": {"rebuilt": False}}
+        
+        data_repo.rebuild_rollups()
+        return {"status": "success", "result": {"rebuilt": True}}
+    except Exception as e:
+        logger.error(f"重建预聚合汇总失败: {str(e)}")
+        raise
+    finally:
+        db.close()
@@ -4,7 +4,8 @@ from .exceptions import (
     NotFoundError,
     DatabaseError,
     FileError,
-    AIServiceError
+    AIServiceError,
+    AIRateLimitError
 )
 
 from .file_handler import (
@@ -21,6 +22,7 @@ __all__ = [
     "DatabaseError",
     "FileError",
     "AIServiceError",
+    "AIRateLimitError",
     "save_upload_file",
     "get_file_url",
     "delete_file"
@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+from typing import List, Optional, Tuple, Union
+
+# 常用报表时间窗口预设，按匹配优先级排序
+WINDOW_PRESETS = [
+    "today",
+    "last_7_days",
+    "last_30_days",
+    "last_90_days",
+    "month_to_date",
+    "year_to_date",
+]
+
+# 不属于任何预设的时间窗口
+CUSTOM_WINDOW = "custom"
+
+
+def resolve_window_preset(name: str, today: Optional[date] = None) -> Tuple[date, date]:
+    """
+    计算预设时间窗口的起止日期（包含今天）
+
+    Args:
+        name: 预设名称，见 WINDOW_PRESETS
+        today: 基准日期，默认为当前日期
+
+    Returns:
+        (开始日期, 结束日期)
+    """
+    today = today or date.today()
+    if name == "today":
+        return today, today
+    if name == "last_7_days":
+        return today - timedelta(days=6), today
+    if name == "last_30_days":
+        return today - timedelta(days=29), today
+    if name == "last_90_days":
+        return today - timedelta(days=89), today
+    if name == "month_to_date":
+        return today.replace(day=1), today
+    if name == "year_to_date":
+        return today.replace(month=1, day=1), today
+    raise ValueError(f"不支持的时间窗口预设: {name}")
+
+
+def parse_window_presets(value: str) -> List[str]:
+    """解析逗号分隔的预设列表，忽略不支持的名称"""
+    return [name.strip() for name in value.split(",") if name.strip() in WINDOW_PRESETS]
+
+
+def match_window_preset(
+    start_date: Optional[Union[str, date]],
+    end_date: Optional[Union[str, date]],
+    today: Optional[date] = None
+) -> str:
+    """
+    查找与日期范围一致的预设窗口，用于按窗口统计缓存命中率
+
+    Args:
+        start_date: 开始日期（date或YYYY-MM-DD）
+        end_date: 结束日期（date或YYYY-MM-DD）
+        today: 基准日期，默认为当前日期
+
+    Returns:
+        预设名称，没有匹配时返回 CUSTOM_WINDOW
+    """
+    try:
+        start_day = date.fromisoformat(start_date) if isinstance(start_date, str) else start_date
+        end_day = date.fromisoformat(end_date) if isinstance(end_date, str) else end_date
+    except ValueError:
+        return CUSTOM_WINDOW
+    if not start_day or not end_day:
+        return CUSTOM_WINDOW
+
+    today = today or date.today()
+    for name in WINDOW_PRESETS:
+        if resolve_window_preset(name, today) == (start_day, end_day):
+            return name
+    return CUSTOM_WINDOW
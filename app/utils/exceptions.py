@@ -113,4 +113,22 @@ class AIServiceError(AppException):
             status_code=500,
             error_code="AI_SERVICE_ERROR",
             details=details
-        ) 
\ No newline at end of file
+        ) 
+
+class AIRateLimitError(AIServiceError):
+    """AI服务限流错误（供应商返回429，或本地配额在等待上限内无法满足）"""
+    
+    def __init__(
+        self,
+        message: str,
+        retry_after: float,
+        details: Optional[Dict[str, Any]] = None
+    ):
+        self.retry_after = retry_after
+        AppException.__init__(
+            self,
+            message=message,
+            status_code=429,
+            error_code="AI_RATE_LIMITED",
+            details={**(details or {}), "retry_after": retry_after}
+        )
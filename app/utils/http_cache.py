@@ -0,0 +1,81 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import Request, Response
+from ..config.cache import async_cache
+from ..config.settings import settings
+
+def datetime_version(value: datetime) -> int:
+    """将UTC时间（数据库中的naive datetime）转换为毫秒版本号"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+def _build_etag(request: Request, version: int) -> str:
+    """ETag由接口版本、请求路径、查询参数和数据版本决定"""
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    source = f"{settings.APP_VERSION}|{request.url.path}?{query}|{version}"
+    # 压缩等传输层变换不改变语义，使用弱ETag
+    return f'W/"{hashlib.sha1(source.encode()).hexdigest()[:24]}"'
+
+def _is_not_modified(request: Request, etag: str, version: int) -> bool:
+    """按 If-None-Match 优先、If-Modified-Since 其次判断客户端缓存是否仍然有效"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+        # 弱比较：忽略 W/ 前缀
+        return "*" in candidates or any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP日期精确到秒
+        return version // 1000 <= since
+    return False
+
+def check_not_modified(request: Request, response: Response, version: int) -> Optional[Response]:
+    """
+    根据数据版本设置 ETag 和 Last-Modified，客户端缓存仍然有效时返回304响应
+
+    Args:
+        request: 请求对象
+        response: 路由的响应对象，用于写入校验头
+        version: 数据版本（毫秒时间戳）
+
+    Returns:
+        304响应；需要返回完整内容时返回None
+    """
+    etag = _build_etag(request, version)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(version / 1000, usegmt=True),
+        # 允许浏览器缓存，但每次使用前都需要重新验证
+        "Cache-Control": "private, no-cache"
+    }
+    if _is_not_modified(request, etag, version):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+async def check_data_version(request: Request, response: Response, tags: Iterable[str]) -> Optional[Response]:
+    """
+    以缓存标签的数据版本水位作为校验依据，判断是否可以返回304
+
+    数据版本保存在Redis中，导入数据时随标签失效一起推进，判断过程不访问数据库。
+
+    Args:
+        request: 请求对象
+        response: 路由的响应对象，用于写入校验头
+        tags: 响应内容依赖的缓存标签
+
+    Returns:
+        304响应；需要返回完整内容（或Redis不可用）时返回None
+    """
+    version = await async_cache.get_data_version(tags)
+    if version is None:
+        return None
+    return check_not_modified(request, response, version)
@@ -0,0 +1,55 @@
+import json
+from typing import Any, Optional
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from ..config.codec import ORJSON_OPTIONS, json_default, orjson, stringify_keys
+
+# 由路由写入、直接返回Response对象时需要保留的响应头
+PASSTHROUGH_HEADERS = ("etag", "last-modified", "cache-control", "vary")
+
+def dumps_json(content: Any) -> bytes:
+    """将数据编码为紧凑的UTF-8 JSON字节串，优先使用orjson（编码选项与缓存编解码器一致）"""
+    if orjson is None:
+        return json.dumps(
+            stringify_keys(content), ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=json_default
+        ).encode("utf-8")
+    return orjson.dumps(content, default=json_default, option=ORJSON_OPTIONS)
+
+class FastJSONResponse(JSONResponse):
+    """使用orjson编码的JSON响应，作为应用的默认响应类"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+def trusted_json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    直接编码可信数据（仓库层/缓存中的字典）并返回，跳过 response_model 校验和 jsonable_encoder
+
+    只用于结构由服务端保证的数据，响应结构仍需与路由声明的 response_model 一致。
+
+    Args:
+        content: 可JSON序列化的数据（允许date/datetime/Decimal/numpy标量）
+        response: 路由注入的响应对象，其中的ETag等校验头会被保留
+        status_code: 状态码
+
+    Returns:
+        JSON响应
+    """
+    headers = None
+    if response is not None:
+        headers = {name: value for name, value in response.headers.items() if name in PASSTHROUGH_HEADERS}
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+def sse_event(event: str, data: Any) -> bytes:
+    """
+    编码一条 server-sent events 消息
+
+    Args:
+        event: 事件名称
+        data: 可JSON序列化的数据，编码为单行JSON
+
+    Returns:
+        以空行结尾的事件字节串
+    """
+    payload = dumps_json(data)
+    return b"event: " + event.encode() + b"\ndata: " + payload + b"\n\n"
@@ -0,0 +1,49 @@
+"""为HotelData添加 (hotel_name, date_recorded) 唯一约束
+
+Revision ID: 3b7c1d2e4f5a
+Revises: ee05f9f18ce9
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c1d2e4f5a'
+down_revision: Union[str, None] = 'ee05f9f18ce9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 同一 (hotel_name, date_recorded) 的重复记录，保留最近更新的一条
+DUPLICATE_IDS_SQL = """
+    SELECT id FROM (
+        SELECT id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY hotel_name, date_recorded
+                   ORDER BY updated_at DESC, id DESC
+               ) AS rn
+        FROM hotel_data
+    ) ranked
+    WHERE ranked.rn > 1
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 先清理历史重复数据，否则无法创建唯一约束
+    op.execute(f"DELETE FROM kpi_metric WHERE hotel_id IN ({DUPLICATE_IDS_SQL})")
+    op.execute(f"DELETE FROM hotel_data WHERE id IN ({DUPLICATE_IDS_SQL})")
+    op.create_unique_constraint(
+        'uq_hotel_data_hotel_name_date_recorded',
+        'hotel_data',
+        ['hotel_name', 'date_recorded']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_hotel_data_hotel_name_date_recorded', 'hotel_data', type_='unique')
@@ -0,0 +1,77 @@
+"""添加hotel_data_rollup预聚合汇总表
+
+Revision ID: 8d4e2a6b9c17
+Revises: 3b7c1d2e4f5a
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4e2a6b9c17'
+down_revision: Union[str, None] = '3b7c1d2e4f5a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 按粒度回填已有数据：分酒店一份，全部酒店（__portfolio__）一份
+BACKFILL_SQL = """
+    INSERT INTO hotel_data_rollup (
+        grain, hotel_name, period_start, revenue, rooms_occupied,
+        rooms_available, record_count, created_at, updated_at
+    )
+    SELECT '{grain}', {hotel_name_expr}, {period_expr},
+           SUM(revenue), SUM(rooms_occupied), SUM(room_count), COUNT(id),
+           now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc'
+    FROM hotel_data
+    WHERE date_recorded IS NOT NULL
+    GROUP BY {group_by}
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('hotel_data_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('grain', sa.String(length=10), nullable=False),
+    sa.Column('hotel_name', sa.String(length=200), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=True),
+    sa.Column('rooms_occupied', sa.BigInteger(), nullable=True),
+    sa.Column('rooms_available', sa.BigInteger(), nullable=True),
+    sa.Column('record_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('grain', 'hotel_name', 'period_start', name='uq_hotel_data_rollup_grain_hotel_period')
+    )
+    op.create_index(op.f('ix_hotel_data_rollup_id'), 'hotel_data_rollup', ['id'], unique=False)
+    
+    period_exprs = {
+        "day": "date_recorded",
+        "week": "date_trunc('week', date_recorded)::date",
+        "month": "date_trunc('month', date_recorded)::date",
+    }
+    for grain, period_expr in period_exprs.items():
+        op.execute(BACKFILL_SQL.format(
+            grain=grain,
+            hotel_name_expr="hotel_name",
+            period_expr=period_expr,
+            group_by=f"hotel_name, {period_expr}"
+        ))
+        op.execute(BACKFILL_SQL.format(
+            grain=grain,
+            hotel_name_expr="'__portfolio__'",
+            period_expr=period_expr,
+            group_by=period_expr
+        ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_hotel_data_rollup_id'), table_name='hotel_data_rollup')
+    op.drop_table('hotel_data_rollup')
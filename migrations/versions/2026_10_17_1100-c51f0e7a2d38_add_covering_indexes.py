@@ -0,0 +1,60 @@
+"""添加与仓库查询匹配的复合/覆盖索引
+
+Revision ID: c51f0e7a2d38
+Revises: 8d4e2a6b9c17
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c51f0e7a2d38'
+down_revision: Union[str, None] = '8d4e2a6b9c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY 不能在事务中执行，避免建索引期间锁表
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_hotel_data_date_recorded_hotel_name',
+            'hotel_data',
+            ['date_recorded', 'hotel_name'],
+            unique=False,
+            postgresql_include=['revenue', 'rooms_occupied', 'room_count'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_kpi_metric_hotel_id_metric_name_period_start',
+            'kpi_metric',
+            ['hotel_id', 'metric_name', 'period_start'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_hotel_data_rollup_grain_period_start',
+            'hotel_data_rollup',
+            ['grain', 'period_start'],
+            unique=False,
+            postgresql_include=['hotel_name', 'revenue', 'rooms_occupied', 'rooms_available', 'record_count'],
+            postgresql_concurrently=True
+        )
+        # 以下单列索引已被上面的复合索引覆盖（前导列相同）
+        op.drop_index('ix_hotel_data_date_recorded', table_name='hotel_data', postgresql_concurrently=True)
+        op.drop_index('ix_kpi_metric_hotel_id', table_name='kpi_metric', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_kpi_metric_hotel_id', 'kpi_metric', ['hotel_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_hotel_data_date_recorded', 'hotel_data', ['date_recorded'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_hotel_data_rollup_grain_period_start', table_name='hotel_data_rollup', postgresql_concurrently=True)
+        op.drop_index('ix_kpi_metric_hotel_id_metric_name_period_start', table_name='kpi_metric', postgresql_concurrently=True)
+        op.drop_index('ix_hotel_data_date_recorded_hotel_name', table_name='hotel_data', postgresql_concurrently=True)
@@ -0,0 +1,144 @@
+"""将hotel_data改为按date_recorded月度范围分区
+
+Revision ID: f2a9c4d81b60
+Revises: c51f0e7a2d38
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a9c4d81b60'
+down_revision: Union[str, None] = 'c51f0e7a2d38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 迁移时额外提前创建的未来月份数
+PREMAKE_MONTHS = 3
+
+COLUMNS = (
+    "id, created_at, updated_at, hotel_name, location, room_count, rooms_occupied, "
+    "occupancy_rate, revenue, adr, revpar, date_recorded, data_source, is_validated, "
+    "validation_errors, created_by"
+)
+
+
+def _hotel_data_columns():
+    """hotel_data 的列定义，分区表与普通表共用"""
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('hotel_data_id_seq'::regclass)"), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('hotel_name', sa.String(length=200), nullable=False),
+        sa.Column('location', sa.String(length=200), nullable=True),
+        sa.Column('room_count', sa.Integer(), nullable=True),
+        sa.Column('rooms_occupied', sa.Integer(), nullable=True),
+        sa.Column('occupancy_rate', sa.Float(), nullable=True),
+        sa.Column('revenue', sa.Float(), nullable=True),
+        sa.Column('adr', sa.Float(), nullable=True),
+        sa.Column('revpar', sa.Float(), nullable=True),
+        sa.Column('date_recorded', sa.Date(), nullable=False),
+        sa.Column('data_source', sa.String(length=100), nullable=True),
+        sa.Column('is_validated', sa.Boolean(), nullable=True),
+        sa.Column('validation_errors', sa.JSON(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+    ]
+
+
+def _create_indexes() -> None:
+    """创建 hotel_data 的二级索引（分区表上会自动下发到各分区）"""
+    op.create_index(op.f('ix_hotel_data_id'), 'hotel_data', ['id'], unique=False)
+    op.create_index(op.f('ix_hotel_data_hotel_name'), 'hotel_data', ['hotel_name'], unique=False)
+    op.create_index(
+        'ix_hotel_data_date_recorded_hotel_name',
+        'hotel_data',
+        ['date_recorded', 'hotel_name'],
+        unique=False,
+        postgresql_include=['revenue', 'rooms_occupied', 'room_count']
+    )
+
+
+def _rename_to_legacy(legacy_table: str) -> None:
+    """重命名旧表并释放约束、索引名称，便于新表复用"""
+    op.execute(f"ALTER TABLE hotel_data RENAME TO {legacy_table}")
+    op.execute(f"ALTER TABLE {legacy_table} RENAME CONSTRAINT hotel_data_pkey TO {legacy_table}_pkey")
+    op.execute(f"ALTER TABLE {legacy_table} DROP CONSTRAINT uq_hotel_data_hotel_name_date_recorded")
+    op.execute("DROP INDEX IF EXISTS ix_hotel_data_id")
+    op.execute("DROP INDEX IF EXISTS ix_hotel_data_hotel_name")
+    op.execute("DROP INDEX IF EXISTS ix_hotel_data_date_recorded_hotel_name")
+    # id序列由新表继续使用
+    op.execute("ALTER SEQUENCE hotel_data_id_seq OWNED BY NONE")
+
+
+def _add_months(day: date, months: int) -> date:
+    """月份加减，结果为当月第一天"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 分区表的id不再唯一约束，不能作为外键目标
+    op.execute("ALTER TABLE kpi_metric DROP CONSTRAINT IF EXISTS kpi_metric_hotel_id_fkey")
+
+    # 分区键不能为空，没有记录日期的数据无法参与任何日期范围分析，直接清理
+    op.execute("DELETE FROM kpi_metric WHERE hotel_id IN (SELECT id FROM hotel_data WHERE date_recorded IS NULL)")
+    op.execute("DELETE FROM hotel_data WHERE date_recorded IS NULL")
+
+    _rename_to_legacy("hotel_data_legacy")
+
+    op.create_table('hotel_data',
+    *_hotel_data_columns(),
+    sa.PrimaryKeyConstraint('id', 'date_recorded'),
+    sa.UniqueConstraint('hotel_name', 'date_recorded', name='uq_hotel_data_hotel_name_date_recorded'),
+    postgresql_partition_by='RANGE (date_recorded)'
+    )
+    _create_indexes()
+
+    # 为已有数据的月份及未来几个月创建分区
+    bind = op.get_bind()
+    min_date, max_date = bind.execute(
+        sa.text("SELECT MIN(date_recorded), MAX(date_recorded) FROM hotel_data_legacy")
+    ).one()
+    current_month = date.today().replace(day=1)
+    month_start = (min_date or current_month).replace(day=1)
+    last_month = max(_add_months(current_month, PREMAKE_MONTHS), (max_date or current_month).replace(day=1))
+    while month_start <= last_month:
+        next_month = _add_months(month_start, 1)
+        op.execute(
+            f"CREATE TABLE hotel_data_p{month_start.year:04d}{month_start.month:02d} PARTITION OF hotel_data "
+            f"FOR VALUES FROM ('{month_start.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+        month_start = next_month
+
+    op.execute(f"INSERT INTO hotel_data ({COLUMNS}) SELECT {COLUMNS} FROM hotel_data_legacy")
+    op.execute("DROP TABLE hotel_data_legacy")
+    op.execute("ALTER SEQUENCE hotel_data_id_seq OWNED BY hotel_data.id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rename_to_legacy("hotel_data_partitioned")
+
+    op.create_table('hotel_data',
+    *_hotel_data_columns(),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('hotel_name', 'date_recorded', name='uq_hotel_data_hotel_name_date_recorded')
+    )
+    _create_indexes()
+
+    op.execute(f"INSERT INTO hotel_data ({COLUMNS}) SELECT {COLUMNS} FROM hotel_data_partitioned")
+    # 删除分区表时一并删除所有分区
+    op.execute("DROP TABLE hotel_data_partitioned CASCADE")
+    op.execute("ALTER SEQUENCE hotel_data_id_seq OWNED BY hotel_data.id")
+    op.alter_column('hotel_data', 'date_recorded', existing_type=sa.Date(), nullable=True)
+
+    # 恢复外键前清理指向已归档分区数据的KPI记录
+    op.execute("DELETE FROM kpi_metric WHERE hotel_id NOT IN (SELECT id FROM hotel_data)")
+    op.create_foreign_key('kpi_metric_hotel_id_fkey', 'kpi_metric', 'hotel_data', ['hotel_id'], ['id'])
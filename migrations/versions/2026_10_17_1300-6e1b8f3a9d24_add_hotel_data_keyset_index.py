@@ -0,0 +1,29 @@
+"""为hotel_data游标分页添加 (date_recorded, id) 索引
+
+Revision ID: 6e1b8f3a9d24
+Revises: f2a9c4d81b60
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e1b8f3a9d24'
+down_revision: Union[str, None] = 'f2a9c4d81b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 分区表父表不支持 CONCURRENTLY，索引会自动创建到各分区
+    op.create_index('ix_hotel_data_date_recorded_id', 'hotel_data', ['date_recorded', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_hotel_data_date_recorded_id', table_name='hotel_data')
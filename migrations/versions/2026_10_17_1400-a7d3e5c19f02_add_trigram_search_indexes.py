@@ -0,0 +1,54 @@
+"""添加酒店名称、位置子串搜索的pg_trgm GIN索引
+
+Revision ID: a7d3e5c19f02
+Revises: 6e1b8f3a9d24
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e5c19f02'
+down_revision: Union[str, None] = '6e1b8f3a9d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_hotel_data_hotel_name_trgm',
+        'hotel_data',
+        ['hotel_name'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'hotel_name': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_hotel_data_location_trgm',
+        'hotel_data',
+        ['location'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'location': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_hotel_data_rollup_hotel_name_trgm',
+        'hotel_data_rollup',
+        ['hotel_name'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'hotel_name': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_hotel_data_rollup_hotel_name_trgm', table_name='hotel_data_rollup')
+    op.drop_index('ix_hotel_data_location_trgm', table_name='hotel_data')
+    op.drop_index('ix_hotel_data_hotel_name_trgm', table_name='hotel_data')
@@ -0,0 +1,36 @@
+"""添加hotel_data_rollup_watermark汇总覆盖水位表
+
+不写入水位行：升级后仪表盘查询先回退到原始数据，
+由 rebuild_hotel_data_rollups 任务重建汇总并写入水位后再使用汇总表。
+
+Revision ID: b2f6d8e0a4c1
+Revises: a7d3e5c19f02
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2f6d8e0a4c1'
+down_revision: Union[str, None] = 'a7d3e5c19f02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('hotel_data_rollup_watermark',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('covered_from', sa.Date(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('hotel_data_rollup_watermark')
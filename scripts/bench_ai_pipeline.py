@@ -0,0 +1,242 @@
+"""
+AI分析链路基准
+
+配合 scripts/mock_llm_server.py 使用，不调用真实AI接口。三种模式：
+- client: 只压测 AIClient（连接池、并发限制、429退避），可选流式以测量首字延迟，不需要数据库
+- service: 端到端执行 AIService 批量分析（数据查询 → 提示词 → AI调用 → 解析 → 缓存），
+  默认执行两轮相同请求，统计吞吐量与缓存命中率；使用 DATABASE_URL 和 Redis
+- tasks: 向Celery提交 generate_ai_analysis（或 --batch 时提交 generate_ai_analysis_batch）
+  并等待完成，worker需以模拟服务地址启动
+
+吞吐量、延迟分位数来自客户端计时；AI调用次数、注入的429/5xx和服务端峰值并发来自模拟服务的 /stats。
+
+用法:
+    python scripts/mock_llm_server.py --port 8100 --rate-429 0.05 --max-concurrency 16 &
+    python scripts/bench_ai_pipeline.py client --requests 200 --concurrency 1 8 32 --stream
+    python scripts/bench_ai_pipeline.py service --analyses 50 --passes 2
+    python scripts/bench_ai_pipeline.py tasks --report-ids 1 2 3 4 --batch
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+from typing import Any, Dict, List
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.settings import settings
+from app.services.ai_client import ai_client, build_messages
+
+ANALYSIS_TYPES = ["comprehensive", "revenue", "operational", "competitive", "forecast"]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """返回分位数（毫秒）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+
+def fetch_mock_stats(mock_base: str, reset: bool = False) -> Dict[str, Any]:
+    """读取（或清零）模拟服务的统计"""
+    with httpx.Client(base_url=mock_base, timeout=5) as client:
+        if reset:
+            client.post("/stats/reset")
+            return {}
+        return client.get("/stats").json()
+
+
+def print_mock_stats(stats: Dict[str, Any]) -> None:
+    print(
+        f"  mock: requests={stats['requests']} completed={stats['completed']} "
+        f"429={stats['injected_429'] + stats['rejected_over_capacity']} 5xx={stats['injected_5xx']} "
+        f"peak_in_flight={stats['peak_in_flight']} prompt_chars={stats['prompt_chars']}"
+    )
+
+
+async def run_client_level(total: int, prompt_chars: int, stream: bool) -> Dict[str, Any]:
+    """通过 AIClient 并发发送total个请求（并发数由 AI_MAX_CONCURRENCY 限制）"""
+    prompt = ("酒店运营数据分析。" * (prompt_chars // 9 + 1))[:prompt_chars]
+    latencies: List[float] = []
+    first_token: List[float] = []
+    errors = 0
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        messages = build_messages(f"{index}:{prompt}")
+        started = time.perf_counter()
+        try:
+            if stream:
+                received = False
+                async for _ in ai_client.stream(messages):
+                    if not received:
+                        first_token.append(time.perf_counter() - started)
+                        received = True
+            else:
+                await ai_client.complete(messages)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    await ai_client.aclose()
+
+    return {
+        "rps": total / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "ttft_p50": percentile(first_token, 0.5),
+        "errors": errors
+    }
+
+
+def run_client(args: argparse.Namespace) -> None:
+    print(f"{'concurrency':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ttft p50':>10}{'errors':>8}")
+    for concurrency in args.concurrency:
+        settings.AI_MAX_CONCURRENCY = concurrency
+        fetch_mock_stats(args.mock_base, reset=True)
+        # 每个级别使用新的事件循环，AIClient按新的并发数创建连接池和信号量
+        result = asyncio.run(run_client_level(args.requests, args.prompt_chars, args.stream))
+        print(
+            f"{concurrency:<12}{result['rps']:>10.2f}{result['p50']:>10.0f}{result['p95']:>10.0f}"
+            f"{result['p99']:>10.0f}{result['ttft_p50'] if args.stream else 0:>10.0f}{result['errors']:>8}"
+        )
+        print_mock_stats(fetch_mock_stats(args.mock_base))
+
+
+def build_analysis_requests(db: Any, count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """从数据库中挑选酒店，生成不同酒店组合、日期窗口和分析类型的请求"""
+    from sqlalchemy import func
+    from app.models import HotelData
+
+    latest = db.query(func.max(HotelData.date_recorded)).scalar()
+    if latest is None:
+        raise SystemExit("数据库中没有酒店数据")
+    # 每家酒店取一条记录的ID
+    hotel_ids = [row[0] for row in db.query(func.min(HotelData.id)).group_by(HotelData.hotel_name).all()]
+
+    requests = []
+    for _ in range(count):
+        days = rng.choice([7, 30, 90])
+        end_day = latest - timedelta(days=rng.randint(0, 60))
+        requests.append({
+            "hotel_ids": rng.sample(hotel_ids, min(len(hotel_ids), rng.randint(1, 10))),
+            "date_range": {
+                "start_date": (end_day - timedelta(days=days - 1)).isoformat(),
+                "end_date": end_day.isoformat()
+            },
+            "analysis_type": rng.choice(ANALYSIS_TYPES)
+        })
+    return requests
+
+
+def run_service(args: argparse.Namespace) -> None:
+    from app.config.database import SessionLocal
+    from app.services.ai_service import AIService
+
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    try:
+        requests = build_analysis_requests(db, args.analyses, rng)
+        print(f"{'pass':<6}{'analyses':>10}{'seconds':>10}{'per item ms':>13}{'ai calls':>10}{'hit rate':>10}{'failed':>8}")
+        for index in range(args.passes):
+            fetch_mock_stats(args.mock_base, reset=True)
+            service = AIService(db)
+            started = time.perf_counter()
+            if args.sequential:
+                failed = 0
+                for item in requests:
+                    try:
+                        service.generate_analysis(item["hotel_ids"], item["date_range"], item["analysis_type"])
+                    except Exception:
+                        failed += 1
+            else:
+                results = service.generate_analyses(requests)
+                failed = sum(1 for result in results if result["status"] != "completed")
+            elapsed = time.perf_counter() - started
+
+            stats = fetch_mock_stats(args.mock_base)
+            ai_calls = stats["completed"]
+            hit_rate = 1 - ai_calls / len(requests) if requests else 0
+            print(
+                f"{index + 1:<6}{len(requests):>10}{elapsed:>10.2f}{elapsed / len(requests) * 1000:>13.0f}"
+                f"{ai_calls:>10}{hit_rate:>10.0%}{failed:>8}"
+            )
+            print_mock_stats(stats)
+    finally:
+        db.close()
+
+
+def run_tasks(args: argparse.Namespace) -> None:
+    from app.tasks.ai_analysis import generate_ai_analysis, generate_ai_analysis_batch
+
+    fetch_mock_stats(args.mock_base, reset=True)
+    started = time.perf_counter()
+    if args.batch:
+        results = [generate_ai_analysis_batch.delay(args.report_ids)]
+    else:
+        results = [generate_ai_analysis.delay(report_id) for report_id in args.report_ids]
+
+    latencies = []
+    failed = 0
+    for result in results:
+        try:
+            result.get(timeout=args.timeout)
+        except Exception as e:
+            failed += 1
+            print(f"  任务失败: {e}")
+        latencies.append(time.perf_counter() - started)
+    elapsed = time.perf_counter() - started
+
+    print(f"reports={len(args.report_ids)} tasks={len(results)} seconds={elapsed:.2f} "
+          f"reports/s={len(args.report_ids) / elapsed:.2f} failed={failed}")
+    if not args.batch:
+        print(f"  completion p50={percentile(latencies, 0.5):.0f}ms p95={percentile(latencies, 0.95):.0f}ms")
+    print_mock_stats(fetch_mock_stats(args.mock_base))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AI分析链路基准")
+    parser.add_argument("--mock-base", default="http://127.0.0.1:8100", help="模拟服务地址")
+    parser.add_argument("--max-retries", type=int, default=None, help="覆盖 AI_MAX_RETRIES")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    client = subparsers.add_parser("client", help="只压测AIClient")
+    client.add_argument("--requests", type=int, default=200, help="每个并发级别的请求数")
+    client.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="AI_MAX_CONCURRENCY 列表")
+    client.add_argument("--prompt-chars", type=int, default=4000, help="提示词长度（字符）")
+    client.add_argument("--stream", action="store_true", help="使用流式响应并统计首字延迟")
+
+    service = subparsers.add_parser("service", help="端到端执行AIService批量分析")
+    service.add_argument("--analyses", type=int, default=50, help="分析请求数")
+    service.add_argument("--passes", type=int, default=2, help="重复执行相同请求的轮数，第二轮起衡量缓存命中")
+    service.add_argument("--sequential", action="store_true", help="逐个调用generate_analysis而不是批量接口")
+    service.add_argument("--seed", type=int, default=7, help="随机种子")
+
+    tasks = subparsers.add_parser("tasks", help="通过Celery任务执行分析")
+    tasks.add_argument("--report-ids", type=int, nargs="+", required=True, help="报告ID列表")
+    tasks.add_argument("--batch", action="store_true", help="提交一个批量任务而不是逐个提交")
+    tasks.add_argument("--timeout", type=float, default=1800, help="等待任务完成的上限（秒）")
+
+    args = parser.parse_args()
+
+    # 进程内的调用全部指向模拟服务（tasks模式下由worker自己的配置决定）
+    settings.AI_API_URL = f"{args.mock_base.rstrip('/')}/v1/chat/completions"
+    settings.AI_API_KEY = settings.AI_API_KEY or "mock"
+    if args.max_retries is not None:
+        settings.AI_MAX_RETRIES = args.max_retries
+
+    {"client": run_client, "service": run_service, "tasks": run_tasks}[args.mode](args)
+
+
+if __name__ == "__main__":
+    main()
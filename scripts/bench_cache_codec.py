@@ -0,0 +1,103 @@
+"""
+缓存编解码微基准
+
+对比原有 json.dumps/json.loads 与 CacheCodec 各编码、压缩组合的
+序列化大小和编解码耗时。负载模拟一年的日趋势数据与一份完整的AI分析结果，
+不需要连接Redis。未安装的编码/压缩库会被跳过。
+
+用法:
+    python scripts/bench_cache_codec.py --days 365 --repeat 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import codec as codec_module
+from app.config.codec import CacheCodec
+
+
+def build_trend_payload(days: int) -> dict:
+    """模拟 /dashboard/trends 的列式趋势数据"""
+    rng = random.Random(42)
+    start = date(2025, 1, 1)
+    return {
+        "value": {
+            "metrics": ["occupancy_rate", "adr", "revpar", "revenue"],
+            "hotel_name": None,
+            "group_by": "day",
+            "dates": [(start + timedelta(days=i)).isoformat() for i in range(days)],
+            "values": {
+                "occupancy_rate": [rng.uniform(40, 98) for _ in range(days)],
+                "adr": [rng.uniform(300, 1200) for _ in range(days)],
+                "revpar": [rng.uniform(150, 900) for _ in range(days)],
+                "revenue": [rng.uniform(1e5, 9e5) for _ in range(days)],
+            },
+        },
+        "delta": 0.35,
+        "expiry": 1.8e9,
+    }
+
+
+def build_ai_payload() -> dict:
+    """模拟一份完整的AI分析结果（中文长文本 + 结构化字段）"""
+    paragraph = "本期整体入住率较上期提升，周末需求明显强于工作日，建议针对工作日推出商务套餐并优化渠道结构。"
+    return {
+        "analysis_type": "comprehensive",
+        "summary": paragraph * 6,
+        "insights": [{"title": f"洞察{i}", "content": paragraph * 3} for i in range(8)],
+        "recommendations": [{"priority": i % 3, "action": paragraph * 2} for i in range(10)],
+        "raw_response": paragraph * 40,
+        "generated_at": "2026-10-17T12:00:00",
+    }
+
+
+def bench(name: str, dumps, loads, value, repeat: int) -> None:
+    """输出一种编解码方式的大小与单次耗时"""
+    data = dumps(value)
+    assert loads(data) == json.loads(json.dumps(value))
+    encode_us = timeit.timeit(lambda: dumps(value), number=repeat) / repeat * 1e6
+    decode_us = timeit.timeit(lambda: loads(data), number=repeat) / repeat * 1e6
+    size = len(data.encode()) if isinstance(data, str) else len(data)
+    print(f"{name:<22}{size:>10}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="缓存编解码微基准")
+    parser.add_argument("--days", type=int, default=365, help="趋势数据天数")
+    parser.add_argument("--repeat", type=int, default=2000, help="每项重复次数")
+    args = parser.parse_args()
+
+    available_encodings = ["json"]
+    if codec_module.orjson is not None:
+        available_encodings.append("orjson")
+    if codec_module.msgpack is not None:
+        available_encodings.append("msgpack")
+    available_compressions = ["none", "zlib"]
+    if codec_module.zstandard is not None:
+        available_compressions.append("zstd")
+    if codec_module.lz4_frame is not None:
+        available_compressions.append("lz4")
+
+    payloads = {
+        f"trends ({args.days} days)": build_trend_payload(args.days),
+        "ai analysis": build_ai_payload(),
+    }
+    for title, value in payloads.items():
+        print(f"\n== {title}")
+        print(f"{'codec':<22}{'bytes':>10}{'encode us':>12}{'decode us':>12}")
+        # 原有实现：json文本
+        bench("json (current)", lambda v: json.dumps(v, ensure_ascii=False), json.loads, value, args.repeat)
+        for encoding in available_encodings:
+            for compression in available_compressions:
+                codec = CacheCodec(encoding=encoding, compression=compression, compress_threshold=1024)
+                bench(f"{encoding}+{compression}", codec.dumps, codec.loads, value, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+响应序列化与压缩基准
+
+对比原有路径（response_model校验 + jsonable_encoder + JSONResponse）与
+可信数据直接用orjson编码（trusted_json_response）的耗时，以及原始/gzip/brotli负载大小。
+负载为两年日粒度的趋势数据和一页酒店数据列表，不需要数据库。
+
+用法:
+    python scripts/bench_response_serialization.py --days 730 --rows 100 --repeat 200
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.middleware import compression
+from app.schemas import HotelDataResponse, PaginatedResponse
+from app.utils.responses import trusted_json_response
+
+
+def build_trend_payload(days: int) -> Dict[str, Any]:
+    """模拟 /dashboard/trends 的响应（KPIService.get_trends 的格式）"""
+    rng = random.Random(42)
+    start = date.today() - timedelta(days=days - 1)
+    periods = [(start + timedelta(days=i)).isoformat() for i in range(days)]
+    ranges = {"occupancy_rate": (40, 98), "adr": (300, 1200), "revpar": (150, 900), "revenue": (1e5, 9e5)}
+    return {
+        "trends": {
+            metric: [{"period": period, "value": round(rng.uniform(low, high), 2)} for period in periods]
+            for metric, (low, high) in ranges.items()
+        },
+        "period": "daily",
+        "date_range": {"start_date": periods[0], "end_date": periods[-1]}
+    }
+
+
+def build_hotel_rows(rows: int) -> List[Dict[str, Any]]:
+    """模拟 HotelData.to_dict() 的输出"""
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    return [
+        {
+            "id": i,
+            "created_at": now.isoformat(),
+            "updated_at": now.isoformat(),
+            "hotel_name": f"测试酒店{i % 20}",
+            "location": "上海",
+            "room_count": 200,
+            "rooms_occupied": rng.randint(50, 200),
+            "occupancy_rate": rng.uniform(25, 100),
+            "revenue": rng.uniform(1e4, 2e5),
+            "adr": rng.uniform(300, 1200),
+            "revpar": rng.uniform(150, 900),
+            "date_recorded": date(2025, 1, 1) + timedelta(days=i),
+            "data_source": "excel",
+            "is_validated": True,
+            "validation_errors": None,
+            "created_by": None,
+        }
+        for i in range(rows)
+    ]
+
+
+def timed(func: Callable[[], bytes], repeat: int) -> float:
+    """返回单次调用的平均耗时（毫秒）"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def report(title: str, before: Callable[[], bytes], after: Callable[[], bytes], repeat: int) -> None:
+    """输出原有路径与新路径的耗时及负载大小"""
+    body_before = before()
+    body_after = after()
+    print(f"\n== {title}")
+    print(f"{'path':<12}{'ms':>10}{'bytes':>12}{'gzip':>10}{'br':>10}")
+    for name, func, body in (("before", before, body_before), ("after", after, body_after)):
+        gzip_size = len(gzip.compress(body, compresslevel=6, mtime=0))
+        br_size = len(compression.brotli.compress(body, quality=4)) if compression.brotli is not None else "-"
+        print(f"{name:<12}{timed(func, repeat):>10.3f}{len(body):>12}{gzip_size:>10}{br_size:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="响应序列化与压缩基准")
+    parser.add_argument("--days", type=int, default=730, help="趋势数据天数")
+    parser.add_argument("--rows", type=int, default=100, help="列表每页行数")
+    parser.add_argument("--repeat", type=int, default=200, help="每项重复次数")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+
+    # 原有路径：FastAPI按response_model校验并经jsonable_encoder转换，再由JSONResponse编码
+    def fastapi_body(model: Any, content: Any) -> bytes:
+        field = create_response_field(name="response", type_=model)
+        encoded = loop.run_until_complete(serialize_response(field=field, response_content=content))
+        return JSONResponse(encoded).body
+
+    trend = build_trend_payload(args.days)
+    report(
+        f"trends ({args.days} days, 4 metrics)",
+        lambda: fastapi_body(dict, trend),
+        lambda: trusted_json_response(trend).body,
+        args.repeat
+    )
+
+    rows = build_hotel_rows(args.rows)
+    fields = list(HotelDataResponse.model_fields)
+
+    def hotels_before() -> bytes:
+        items = [HotelDataResponse(**row) for row in rows]
+        page = PaginatedResponse(items=items, total=10000, page=1, size=args.rows, pages=100)
+        return fastapi_body(PaginatedResponse, page)
+
+    def hotels_after() -> bytes:
+        items = [{field: row.get(field) for field in fields} for row in rows]
+        return trusted_json_response({"items": items, "total": 10000, "page": 1, "size": args.rows, "pages": 100}).body
+
+    report(f"/data/hotels ({args.rows} rows)", hotels_before, hotels_after, args.repeat)
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+DataRepository.store_hotel_data 写入性能基准
+
+对比逐行写入 (bulk=False) 与批量 INSERT ... ON CONFLICT (bulk=True) 两种模式。
+使用 DATABASE_URL 指向的数据库，测试数据的酒店名称带有 "__bench__" 前缀，结束后自动清理。
+
+用法:
+    python scripts/bench_store_hotel_data.py --rows 20000 --hotels 50
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import SessionLocal
+from app.models import HotelData, KPIMetric
+from app.repositories.data_repository import DataRepository
+
+BENCH_PREFIX = "__bench__"
+
+
+def build_frame(rows: int, hotels: int, seed: int = 42) -> pd.DataFrame:
+    """生成模拟的酒店日报数据"""
+    rng = np.random.default_rng(seed)
+    days = (rows + hotels - 1) // hotels
+    start = date(2020, 1, 1)
+
+    hotel_names = [f"{BENCH_PREFIX}hotel_{i:04d}" for i in range(hotels)]
+    frame = pd.DataFrame(
+        [(name, start + timedelta(days=d)) for d in range(days) for name in hotel_names][:rows],
+        columns=["hotel_name", "date_recorded"],
+    )
+    frame["location"] = "Bench City"
+    frame["rooms_available"] = rng.integers(80, 400, len(frame))
+    frame["rooms_occupied"] = (frame["rooms_available"] * rng.uniform(0.3, 1.0, len(frame))).astype(int)
+    frame["revenue"] = frame["rooms_occupied"] * rng.uniform(200, 1200, len(frame))
+    return frame
+
+
+def cleanup(db) -> None:
+    """删除基准测试写入的数据"""
+    bench_ids = select(HotelData.id).where(HotelData.hotel_name.like(f"{BENCH_PREFIX}%"))
+    db.query(KPIMetric).filter(KPIMetric.hotel_id.in_(bench_ids)).delete(synchronize_session=False)
+    db.query(HotelData).filter(HotelData.hotel_name.like(f"{BENCH_PREFIX}%")).delete(synchronize_session=False)
+    db.commit()
+
+
+def run_case(frame: pd.DataFrame, bulk: bool, overwrite: bool) -> float:
+    """运行一次写入并返回耗时（秒）"""
+    db = SessionLocal()
+    try:
+        repo = DataRepository(db)
+        started = time.perf_counter()
+        result = repo.store_hotel_data(frame.copy(), overwrite=overwrite, bulk=bulk)
+        elapsed = time.perf_counter() - started
+        assert len(result["hotel_ids"]) == len(frame)
+        return elapsed
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="store_hotel_data 写入性能基准")
+    parser.add_argument("--rows", type=int, default=20000, help="数据行数")
+    parser.add_argument("--hotels", type=int, default=50, help="酒店数量")
+    args = parser.parse_args()
+
+    frame = build_frame(args.rows, args.hotels)
+    db = SessionLocal()
+    try:
+        print(f"rows={len(frame)} hotels={args.hotels}")
+        print(f"{'mode':<10}{'case':<18}{'seconds':>10}{'rows/s':>12}")
+        for bulk in (False, True):
+            mode = "bulk" if bulk else "row"
+            cleanup(db)
+            # 全新插入、重复导入跳过、重复导入覆盖三种场景
+            for case, overwrite in (("insert", False), ("re-ingest skip", False), ("re-ingest update", True)):
+                elapsed = run_case(frame, bulk=bulk, overwrite=overwrite)
+                print(f"{mode:<10}{case:<18}{elapsed:>10.2f}{len(frame) / elapsed:>12.0f}")
+    finally:
+        cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
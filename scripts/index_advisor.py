@@ -0,0 +1,155 @@
+"""
+DataRepository 查询索引检查
+
+依次调用 DataRepository 的只读查询方法，捕获其发出的 SELECT 语句，
+对每条语句执行 EXPLAIN (FORMAT JSON)，报告计划中出现的顺序扫描 (Seq Scan)。
+汇总表开启与关闭 (ROLLUP_ENABLED) 两种路径都会检查。
+
+使用 DATABASE_URL 指向的数据库，查询参数取自库中已有数据的日期范围与酒店名称。
+表行数较少时规划器选择顺序扫描是正常的，可通过 --min-rows 过滤小表。
+
+用法:
+    python scripts/index_advisor.py --min-rows 1000 --fail-on-seq-scan
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import timedelta
+
+from sqlalchemy import event, func, text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import SessionLocal, engine
+from app.config.settings import settings
+from app.models import HotelData
+from app.repositories.data_repository import DataRepository
+
+
+def build_cases(db):
+    """根据库中数据生成 (名称, 调用) 列表"""
+    min_day, max_day, hotel_name, hotel_id = db.query(
+        func.min(HotelData.date_recorded),
+        func.max(HotelData.date_recorded),
+        func.min(HotelData.hotel_name),
+        func.min(HotelData.id)
+    ).one()
+    if min_day is None:
+        return []
+
+    # 取最近30天作为典型窗口，同时覆盖跨月的不完整周期
+    end_day = max_day
+    start_day = max(min_day, end_day - timedelta(days=30))
+    previous_end = start_day - timedelta(days=1)
+    previous_start = previous_end - (end_day - start_day)
+    metrics = ["occupancy_rate", "adr", "revpar", "revenue"]
+
+    cases = [
+        ("get_hotel_data_by_id", lambda repo: repo.get_hotel_data_by_id(hotel_id)),
+        ("get_hotel_data_by_date_range", lambda repo: repo.get_hotel_data_by_date_range(start_day, end_day, hotel_name)),
+        ("get_kpi_metrics_by_hotel_data_id", lambda repo: repo.get_kpi_metrics_by_hotel_data_id(hotel_id)),
+        ("get_period_summaries", lambda repo: repo.get_period_summaries({
+            "current": (start_day, end_day),
+            "previous": (previous_start, previous_end)
+        })),
+        ("get_hotel_performance_comparison", lambda repo: repo.get_hotel_performance_comparison(start_day, end_day)),
+        ("get_seasonal_patterns", lambda repo: repo.get_seasonal_patterns(end_day.year)),
+        ("get_hotel_rankings", lambda repo: repo.get_hotel_rankings(start_day, end_day)),
+    ]
+    for group_by in ("day", "week", "month"):
+        cases.append((
+            f"get_trend_metrics[{group_by}]",
+            lambda repo, group_by=group_by: repo.get_trend_metrics(start_day, end_day, metrics, group_by=group_by)
+        ))
+        cases.append((
+            f"get_trend_metrics[{group_by}, hotel]",
+            lambda repo, group_by=group_by: repo.get_trend_metrics(start_day, end_day, metrics, hotel_name, group_by)
+        ))
+    return cases
+
+
+def capture_statements(db, cases):
+    """运行查询方法并记录其发出的 SELECT 语句"""
+    captured = []
+    current = {"case": None}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((current["case"], statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        for rollup_enabled in (True, False):
+            settings.ROLLUP_ENABLED = rollup_enabled
+            mode = "rollup" if rollup_enabled else "raw"
+            for name, call in cases:
+                current["case"] = f"{name} ({mode})"
+                call(DataRepository(db))
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def find_seq_scans(plan, found=None):
+    """递归查找计划树中的顺序扫描节点"""
+    found = [] if found is None else found
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan)
+    for child in plan.get("Plans", []):
+        find_seq_scans(child, found)
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="DataRepository 查询索引检查")
+    parser.add_argument("--min-rows", type=int, default=0, help="仅报告估算行数不低于该值的表上的顺序扫描")
+    parser.add_argument("--fail-on-seq-scan", action="store_true", help="发现顺序扫描时以非零状态退出")
+    parser.add_argument("--verbose", action="store_true", help="输出有问题语句的SQL")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    rollup_enabled = settings.ROLLUP_ENABLED
+    try:
+        cases = build_cases(db)
+        if not cases:
+            print("hotel_data 表为空，无法生成查询参数")
+            return
+        captured = capture_statements(db, cases)
+
+        # 各表的估算行数，用于过滤小表
+        table_rows = {
+            row[0]: row[1]
+            for row in db.execute(
+                text("SELECT relname, reltuples::bigint FROM pg_class WHERE relkind IN ('r', 'p')")
+            )
+        }
+
+        flagged = 0
+        print(f"{'query':<48}{'relation':<22}{'est. rows':>12}  filter")
+        for case, statement, parameters in captured:
+            plan = db.connection().exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            ).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            for node in find_seq_scans(plan[0]["Plan"]):
+                relation = node.get("Relation Name", "?")
+                if table_rows.get(relation, 0) < args.min_rows:
+                    continue
+                flagged += 1
+                print(f"{case:<48}{relation:<22}{table_rows.get(relation, 0):>12}  {node.get('Filter', '-')}")
+                if args.verbose:
+                    print(f"    {' '.join(statement.split())}")
+
+        print(f"\n检查语句 {len(captured)} 条，顺序扫描 {flagged} 处")
+        if flagged and args.fail_on_seq_scan:
+            sys.exit(1)
+    finally:
+        settings.ROLLUP_ENABLED = rollup_enabled
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ CREATE TABLE IF NOT EXISTS hotel_data (
     hotel_name VARCHAR(200) NOT NULL,
     location VARCHAR(200),
     room_count INTEGER,
+    rooms_occupied INTEGER, -- 已入住房间数
     occupancy_rate DECIMAL(5,2),
     revenue DECIMAL(15,2),
     adr DECIMAL(10,2),  -- Average Daily Rate
@@ -14,11 +15,12 @@ CREATE TABLE IF NOT EXISTS hotel_data (
     validation_errors JSONB, -- 验证错误信息
     created_by INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_hotel_data_hotel_name_date_recorded UNIQUE (hotel_name, date_recorded)
 );
 
 -- 添加索引提高查询性能
-CREATE INDEX IF NOT EXISTS idx_hotel_data_date ON hotel_data(date_recorded);
+CREATE INDEX IF NOT EXISTS idx_hotel_data_date_hotel_name ON hotel_data(date_recorded, hotel_name) INCLUDE (revenue, rooms_occupied, room_count);
 CREATE INDEX IF NOT EXISTS idx_hotel_data_hotel_name ON hotel_data(hotel_name);
 
 -- 创建KPI指标表
@@ -34,6 +36,8 @@ CREATE TABLE IF NOT EXISTS kpi_metrics (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX IF NOT EXISTS idx_kpi_metrics_hotel_metric_period ON kpi_metrics(hotel_id, metric_name, period_start);
+
 -- 创建报告表
 CREATE TABLE IF NOT EXISTS reports (
     id SERIAL PRIMARY KEY,
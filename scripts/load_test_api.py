@@ -0,0 +1,114 @@
+"""
+仪表盘与数据接口压测
+
+以不同并发数请求运行中的服务，统计吞吐量与延迟分位数。
+指定 --baseline-url 时同时压测另一个服务（例如切换到异步路径之前的版本）并并列输出对比结果。
+--bust-cache 为每个请求生成不同的日期范围，绕过缓存以测量数据库路径。
+
+用法:
+    python scripts/load_test_api.py --url http://localhost:8000 --baseline-url http://localhost:8001 \
+        --concurrency 1 8 32 --requests 400 --bust-cache
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINTS = [
+    "/api/v1/dashboard/summary",
+    "/api/v1/dashboard/trends",
+    "/api/v1/data/hotels?size=50",
+    "/api/v1/data/summary",
+]
+
+
+def build_path(endpoint: str, bust_cache: bool, rng: random.Random) -> str:
+    """为请求附加日期范围，bust_cache时每次随机，否则固定为最近30天"""
+    end_day = date(2026, 1, 1) - timedelta(days=rng.randint(0, 720) if bust_cache else 0)
+    start_day = end_day - timedelta(days=29)
+    separator = "&" if "?" in endpoint else "?"
+    return f"{endpoint}{separator}start_date={start_day.isoformat()}&end_date={end_day.isoformat()}"
+
+
+async def run_level(base_url: str, concurrency: int, total: int, bust_cache: bool) -> Dict[str, float]:
+    """以固定并发发送total个请求，返回吞吐量与延迟统计"""
+    rng = random.Random(concurrency)
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(build_path(ENDPOINTS[i % len(ENDPOINTS)], bust_cache, rng))
+
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while True:
+            try:
+                path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "errors": errors,
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    targets = {"current": args.url}
+    if args.baseline_url:
+        targets["baseline"] = args.baseline_url
+
+    print(f"{'target':<10}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for concurrency in args.concurrency:
+        for name, base_url in targets.items():
+            result = await run_level(base_url, concurrency, args.requests, args.bust_cache)
+            print(
+                f"{name:<10}{concurrency:>6}{result['rps']:>10.1f}{result['p50']:>10.1f}"
+                f"{result['p95']:>10.1f}{result['p99']:>10.1f}{result['errors']:>8}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="仪表盘与数据接口压测")
+    parser.add_argument("--url", default="http://localhost:8000", help="被测服务地址")
+    parser.add_argument("--baseline-url", default=None, help="对比服务地址（可选）")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="并发数列表")
+    parser.add_argument("--requests", type=int, default=400, help="每个并发级别的请求数")
+    parser.add_argument("--bust-cache", action="store_true", help="随机日期范围绕过缓存")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+本地模拟对话补全服务（兼容 OpenAI/DeepSeek chat/completions 接口）
+
+用于在不调用真实AI接口的情况下压测 AIService 和 generate_ai_analysis 任务。
+支持首字延迟、按token速率输出、流式响应（stream: true）、按概率注入429/5xx，
+以及模拟服务端并发上限（超出时返回带 Retry-After 的429）。
+GET /stats 返回请求计数、错误注入次数和峰值并发，POST /stats/reset 清零。
+
+用法:
+    python scripts/mock_llm_server.py --port 8100 --latency 0.8 --tokens-per-second 60 \
+        --completion-tokens 600 --rate-429 0.05 --rate-5xx 0.01 --max-concurrency 16
+
+    # 让服务或Celery worker使用模拟服务
+    AI_API_URL=http://localhost:8100/v1/chat/completions AI_API_KEY=mock celery -A app.tasks worker
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 生成内容使用的段落，包含 _parse_ai_response 能识别的章节和列表项
+RESPONSE_SECTIONS = [
+    "整体来看，分析周期内组合酒店的入住率和RevPAR保持稳定，收入较上一周期小幅增长。",
+    "周末需求明显高于工作日，部分酒店在月末出现异常低点，需要关注。",
+    "**关键洞察**\n- 入住率较上一周期上升，主要来自周末需求\n- ADR保持稳定，价格策略未出现明显波动\n- 少数酒店RevPAR持续下滑，拉低整体表现",
+    "**收入表现分析**\n- 收入增长主要由入住率驱动\n- 高收入酒店贡献了大部分增长",
+    "**运营效率评估**\n- 工作日入住率仍有提升空间\n- 异常低点多与数据录入或临时停售有关",
+    "**策略建议**\n1. 针对工作日推出商务套餐\n2. 对RevPAR下滑的酒店复盘定价\n3. 建立异常数据的日常核查机制",
+]
+
+
+class MockState:
+    """模拟服务的配置和统计"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.in_flight = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = time.time()
+        self.stats: Dict[str, Any] = {
+            "requests": 0,
+            "completed": 0,
+            "streamed": 0,
+            "injected_429": 0,
+            "injected_5xx": 0,
+            "rejected_over_capacity": 0,
+            "peak_in_flight": 0,
+            "prompt_chars": 0,
+            "completion_tokens": 0,
+        }
+
+
+def build_completion_tokens(count: int, rng: random.Random) -> List[str]:
+    """生成约count个token（按单字计）的分析文本，按段落循环"""
+    text = "\n\n".join(RESPONSE_SECTIONS)
+    while len(text) < count:
+        text += "\n\n" + rng.choice(RESPONSE_SECTIONS[:2])
+    return list(text[:max(count, 1)])
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    app = FastAPI(title="Mock LLM")
+    state = MockState(args)
+
+    def error_response(status_code: int, message: str, retry_after: float = None) -> JSONResponse:
+        headers = {"Retry-After": f"{retry_after:g}"} if retry_after is not None else None
+        return JSONResponse({"error": {"message": message, "type": "mock_error"}}, status_code=status_code, headers=headers)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        stats = state.stats
+        stats["requests"] += 1
+        stats["prompt_chars"] += sum(len(message.get("content", "")) for message in payload.get("messages", []))
+
+        # 错误注入
+        roll = state.rng.random()
+        if roll < args.rate_429:
+            stats["injected_429"] += 1
+            return error_response(429, "Rate limit reached (injected)", args.retry_after)
+        if roll < args.rate_429 + args.rate_5xx:
+            stats["injected_5xx"] += 1
+            return error_response(503, "Service unavailable (injected)")
+        if args.max_concurrency and state.in_flight >= args.max_concurrency:
+            stats["rejected_over_capacity"] += 1
+            return error_response(429, "Too many concurrent requests", args.retry_after)
+
+        completion_tokens = min(payload.get("max_tokens") or args.completion_tokens, args.completion_tokens)
+        tokens = build_completion_tokens(completion_tokens, state.rng)
+        first_token_delay = max(0.0, state.rng.gauss(args.latency, args.jitter))
+        token_interval = 1.0 / args.tokens_per_second if args.tokens_per_second > 0 else 0.0
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = payload.get("model", "mock")
+
+        state.in_flight += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], state.in_flight)
+
+        if payload.get("stream"):
+            async def events() -> AsyncIterator[bytes]:
+                try:
+                    await asyncio.sleep(first_token_delay)
+                    # 每个SSE事件携带chunk_tokens个token，按token速率发送
+                    for offset in range(0, len(tokens), args.chunk_tokens):
+                        chunk = "".join(tokens[offset:offset + args.chunk_tokens])
+                        data = {
+                            "id": completion_id,
+                            "object": "chat.completion.chunk",
+                            "model": model,
+                            "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]
+                        }
+                        yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+                        await asyncio.sleep(token_interval * args.chunk_tokens)
+                    yield b"data: [DONE]\n\n"
+                    stats["completed"] += 1
+                    stats["streamed"] += 1
+                    stats["completion_tokens"] += len(tokens)
+                finally:
+                    state.in_flight -= 1
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        try:
+            await asyncio.sleep(first_token_delay + token_interval * len(tokens))
+        finally:
+            state.in_flight -= 1
+        stats["completed"] += 1
+        stats["completion_tokens"] += len(tokens)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)}
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return {**state.stats, "in_flight": state.in_flight, "uptime_seconds": round(time.time() - state.started, 1)}
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        state.reset()
+        return {"message": "reset"}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地模拟对话补全服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8100, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0.8, help="首个token的平均延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.2, help="首个token延迟的标准差（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=60, help="输出速率（token/秒），0表示不限速")
+    parser.add_argument("--completion-tokens", type=int, default=600, help="每次输出的token数上限")
+    parser.add_argument("--chunk-tokens", type=int, default=4, help="流式响应每个事件包含的token数")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="随机返回429的概率")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="随机返回503的概率")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429响应的 Retry-After（秒）")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="服务端并发上限，超出返回429，0表示不限制")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()